@@ -1,9 +1,21 @@
 # -*- coding:UTF-8 -*-
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from glob import iglob as GLOBiglob
+from hashlib import sha1 as HASHLIBsha1
 from inspect import stack as INSPECTstack
 import json
-# from os import remove as OSremove
+from os import getpid as OSgetpid
+from os import makedirs as OSmakedirs
+from os import remove as OSremove
+from os import rename as OSrename
+from os import stat as OSstat
+from os.path import dirname as OSpath__dirname
+from os.path import isdir as OSpath__isdir
+from os.path import isfile as OSpath__isfile
+from os.path import join as OSpath__join
+from shutil import rmtree as SHUTILrmtree
+from tempfile import mkdtemp as TEMPFILEmkdtemp
 
 # ENSO_metrics package functions:
 from .EnsoCollectionsLib import defCollection, ReferenceObservations
@@ -23,6 +35,10 @@ from .EnsoMetricsLib import BiasPrLatRmse, BiasPrLonRmse, BiasPrRmse, BiasSshLat
     SeasonalPrLatRmse, SeasonalPrLonRmse, SeasonalSshLatRmse, SeasonalSshLonRmse, SeasonalSstLatRmse,\
     SeasonalSstLonRmse, SeasonalTauxLatRmse, SeasonalTauxLonRmse
 from .EnsoToolsLib import math_metric_computation
+from .EnsoUvcdatToolsLib import dataset_memo, DetectEventsMembers, ensemble_memo, NetcdfCopy, NetcdfWriterStart
+from .EnsoUvcdatToolsLib import NetcdfWriterSaved, NetcdfWriterStop, preprocess_cache, PreProcessTS, Read_data_mask_area
+from .EnsoUvcdatToolsLib import read_cache
+from .EnsoUvcdatToolsLib import read_chunk, SetReadPlan
 from .KeyArgLib import default_arg_values
 
 
@@ -33,6 +49,12 @@ sst_only = [
     "HadISSTv1.1", "OAFlux", "ORAS4", "ORAS5", "SODA3.3.2" "SODA3.4.2", "SODA3.11.2", "SODA3.12.2", "Tropflux",
     "Tropflux1", "Tropflux-1", "Tropfluxv1", "TropFlux1.0", "TropFlux-1.0", "TropFlux-1-0", "TropFluxv1.0"]
 
+# on-disk store of the diagnostics computed for the observational datasets, so that they are computed once and reused
+# by all the model runs, files are named after a hash of the metric, datasets, files, period and parameters (see
+# obs_diagnostic_key)
+# disabled by default (directory=None), it is set by ComputeCollection
+obs_diagnostics_store = {'directory': None, 'hits': 0, 'misses': 0}
+
 
 # ---------------------------------------------------------------------------------------------------------------------#
 #
@@ -40,7 +62,9 @@ sst_only = [
 #
 def ComputeCollection(metricCollection, dictDatasets, modelName, user_regridding={}, debug=False, dive_down=False,
                       netcdf=False, netcdf_name='', observed_fyear=None, observed_lyear=None, modeled_fyear=None,
-                      modeled_lyear=None, obs_interpreter=None):
+                      modeled_lyear=None, obs_interpreter=None, read_cache_size=2000, preprocess_cache_dir=None,
+                      n_workers=1, executor=None, obs_diagnostics_dir=None, read_chunk_size=0,
+                      netcdf_consolidated=False):
     """
     The ComputeCollection() function computes all the diagnostics / metrics associated with the given Metric Collection
 
@@ -122,6 +146,50 @@ def ComputeCollection(metricCollection, dictDatasets, modelName, user_regridding
         the only possibility is 'CMIP' to interpret all observational's variables as CMIP (datasets have been CMORized)
         default value = None, observational datasets are considered not CMORized and will be interpreted as defined in
         EnsoCollectionsLib.ReferenceObservations
+    :param read_cache_size: integer, optional
+        maximum size (in MB) of the in-memory cache of the variables read from files, shared by all the metrics of the
+        collection (see EnsoUvcdatToolsLib.ReadAndSelectRegion); when full, the least recently used variables are
+        discarded
+        when the cache is enabled, each variable is read once on the region including all the regions needed by the
+        collection and the regions of the metrics are selected in memory (see EnsoUvcdatToolsLib.SetReadPlan)
+        default value = 2000, set it to 0 to read the files each time a metric needs them
+    :param preprocess_cache_dir: string, optional
+        path to a directory where the preprocessed fields (anomalies, detrended, smoothed, averaged,... see
+        EnsoUvcdatToolsLib.PreProcessTS) are saved and reused by the following metrics and runs using the same inputs
+        and preprocessing parameters (e.g., ENSO_perf, ENSO_proc and ENSO_tel computed for the same model)
+        default value = None, preprocessed fields are not saved
+    :param n_workers: integer, optional
+        number of processes computing the metrics of the collection in parallel (see ComputeMetric)
+        the values and dive down diagnostics are returned in the same order as when the metrics are computed one after
+        the other, and a metric failing does not prevent the others from being computed
+        each process has its own read cache of up to 'read_cache_size' MB
+        default value = 1, metrics are computed one after the other
+    :param executor: concurrent.futures.Executor, optional
+        executor to which the metrics are submitted instead of creating a pool of 'n_workers' processes (e.g. to share
+        a pool between several collections or to use a cluster executor); it is not shut down by this function
+        default value = None
+    :param obs_diagnostics_dir: string, optional
+        path to a directory where the diagnostics of the observational datasets are saved and reused by the following
+        runs using the same metric, datasets, files, period and parameters (e.g., all the models and members of a
+        CMIP sweep), instead of being computed again for each model (see ComputeMetric)
+        only the metrics computing separately a diagnostic for the model and for the observations use it, when
+        netcdf=True the dive down fields of the observations are also saved in the store and copied in the dive down
+        NetCDF files of each run
+        the store can be filled beforehand by running the collection for one model
+        default value = None, observational diagnostics are computed for each run
+    :param read_chunk_size: integer, optional
+        maximum size (in MB) of the time chunks in which variables larger than it are read (see
+        EnsoUvcdatToolsLib.ReadByTimeChunks), to bound the memory needed to read long simulations on fine grids
+        the variables only used as regional averages are averaged chunk by chunk and never kept whole in memory (see
+        EnsoUvcdatToolsLib.Read_data_mask_area), the variables needed as maps are still assembled whole
+        default value = 0, variables are read at once
+    :param netcdf_consolidated: boolean, optional
+        if netcdf=True, True to save the dive down diagnostics of all the metrics in one deflated NetCDF4 file
+        (netcdf_name + '.nc', the variables, axes and attributes of a metric are prefixed by its name) written in a
+        background thread, instead of one file per metric (see EnsoUvcdatToolsLib.NetcdfWriterStart)
+        the processes of the pool write the variables of each metric in a temporary file, copied in the consolidated
+        file by the main process
+        default value = False, one file per metric
 
     :return: MCvalues: dict
         name of the Metric Collection, Metrics, value, value_error, units, ...
@@ -166,16 +234,171 @@ def ComputeCollection(metricCollection, dictDatasets, modelName, user_regridding
         }
     """
     dict_mc = defCollection(metricCollection)
-    dict_col_meta = {
-        'name': dict_mc['long_name'], 'description_of_the_collection': dict_mc['description'], 'metrics': {},
-    }
-    dict_col_dd_meta = {
-        'name': dict_mc['long_name'], 'description_of_the_collection': dict_mc['description'], 'metrics': {},
-    }
-    dict_col_valu = dict()
-    dict_col_dd_valu = dict()
     dict_m = dict_mc['metrics_list']
+    # variables read from files are shared by all metrics of the collection, each variable is read once on the region
+    # including all the regions needed by the collection
+    # preprocessed fields saved on disk are shared by all metrics and runs
+    dict_read_plan = collection_read_plan(dict_m, dictDatasets) if read_cache_size > 0 else {}
+    # dive down diagnostics of all the metrics saved in one file
+    netcdf_roots = [netcdf_name] if netcdf is True and netcdf_consolidated is True else []
+    set_collection_caches(read_cache_size, dict_read_plan, preprocess_cache_dir, obs_diagnostics_dir,
+                          read_chunk_size, netcdf_roots)
+    # metrics are computed one after the other or dispatched to a pool of processes
+    # the caches, the NetCDF writer and the pool are released even if a metric raises
+    pool, netcdf_worker_dir = None, None
+    try:
+        if executor is not None:
+            pool = executor
+        elif n_workers > 1:
+            if len(netcdf_roots) > 0:
+                netcdf_worker_dir = TEMPFILEmkdtemp(prefix="netcdf_", dir=OSpath__dirname(netcdf_name) or None)
+            pool = ProcessPoolExecutor(max_workers=n_workers, initializer=set_collection_caches,
+                                       initargs=(read_cache_size, dict_read_plan, preprocess_cache_dir,
+                                                 obs_diagnostics_dir, read_chunk_size, netcdf_roots, netcdf_worker_dir))
+        dict_jobs = collection_submit(
+            metricCollection, dictDatasets, modelName, pool, user_regridding=user_regridding, debug=debug,
+            netcdf=netcdf, netcdf_name=netcdf_name, observed_fyear=observed_fyear, observed_lyear=observed_lyear,
+            modeled_fyear=modeled_fyear, modeled_lyear=modeled_lyear, obs_interpreter=obs_interpreter)
+        outputs = collection_gather(metricCollection, dict_jobs, pool, dive_down=dive_down)
+    finally:
+        if pool is not None and executor is None:
+            pool.shutdown()
+        reset_collection_caches()
+        if netcdf_worker_dir is not None:
+            SHUTILrmtree(netcdf_worker_dir, ignore_errors=True)
+    return outputs
+
+
+def ComputeCollectionEnsemble(metricCollection, dictDatasets, list_members=None, user_regridding={}, debug=False,
+                              dive_down=False, netcdf=False, netcdf_name='', observed_fyear=None, observed_lyear=None,
+                              modeled_fyear=None, modeled_lyear=None, obs_interpreter=None, read_cache_size=2000,
+                              preprocess_cache_dir=None, n_workers=1, executor=None, obs_diagnostics_dir=None,
+                              read_chunk_size=0, netcdf_consolidated=False):
+    """
+    The ComputeCollectionEnsemble() function computes all the diagnostics / metrics associated with the given Metric
+    Collection for all the members of an ensemble (e.g., all the realizations of a model) in one pass
+
+    The members share the caches of the collection: the observations are read once on the region including all the
+    regions needed by the collection (see EnsoUvcdatToolsLib.SetReadPlan), the regridders are created once (see
+    EnsoUvcdatToolsLib.RegridCached), and the observational diagnostics are computed once and reused by all the members
+    (see ComputeMetric)
+    The ENSO events of all the members are detected at once, the ENSO indices of the members are stacked along a members
+    axis (see ensemble_events)
+    When a pool of processes is used, the metrics of all the members are submitted at once
+
+    Inputs:
+    ------
+    :param metricCollection: string
+        name of a Metric Collection, must be defined in EnsoCollectionsLib.defCollection()
+    :param dictDatasets: dict
+        dictionary containing all information needed to compute the Metric Collection for all the members and the
+        observations, as in ComputeCollection() but with one entry per member in dictDatasets['model']
+    :param list_members: list, optional
+        list of the members (names in dictDatasets['model']) to compute
+        default value = None, all the members in dictDatasets['model'] are computed
+    :param netcdf_name: string or dict, optional
+        if netcdf=True, name of the NetCDF files (without extension) of each member: either a dictionary
+        {member: netcdf_name} or a string to which '_' + member is appended
+        default value = ''
+    :param netcdf_consolidated: boolean, optional
+        see ComputeCollection(), each member has its own consolidated file
+        default value = False
+    :param obs_diagnostics_dir: string, optional
+        see ComputeCollection()
+        if it is not given, the observational diagnostics are kept in a temporary directory for the length of the
+        ensemble
+        default value = None
+    see ComputeCollection() for the other parameters
+
+    :return: dict_values, dict_dive_down: dict
+        dictionaries {member: MCvalues} and {member: MCdive_down}, MCvalues and MCdive_down are the outputs of
+        ComputeCollection() for this member
+    """
+    if list_members is None:
+        list_members = sorted(list(dictDatasets['model'].keys()), key=lambda v: v.upper())
+    dict_m = defCollection(metricCollection)['metrics_list']
+    # the observational diagnostics are shared by the members
+    tmp_dir = None
+    if obs_diagnostics_dir is None and len(list_members) > 1:
+        tmp_dir = TEMPFILEmkdtemp(prefix="obs_diagnostics_")
+        obs_diagnostics_dir = tmp_dir
+    # variables read from files are shared by all metrics and members, each variable is read once on the region
+    # including all the regions needed by the collection
+    dict_read_plan = collection_read_plan(dict_m, dictDatasets) if read_cache_size > 0 else {}
+    if isinstance(netcdf_name, dict):
+        dict_netcdf_names = dict((member, netcdf_name[member]) for member in list_members)
+    else:
+        dict_netcdf_names = dict((member, netcdf_name + "_" + member) for member in list_members)
+    netcdf_roots = list(dict_netcdf_names.values()) if netcdf is True and netcdf_consolidated is True else []
+    set_collection_caches(read_cache_size, dict_read_plan, preprocess_cache_dir, obs_diagnostics_dir,
+                          read_chunk_size, netcdf_roots)
+    # the caches, the NetCDF writer, the pool and the temporary directory are released even if a metric raises
+    pool, netcdf_worker_dir = None, None
+    try:
+        # the ENSO events of all the members are detected at once
+        if len(list_members) > 1:
+            ensemble_events(metricCollection, dictDatasets, list_members, user_regridding=user_regridding,
+                            observed_fyear=observed_fyear, observed_lyear=observed_lyear, modeled_fyear=modeled_fyear,
+                            modeled_lyear=modeled_lyear, obs_interpreter=obs_interpreter)
+        if executor is not None:
+            pool = executor
+        elif n_workers > 1:
+            if len(netcdf_roots) > 0:
+                netcdf_worker_dir = TEMPFILEmkdtemp(prefix="netcdf_", dir=OSpath__dirname(netcdf_roots[0]) or None)
+            pool = ProcessPoolExecutor(max_workers=n_workers, initializer=set_collection_caches,
+                                       initargs=(read_cache_size, dict_read_plan, preprocess_cache_dir,
+                                                 obs_diagnostics_dir, read_chunk_size, netcdf_roots, netcdf_worker_dir,
+                                                 dict(ensemble_memo)))
+        dict_values, dict_dive_down = dict(), dict()
+        dict_jobs = dict()
+        for member in list_members:
+            print('\033[94m' + str().ljust(5) + "ComputeCollectionEnsemble: member = " + str(member) + '\033[0m')
+            dict_jobs[member] = collection_submit(
+                metricCollection, dictDatasets, member, pool, user_regridding=user_regridding, debug=debug,
+                netcdf=netcdf, netcdf_name=dict_netcdf_names[member], observed_fyear=observed_fyear,
+                observed_lyear=observed_lyear, modeled_fyear=modeled_fyear, modeled_lyear=modeled_lyear,
+                obs_interpreter=obs_interpreter)
+            if pool is None:
+                dict_values[member], dict_dive_down[member] = collection_gather(
+                    metricCollection, dict_jobs.pop(member), pool, dive_down=dive_down)
+        for member in list(dict_jobs.keys()):
+            dict_values[member], dict_dive_down[member] = collection_gather(
+                metricCollection, dict_jobs[member], pool, dive_down=dive_down)
+    finally:
+        if pool is not None and executor is None:
+            pool.shutdown()
+        reset_collection_caches()
+        if tmp_dir is not None:
+            SHUTILrmtree(tmp_dir, ignore_errors=True)
+        if netcdf_worker_dir is not None:
+            SHUTILrmtree(netcdf_worker_dir, ignore_errors=True)
+    return dict_values, dict_dive_down
+
+
+def collection_submit(metricCollection, dictDatasets, modelName, pool, user_regridding={}, debug=False,
+                      netcdf=False, netcdf_name='', observed_fyear=None, observed_lyear=None, modeled_fyear=None,
+                      modeled_lyear=None, obs_interpreter=None):
+    """
+    Computes (or submits to the given pool) all the metrics of the given Metric Collection for the given model
+
+    Inputs:
+    ------
+    :param metricCollection: string
+        name of a Metric Collection, must be defined in EnsoCollectionsLib.defCollection()
+    :param dictDatasets: dict
+        dictionary containing all information needed to compute the Metric Collection, see ComputeCollection()
+    :param modelName: string
+        name of the model (must be in dictDatasets['model'])
+    :param pool: concurrent.futures.Executor or None
+        executor to which the metrics are submitted, None to compute them one after the other
+    see ComputeCollection() for the other parameters
+
+    :return: dict_jobs: dict
+        dictionary {metric: outputs of ComputeMetric (or future of the outputs of metric_pooled if a pool is given)}
+    """
+    dict_m = defCollection(metricCollection)['metrics_list']
     list_metrics = sorted(list(dict_m.keys()), key=lambda v: v.upper())
+    dict_jobs = dict()
     for metric in list_metrics:
         try:  # try per metric
             print('\033[94m' + str().ljust(5) + "ComputeCollection: metric = " + str(metric) + '\033[0m')
@@ -345,37 +568,88 @@ def ComputeCollection(metricCollection, dictDatasets, modelName, user_regridding
                         if ff is None or vv is None:
                             print('\033[94m' + str().ljust(11) + "no observed " + str(vv) + " given" + '\033[0m')
             else:
-                valu, vame, dive, dime = ComputeMetric(
-                    metricCollection, metric, modelName, modelFile1, modelVarName1, obsNameVar1, obsFile1, obsVarName1,
-                    dict_regions[list_variables[0]], user_regridding=user_regridding, debug=debug, netcdf=netcdf,
-                    netcdf_name=netcdf_name, obs_interpreter=obs_interpreter, **arg_var2)
-                keys1 = list(valu.keys())
-                keys2 = list(set([kk.replace('value', '').replace('__', '').replace('_error', '')
-                                  for ll in list(valu[keys1[0]].keys()) for kk in list(valu[keys1[0]][ll].keys())]))
-                if len(keys2) > 1:
-                    for kk in keys2:
-                        mm, dd = dict(), dict()
-                        keys3 = list(valu['metric'].keys())
-                        for ll in keys3:
-                            mm[ll] = {'value': valu['metric'][ll][kk + '__value'],
-                                      'value_error': valu['metric'][ll][kk + '__value_error']}
-                        keys3 = list(valu['diagnostic'].keys())
-                        for ll in keys3:
-                            dd[ll] = {'value': valu['diagnostic'][ll][kk + '__value'],
-                                      'value_error': valu['diagnostic'][ll][kk + '__value_error']}
-                        dict_col_valu[metric + kk] = {'metric': mm, 'diagnostic': dd}
-                        mm = dict((ii, vame['metric'][ii]) for ii in list(vame['metric'].keys()) if 'units' not in ii)
-                        mm['units'] = vame['metric'][kk + '__units']
-                        dict_col_meta['metrics'][metric + kk] = {'metric': mm, 'diagnostic': vame['diagnostic']}
-                        dict_col_dd_valu[metric + kk], dict_col_dd_meta['metrics'][metric + kk] = dive, dime
-                        del mm, dd
+                arg_metric = (metricCollection, metric, modelName, modelFile1, modelVarName1, obsNameVar1, obsFile1,
+                              obsVarName1, dict_regions[list_variables[0]])
+                arg_var2.update({'user_regridding': user_regridding, 'debug': debug, 'netcdf': netcdf,
+                                 'netcdf_name': netcdf_name, 'obs_interpreter': obs_interpreter})
+                if pool is None:
+                    dict_jobs[metric] = ComputeMetric(*arg_metric, **arg_var2)
                 else:
-                    dict_col_valu[metric], dict_col_meta['metrics'][metric] = valu, vame
-                    dict_col_dd_valu[metric], dict_col_dd_meta['metrics'][metric] = dive, dime
+                    dict_jobs[metric] = pool.submit(metric_pooled, *arg_metric, **arg_var2)
         except Exception as e:
             print(e)
             pass
+    return dict_jobs
+
+
+def collection_gather(metricCollection, dict_jobs, pool, dive_down=False):
+    """
+    Gathers the metrics computed (or submitted to the given pool) by collection_submit() in the order of the collection
+
+    Inputs:
+    ------
+    :param metricCollection: string
+        name of a Metric Collection, must be defined in EnsoCollectionsLib.defCollection()
+    :param dict_jobs: dict
+        dictionary {metric: outputs of ComputeMetric (or future of the outputs of metric_pooled)}, see
+        collection_submit()
+    :param pool: concurrent.futures.Executor or None
+        executor to which the metrics have been submitted, None if they have been computed one after the other
+    :param dive_down: boolean, optional
+        True to return the dive down values and metadata, see ComputeCollection()
 
+    :return: MCvalues, MCdive_down: dict
+        see ComputeCollection()
+    """
+    dict_mc = defCollection(metricCollection)
+    dict_col_meta = {
+        'name': dict_mc['long_name'], 'description_of_the_collection': dict_mc['description'], 'metrics': {},
+    }
+    dict_col_dd_meta = {
+        'name': dict_mc['long_name'], 'description_of_the_collection': dict_mc['description'], 'metrics': {},
+    }
+    dict_col_valu = dict()
+    dict_col_dd_valu = dict()
+    list_metrics = sorted(list(dict_mc['metrics_list'].keys()), key=lambda v: v.upper())
+    for metric in list_metrics:
+        if metric not in list(dict_jobs.keys()):
+            continue
+        try:  # try per metric
+            if pool is None:
+                valu, vame, dive, dime = dict_jobs[metric]
+            else:
+                (valu, vame, dive, dime), dict_saved = dict_jobs[metric].result()
+                # dive down variables written by the process of the pool, copied in the consolidated file
+                for netcdf_name in sorted(list(dict_saved.keys())):
+                    NetcdfCopy(dict_saved[netcdf_name], netcdf_name)
+                    OSremove(dict_saved[netcdf_name])
+            keys1 = list(valu.keys())
+            keys2 = list(set([kk.replace('value', '').replace('__', '').replace('_error', '')
+                              for ll in list(valu[keys1[0]].keys()) for kk in list(valu[keys1[0]][ll].keys())]))
+            if len(keys2) > 1:
+                for kk in keys2:
+                    mm, dd = dict(), dict()
+                    keys3 = list(valu['metric'].keys())
+                    for ll in keys3:
+                        mm[ll] = {'value': valu['metric'][ll][kk + '__value'],
+                                  'value_error': valu['metric'][ll][kk + '__value_error']}
+                    keys3 = list(valu['diagnostic'].keys())
+                    for ll in keys3:
+                        dd[ll] = {'value': valu['diagnostic'][ll][kk + '__value'],
+                                  'value_error': valu['diagnostic'][ll][kk + '__value_error']}
+                    dict_col_valu[metric + kk] = {'metric': mm, 'diagnostic': dd}
+                    mm = dict((ii, vame['metric'][ii]) for ii in list(vame['metric'].keys()) if 'units' not in ii)
+                    mm['units'] = vame['metric'][kk + '__units']
+                    dict_col_meta['metrics'][metric + kk] = {'metric': mm, 'diagnostic': vame['diagnostic']}
+                    dict_col_dd_valu[metric + kk], dict_col_dd_meta['metrics'][metric + kk] = dive, dime
+                    del mm, dd
+            else:
+                dict_col_valu[metric], dict_col_meta['metrics'][metric] = valu, vame
+                dict_col_dd_valu[metric], dict_col_dd_meta['metrics'][metric] = dive, dime
+        except Exception as e:
+            print('\033[94m' + str().ljust(5) + "ComputeCollection: metric " + str(metric) + " failed" + '\033[0m')
+            print(e)
+            pass
     if dive_down is True:
         return {'value': dict_col_valu, 'metadata': dict_col_meta},\
                {'value': dict_col_dd_valu, 'metadata': dict_col_dd_meta}
@@ -383,6 +657,376 @@ def ComputeCollection(metricCollection, dictDatasets, modelName, user_regridding
         return {'value': dict_col_valu, 'metadata': dict_col_meta}, {}
 
 
+def reset_collection_caches():
+    """
+    Prints the statistics of the caches used while computing a Metric Collection and disables them (see
+    set_collection_caches)
+
+    :return:
+    """
+    if read_cache.enabled() is True:
+        print('\033[94m' + str().ljust(5) + "ComputeCollection: read cache = " + str(read_cache.statistics()) +
+              '\033[0m')
+    read_cache.clear()
+    read_cache.resize(0)
+    SetReadPlan({})
+    if preprocess_cache['directory'] is not None:
+        print('\033[94m' + str().ljust(5) + "ComputeCollection: preprocess cache = " +
+              str({'hits': preprocess_cache['hits'], 'misses': preprocess_cache['misses']}) + '\033[0m')
+    preprocess_cache['directory'] = None
+    if obs_diagnostics_store['directory'] is not None:
+        print('\033[94m' + str().ljust(5) + "ComputeCollection: observational diagnostics store = " +
+              str({'hits': obs_diagnostics_store['hits'], 'misses': obs_diagnostics_store['misses']}) + '\033[0m')
+    obs_diagnostics_store['directory'] = None
+    read_chunk['max_size'] = 0
+    ensemble_memo.clear()
+    NetcdfWriterStop()
+    return
+
+
+def set_collection_caches(read_cache_size, dict_read_plan, preprocess_cache_dir, obs_diagnostics_dir=None,
+                          read_chunk_size=0, netcdf_roots=[], netcdf_worker_dir=None, dict_ensemble_memo=None):
+    """
+    Sets the caches used while computing a Metric Collection (in the current process or in a process of the pool, see
+    ComputeCollection)
+
+    Inputs:
+    ------
+    :param read_cache_size: integer
+        maximum size (in MB) of the in-memory cache of the variables read from files, 0 disables it
+    :param dict_read_plan: dict
+        dictionary {(filename, varname): list of regions}, see collection_read_plan()
+    :param preprocess_cache_dir: string or None
+        path to the directory of the on-disk cache of the preprocessed fields, None disables it
+    :param obs_diagnostics_dir: string or None, optional
+        path to the directory of the on-disk store of the observational diagnostics, None disables it
+    :param read_chunk_size: integer, optional
+        maximum size (in MB) of the time chunks in which variables are read, 0 reads them at once
+    :param netcdf_roots: list, optional
+        root names of the consolidated dive down NetCDF files (see EnsoUvcdatToolsLib.NetcdfWriterStart), empty to
+        save one file per metric
+    :param netcdf_worker_dir: string or None, optional
+        in a process of the pool, directory in which the process writes the dive down variables of each metric instead
+        of the consolidated files, they are copied in the consolidated files by the main process (see collection_gather)
+        None in the main process, the consolidated files are written in a background thread
+    :param dict_ensemble_memo: dict or None, optional
+        outputs computed for all the members of an ensemble at once (see ensemble_events), None if there is none
+
+    :return:
+    """
+    read_cache.clear()
+    read_cache.resize(read_cache_size * 1e6)
+    SetReadPlan(dict_read_plan if read_cache.enabled() is True else {})
+    preprocess_cache.update({'directory': preprocess_cache_dir, 'hits': 0, 'misses': 0})
+    obs_diagnostics_store.update({'directory': obs_diagnostics_dir, 'hits': 0, 'misses': 0})
+    read_chunk['max_size'] = read_chunk_size * 1e6
+    ensemble_memo.clear()
+    ensemble_memo.update(dict_ensemble_memo if dict_ensemble_memo is not None else {})
+    dict_files = dict((root.replace(".nc", ""), root.replace(".nc", "") + ".nc") for root in netcdf_roots)
+    NetcdfWriterStart(dict_files, directory=netcdf_worker_dir)
+    return
+
+
+def metric_pooled(*args, **kwargs):
+    """
+    Computes a metric in a process of the pool (see ComputeMetric) and gives the files in which the process has written
+    the dive down variables of the consolidated files (see set_collection_caches)
+
+    :return: outputs, dict_saved
+        outputs of ComputeMetric and dictionary {name of the dive down NetCDF file of the metric: file written by the
+        process}, see EnsoUvcdatToolsLib.NetcdfWriterSaved
+    """
+    NetcdfWriterSaved()
+    outputs = ComputeMetric(*args, **kwargs)
+    return outputs, NetcdfWriterSaved()
+
+
+def obs_diagnostic_key(metric, dataset, list_files, list_varnames, list_regions, keyarg):
+    """
+    Computes the key of an observational diagnostic in the on-disk store (obs_diagnostics_store)
+    The key is a hash of the metric, of the dataset(s), of the files (names, sizes and modification times), of the
+    regions and of the parameters of the metric (period, preprocessing,...), the parameters only used for the model are
+    left out so that all the model runs share the same key
+
+    Inputs:
+    ------
+    :param metric: string
+        name of the metric
+    :param dataset: string
+        name of the observational dataset(s)
+    :param list_files: list
+        list of the files (string or list of strings) read to compute the diagnostic (data, areacell, landmask)
+    :param list_varnames: list
+        list of the variables (string or list of strings) read in the files
+    :param list_regions: list
+        list of the regions in which the variables are read
+    :param keyarg: dict
+        parameters given to the function computing the diagnostic
+
+    :return key: string
+        hexadecimal key
+    """
+    sha = HASHLIBsha1()
+    sha.update(str((metric, dataset, list_varnames, list_regions)).encode("utf-8"))
+    for file1 in list_files:
+        for file2 in (file1 if isinstance(file1, list) else [file1]):
+            try:
+                info = OSstat(file2)
+            except (OSError, TypeError):
+                sha.update(str(file2).encode("utf-8"))
+            else:
+                sha.update(str((file2, info.st_size, info.st_mtime)).encode("utf-8"))
+    list_mod = ['modeled_period', 'project_interpreter_mod_var1', 'project_interpreter_mod_var2', 'time_bounds_mod']
+    sha.update(str(sorted((str(kk), str(vv)) for kk, vv in keyarg.items() if kk not in list_mod)).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def obs_diagnostic_read(key):
+    """
+    Reads the observational diagnostic saved under 'key' in the on-disk store (obs_diagnostics_store)
+
+    Inputs:
+    ------
+    :param key: string
+        key of the diagnostic, computed by obs_diagnostic_key
+
+    :return diagnostic: dict or None
+        diagnostic as returned by the function computing it (see EnsoMetricsLib), None if 'key' is not in the store
+    """
+    filename = OSpath__join(obs_diagnostics_store['directory'], key + ".json")
+    if OSpath__isfile(filename) is False:
+        obs_diagnostics_store['misses'] += 1
+        return None
+    try:
+        with open(filename) as ff:
+            diagnostic = json.load(ff)['diagnostic']
+    except (OSError, ValueError, KeyError):
+        obs_diagnostics_store['misses'] += 1
+        return None
+    obs_diagnostics_store['hits'] += 1
+    return diagnostic
+
+
+def obs_diagnostic_write(key, metric, dataset, time_bounds, diagnostic):
+    """
+    Saves the observational diagnostic under 'key' in the on-disk store (obs_diagnostics_store)
+    The file is written under a temporary name and renamed, so that concurrent runs never read a partial file
+
+    Inputs:
+    ------
+    :param key: string
+        key of the diagnostic, computed by obs_diagnostic_key
+    :param metric: string
+        name of the metric
+    :param dataset: string
+        name of the observational dataset(s)
+    :param time_bounds: tuple
+        period used to compute the diagnostic
+    :param diagnostic: dict
+        diagnostic as returned by the function computing it (see EnsoMetricsLib)
+
+    :return:
+    """
+    directory = obs_diagnostics_store['directory']
+    filename = OSpath__join(directory, key + ".json")
+    tmp_name = filename + ".tmp" + str(OSgetpid())
+    try:
+        if OSpath__isdir(directory) is False:
+            OSmakedirs(directory)
+        with open(tmp_name, "w") as ff:
+            json.dump({'metric': metric, 'dataset': dataset, 'time_bounds': time_bounds, 'diagnostic': diagnostic}, ff,
+                      default=lambda value: value.tolist() if hasattr(value, "tolist") else str(value))
+        OSrename(tmp_name, filename)
+    except Exception as e:
+        print("\033[93m" + str().ljust(25) + "NOTE: observational diagnostic not saved in store (" + str(e) +
+              ")\033[0m")
+    return
+
+
+def collection_read_plan(dict_metrics, dictDatasets):
+    """
+    Lists all the regions in which each file / variable of the given datasets is read by the given metrics
+
+    Inputs:
+    ------
+    :param dict_metrics: dict
+        metrics of a Metric Collection, as 'metrics_list' in EnsoCollectionsLib.defCollection()
+    :param dictDatasets: dict
+        dictionary containing all information needed to compute the Metric Collection for one model and observations
+        see ComputeCollection()
+
+    :return: dict_regions: dict
+        dictionary {(filename, varname): list of regions}, see EnsoUvcdatToolsLib.SetReadPlan()
+    """
+    dict_regions = dict()
+    for metric in list(dict_metrics.keys()):
+        list_variables = dict_metrics[metric]['variables']
+        for ii, var in enumerate(list_variables):
+            list_regions = [dict_metrics[metric]['regions'][var]]
+            # ENSO events are detected on the first variable
+            if ii == 0 and isinstance(dict_metrics[metric].get('event_definition'), dict) and \
+                    'region_ev' in list(dict_metrics[metric]['event_definition'].keys()):
+                list_regions.append(dict_metrics[metric]['event_definition']['region_ev'])
+            for dataset_type in ['model', 'observations']:
+                for dataset in list(dictDatasets.get(dataset_type, {}).keys()):
+                    try:
+                        list_files = dictDatasets[dataset_type][dataset][var]['path + filename']
+                        list_names = dictDatasets[dataset_type][dataset][var]['varname']
+                    except:
+                        continue
+                    if not isinstance(list_files, list):
+                        list_files, list_names = [list_files], [list_names]
+                    for file1, name1 in zip(list_files, list_names):
+                        if isinstance(file1, str) and isinstance(name1, str):
+                            try:
+                                dict_regions[(file1, name1)] += list_regions
+                            except:
+                                dict_regions[(file1, name1)] = deepcopy(list_regions)
+    return dict_regions
+
+
+def ensemble_events(metricCollection, dictDatasets, list_members, user_regridding={}, observed_fyear=None,
+                    observed_lyear=None, modeled_fyear=None, modeled_lyear=None, obs_interpreter=None):
+    """
+    Detects the ENSO events of all the members of an ensemble at once for the metrics of the given Metric Collection
+    that need them (see EnsoUvcdatToolsLib.DetectEventsMembers)
+    The ENSO index of each member is computed as the metrics compute it (SST read in 'region_ev', preprocessed and
+    averaged horizontally), the events are kept in EnsoUvcdatToolsLib.ensemble_memo and reused by the metrics of the
+    members whose index is the same
+
+    Inputs:
+    ------
+    :param metricCollection: string
+        name of a Metric Collection, must be defined in EnsoCollectionsLib.defCollection()
+    :param dictDatasets: dict
+        dictionary containing all information needed to compute the Metric Collection, see ComputeCollectionEnsemble()
+    :param list_members: list
+        list of the members (names in dictDatasets['model'])
+    see ComputeMetric() for the other parameters
+
+    :return:
+    """
+    dict_m = defCollection(metricCollection)['metrics_list']
+    list_obs = sorted(list(ReferenceObservations().keys()), key=lambda v: v.upper())
+    list_args = ['detrending', 'frequency', 'min_time_steps', 'normalization', 'smoothing', 'time_bounds']
+    list_done = list()
+    for metric in sorted(list(dict_m.keys()), key=lambda v: v.upper()):
+        event_definition = dict_m[metric].get('event_definition')
+        if not isinstance(event_definition, dict) or dict_m[metric]['variables'][0] != 'sst':
+            continue
+        try:
+            region_ev, season_ev = event_definition['region_ev'], event_definition['season_ev']
+            threshold, normalize = event_definition['threshold'], event_definition['normalization']
+        except KeyError:
+            continue
+        # parameters of the model diagnostic, see ComputeMetric()
+        keyarg = metric_keyarg(metricCollection, metric, user_regridding=user_regridding,
+                               observed_fyear=observed_fyear, observed_lyear=observed_lyear,
+                               modeled_fyear=modeled_fyear, modeled_lyear=modeled_lyear)
+        keyarg['time_bounds'] = deepcopy(keyarg['time_bounds_obs'])
+        keyarg['project_interpreter_var1'] = keyarg['project_interpreter']
+        for arg in list_args:
+            if arg not in list(keyarg.keys()):
+                keyarg[arg] = default_arg_values(arg)
+        # the metrics using the same event definition and preprocessing share the same ENSO index
+        index_key = str([sorted(event_definition.items()), [str(keyarg[arg]) for arg in list_args]])
+        if index_key in list_done:
+            continue
+        list_done.append(index_key)
+        list_index = list()
+        for member in list_members:
+            if member.split("_")[0] in list_obs and obs_interpreter != "CMIP":
+                continue
+            dict_sst = dictDatasets['model'][member].get('sst', {})
+            sstfile, sstname = dict_sst.get('path + filename'), dict_sst.get('varname')
+            if not isinstance(sstfile, str) or not isinstance(sstname, str):
+                continue
+            try:
+                sst, areacell, keyerror = Read_data_mask_area(
+                    sstfile, sstname, 'temperature', metric, region_ev,
+                    file_area=dict_sst.get('path + filename_area'), name_area=dict_sst.get('areaname'),
+                    file_mask=dict_sst.get('path + filename_landmask'), name_mask=dict_sst.get('landmaskname'),
+                    maskland=True, maskocean=False, average='horizontal', **keyarg)
+                if keyerror is None:
+                    sst, _, keyerror = PreProcessTS(
+                        sst, '', areacell=areacell, average='horizontal', compute_anom=False, region=region_ev,
+                        **keyarg)
+            except Exception as e:
+                print('\033[94m' + str().ljust(5) + "ensemble_events: " + str(member) + ", " + str(e) + '\033[0m')
+                continue
+            if keyerror is None:
+                list_index.append(sst)
+        if len(list_index) > 1:
+            DetectEventsMembers(list_index, season_ev, threshold, normalization=normalize)
+    return
+
+
+def obs_diagnostic_compute(key, metric, dataset, function, *args, **kwargs):
+    """
+    Computes an observational diagnostic with the given function, or reads it from the on-disk store
+    (obs_diagnostics_store) if it has already been computed by a previous run
+    A diagnostic computed without error is saved in the store
+    When the dive down fields are saved (netcdf=True), the function writes those of the observational dataset in a
+    NetCDF file of the store, kept next to the diagnostic, and they are copied in the dive down NetCDF file of the run
+
+    Inputs:
+    ------
+    :param key: string or None
+        key of the diagnostic, computed by obs_diagnostic_key, None to compute the diagnostic without using the store
+    :param metric: string
+        name of the metric
+    :param dataset: string
+        name of the observational dataset(s)
+    :param function: function
+        function computing the diagnostic (see EnsoMetricsLib)
+    args and kwargs are given to 'function'
+
+    :return diagnostic: dict
+        diagnostic as returned by 'function'
+    """
+    if key is None:
+        return function(*args, **kwargs)
+    directory = obs_diagnostics_store['directory']
+    netcdf = kwargs.get('netcdf') is True
+    netcdf_name, metname = kwargs.get('netcdf_name', ''), kwargs.get('metname', '')
+    # dive down NetCDF file of the run (as named by the functions of EnsoMetricsLib) and of the store
+    if ".nc" in netcdf_name:
+        file_run = netcdf_name.replace(".nc", "_" + metname + ".nc")
+    else:
+        file_run = netcdf_name + "_" + metname + ".nc"
+    file_store = OSpath__join(directory, key + "_" + metname + ".nc")
+    diagnostic = None
+    if netcdf is False or OSpath__isfile(file_store) is True:
+        diagnostic = obs_diagnostic_read(key)
+    else:
+        obs_diagnostics_store['misses'] += 1
+    if diagnostic is not None:
+        if netcdf is True:
+            NetcdfCopy(file_store, file_run)
+        return diagnostic
+    if netcdf is True:
+        # the dive down fields are written in a temporary file of the store (renamed when the diagnostic is saved)
+        if OSpath__isdir(directory) is False:
+            try:
+                OSmakedirs(directory)
+            except OSError:
+                pass
+        kwargs['netcdf_name'] = OSpath__join(directory, key + ".tmp" + str(OSgetpid()))
+        file_tmp = kwargs['netcdf_name'] + "_" + metname + ".nc"
+    diagnostic = function(*args, **kwargs)
+    saved = diagnostic.get('keyerror') is None and diagnostic.get('value') is not None
+    if netcdf is True and OSpath__isfile(file_tmp) is True:
+        if saved is True:
+            OSrename(file_tmp, file_store)
+            file_tmp = file_store
+        NetcdfCopy(file_tmp, file_run)
+        if saved is False:
+            OSremove(file_tmp)
+    if saved is True:
+        obs_diagnostic_write(key, metric, dataset, kwargs.get('time_bounds'), diagnostic)
+    return diagnostic
+
+
 def group_json_obs(pattern, json_name_out, metric_name):
     list_files = sorted(list(GLOBiglob(pattern)), key=lambda v: v.upper())
     for file1 in list_files:
@@ -682,6 +1326,62 @@ dict_twoVar = {
 }
 
 
+def metric_keyarg(metricCollection, metric, user_regridding={}, observed_fyear=None, observed_lyear=None,
+                  modeled_fyear=None, modeled_lyear=None):
+    """
+    Retrieves the parameters of the given metric from EnsoCollectionsLib.defCollection (parameters common to the
+    collection, parameters of the metric, periods and regridding)
+
+    Inputs:
+    ------
+    :param metricCollection: string
+        name of a Metric Collection, must be defined in EnsoCollectionsLib.defCollection()
+    :param metric: string
+        name of the metric in the collection (e.g., 'EnsoAmpl' or 'EnsoAmpl_2')
+    see ComputeMetric() for the other parameters
+
+    :return keyarg: dict
+        parameters of the metric
+    """
+    dict_mc = defCollection(metricCollection)
+    # common_collection_parameters
+    keyarg = dict()
+    for arg in list(dict_mc['common_collection_parameters'].keys()):
+        keyarg[arg] = dict_mc['common_collection_parameters'][arg]
+    for arg in list(dict_mc['metrics_list'][metric].keys()):
+        keyarg[arg] = dict_mc['metrics_list'][metric][arg]
+    # if 'metric_computation' is not defined for this metric (in EnsoCollectionsLib.defCollection), sets it to its
+    # default value
+    try:
+        keyarg['metric_computation']
+    except:
+        keyarg['metric_computation'] = default_arg_values('metric_computation')
+    # if 'modeled_period' is not defined for this metric (in EnsoCollectionsLib.defCollection), sets it to its default
+    # value
+    try:
+        keyarg['time_bounds_mod'] = keyarg['modeled_period']
+    except:
+        keyarg['time_bounds_mod'] = default_arg_values('time_bounds_mod')
+    # YYP !!! experimental period defined bt user !!!
+    if isinstance(modeled_fyear, int) is True and isinstance(modeled_lyear, int) is True:
+        keyarg['time_bounds_mod'] = (str(modeled_fyear) + "-01-01 00:00:00", str(modeled_lyear) + "-12-31 23:59:60.0")
+    # if 'modeled_period' is not defined for this metric (in EnsoCollectionsLib.defCollection), sets it to its default
+    # value
+    try:
+        keyarg['time_bounds_obs'] = keyarg['observed_period']
+    except:
+        keyarg['time_bounds_obs'] = default_arg_values('time_bounds_obs')
+    # YYP !!! experimental period defined bt user !!!
+    if isinstance(observed_fyear, int) is True and isinstance(observed_lyear, int) is True:
+        keyarg['time_bounds_obs'] = (str(observed_fyear) + "-01-01 00:00:00", str(observed_lyear) + "-12-31 23:59:60.0")
+    # if the user gave a specific regridding Tool / method, use it
+    if metric in list(user_regridding.keys()):
+        keyarg['regridding'] = user_regridding[metric]
+    elif 'regridding' in list(user_regridding.keys()):
+        keyarg['regridding'] = user_regridding['regridding']
+    return keyarg
+
+
 def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1, obsNameVar1, obsFile1, obsVarName1,
                   regionVar1, modelFileArea1='', modelAreaName1='', modelFileLandmask1='', modelLandmaskName1='',
                   modelInterpreter1=None, obsFileArea1='', obsAreaName1='', obsFileLandmask1='', obsLandmaskName1='',
@@ -690,7 +1390,7 @@ def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1
                   obsVarName2='', obsFileArea2='', obsAreaName2='', obsFileLandmask2='', obsLandmaskName2='',
                   regionVar2='', obsInterpreter2=None, user_regridding={}, debug=False, netcdf=False, netcdf_name='',
                   observed_fyear=None, observed_lyear=None, modeled_fyear=None, modeled_lyear=None,
-                  obs_interpreter=None):
+                  obs_interpreter=None, dataset_memo_size=1000):
     """
     :param metricCollection: string
         name of a Metric Collection, must be defined in EnsoCollectionsLib.defCollection()
@@ -827,50 +1527,22 @@ def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1
         the only possibility is 'CMIP' to interpret all observational's variables as CMIP (datasets have been CMORized)
         default value = None, observational datasets are considered not CMORized and will be interpreted as defined in
         EnsoCollectionsLib.ReferenceObservations
+    :param dataset_memo_size: integer, optional
+        maximum size (in MB) of the fields read, preprocessed and processed (event detection, seasonal means,
+        regression maps, regridding) kept in memory for the length of the metric when a dataset is used several times
+        (e.g., the model compared to several observational datasets), so that the model side of the metric is computed
+        once (see EnsoUvcdatToolsLib.dataset_memo and EnsoUvcdatToolsLib.dataset_memoized)
+        0 disables it
+        default value = 1000
 
     :return:
     """
     tmp_metric = deepcopy(metric)
     metric = metric.replace('_1', '').replace('_2', '').replace('_3', '').replace('_4', '').replace('_5', '')
     # retrieving keyargs from EnsoCollectionsLib.defCollection
-    dict_mc = defCollection(metricCollection)
     list_obs = sorted(list(ReferenceObservations().keys()), key=lambda v: v.upper())
-
-    # common_collection_parameters
-    keyarg = dict()
-    for arg in list(dict_mc['common_collection_parameters'].keys()):
-        keyarg[arg] = dict_mc['common_collection_parameters'][arg]
-    for arg in list(dict_mc['metrics_list'][tmp_metric].keys()):
-        keyarg[arg] = dict_mc['metrics_list'][tmp_metric][arg]
-    # if 'metric_computation' is not defined for this metric (in EnsoCollectionsLib.defCollection), sets it to its
-    # default value
-    try:
-        keyarg['metric_computation']
-    except:
-        keyarg['metric_computation'] = default_arg_values('metric_computation')
-    # if 'modeled_period' is not defined for this metric (in EnsoCollectionsLib.defCollection), sets it to its default
-    # value
-    try:
-        keyarg['time_bounds_mod'] = keyarg['modeled_period']
-    except:
-        keyarg['time_bounds_mod'] = default_arg_values('time_bounds_mod')
-    # YYP !!! experimental period defined bt user !!!
-    if isinstance(modeled_fyear, int) is True and isinstance(modeled_lyear, int) is True:
-        keyarg['time_bounds_mod'] = (str(modeled_fyear) + "-01-01 00:00:00", str(modeled_lyear) + "-12-31 23:59:60.0")
-    # if 'modeled_period' is not defined for this metric (in EnsoCollectionsLib.defCollection), sets it to its default
-    # value
-    try:
-        keyarg['time_bounds_obs'] = keyarg['observed_period']
-    except:
-        keyarg['time_bounds_obs'] = default_arg_values('time_bounds_obs')
-    # YYP !!! experimental period defined bt user !!!
-    if isinstance(observed_fyear, int) is True and isinstance(observed_lyear, int) is True:
-        keyarg['time_bounds_obs'] = (str(observed_fyear) + "-01-01 00:00:00", str(observed_lyear) + "-12-31 23:59:60.0")
-    # if the user gave a specific regridding Tool / method, use it
-    if tmp_metric in list(user_regridding.keys()):
-        keyarg['regridding'] = user_regridding[tmp_metric]
-    elif 'regridding' in list(user_regridding.keys()):
-        keyarg['regridding'] = user_regridding['regridding']
+    keyarg = metric_keyarg(metricCollection, tmp_metric, user_regridding=user_regridding, observed_fyear=observed_fyear,
+                           observed_lyear=observed_lyear, modeled_fyear=modeled_fyear, modeled_lyear=modeled_lyear)
 
     # if model is an observation
     if modelName.split("_")[0] in list_obs and obs_interpreter != "CMIP":
@@ -907,6 +1579,17 @@ def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1
     dict_dive_down = dict()
     dict_dive_down_metadata = dict()
 
+    # fields read and preprocessed are kept in memory when a dataset is used several times: model compared to several
+    # observational datasets or observational dataset for variable 1 paired with several datasets for variable 2
+    dataset_memo.clear()
+    if metric in list(dict_oneVar_modelAndObs.keys()) + list(dict_twoVar_modelAndObs.keys()):
+        nbr_pairs = len(obsNameVar1) * (len(obsNameVar2) if metric in list(dict_twoVar_modelAndObs.keys()) else 1)
+    elif metric in list(dict_twoVar.keys()):
+        nbr_pairs = len(obsNameVar2)
+    else:
+        nbr_pairs = 1
+    dataset_memo.resize(dataset_memo_size * 1e6 if nbr_pairs > 1 else 0)
+
     multimetric = False
 
     # test files
@@ -1094,10 +1777,16 @@ def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1
                     if output_name != modelName:
                         print('\033[94m' + str().ljust(5) + "ComputeMetric: oneVarmetric = " + str(output_name) +
                               '\033[0m')
-                        diag_obs[output_name] = dict_oneVar[metric](
-                            obsFile1[ii], obsVarName1[ii], obsFileArea1[ii], obsAreaName1[ii], obsFileLandmask1[ii],
-                            obsLandmaskName1[ii], regionVar1, dataset=output_name, debug=debug, netcdf=netcdf,
-                            netcdf_name=netcdf_name, metname=tmp_metric, **keyarg)
+                        store_key = None
+                        if obs_diagnostics_store['directory'] is not None:
+                            store_key = obs_diagnostic_key(
+                                metric, output_name, [obsFile1[ii], obsFileArea1[ii], obsFileLandmask1[ii]],
+                                [obsVarName1[ii], obsAreaName1[ii], obsLandmaskName1[ii]], [regionVar1], keyarg)
+                        diag_obs[output_name] = obs_diagnostic_compute(
+                            store_key, metric, output_name, dict_oneVar[metric], obsFile1[ii], obsVarName1[ii],
+                            obsFileArea1[ii], obsAreaName1[ii], obsFileLandmask1[ii], obsLandmaskName1[ii], regionVar1,
+                            dataset=output_name, debug=debug, netcdf=netcdf, netcdf_name=netcdf_name,
+                            metname=tmp_metric, **keyarg)
                 elif metric in list(dict_twoVar.keys()):
                     for jj in range(len(obsNameVar2)):
                         obs2 = obsNameVar2[jj]
@@ -1106,12 +1795,20 @@ def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1
                         if output_name != modelName:
                             print('\033[94m' + str().ljust(5) + "ComputeMetric: twoVarmetric = " + str(output_name) +
                                   '\033[0m')
-                            diag_obs[output_name] = dict_twoVar[metric](
-                                obsFile1[ii], obsVarName1[ii], obsFileArea1[ii], obsAreaName1[ii], obsFileLandmask1[ii],
-                                obsLandmaskName1[ii], regionVar1, obsFile2[jj], obsVarName2[jj], obsFileArea2[jj],
-                                obsAreaName2[jj], obsFileLandmask2[jj], obsLandmaskName2[jj], regionVar2,
-                                dataset=output_name, debug=debug, netcdf=netcdf, netcdf_name=netcdf_name,
-                                metname=tmp_metric, **keyarg)
+                            store_key = None
+                            if obs_diagnostics_store['directory'] is not None:
+                                store_key = obs_diagnostic_key(
+                                    metric, output_name,
+                                    [obsFile1[ii], obsFileArea1[ii], obsFileLandmask1[ii], obsFile2[jj],
+                                     obsFileArea2[jj], obsFileLandmask2[jj]],
+                                    [obsVarName1[ii], obsAreaName1[ii], obsLandmaskName1[ii], obsVarName2[jj],
+                                     obsAreaName2[jj], obsLandmaskName2[jj]], [regionVar1, regionVar2], keyarg)
+                            diag_obs[output_name] = obs_diagnostic_compute(
+                                store_key, metric, output_name, dict_twoVar[metric], obsFile1[ii], obsVarName1[ii],
+                                obsFileArea1[ii], obsAreaName1[ii], obsFileLandmask1[ii], obsLandmaskName1[ii],
+                                regionVar1, obsFile2[jj], obsVarName2[jj], obsFileArea2[jj], obsAreaName2[jj],
+                                obsFileLandmask2[jj], obsLandmaskName2[jj], regionVar2, dataset=output_name,
+                                debug=debug, netcdf=netcdf, netcdf_name=netcdf_name, metname=tmp_metric, **keyarg)
             for obs in list(diag_obs.keys()):
                 # computes the metric
                 metric_val, metric_err, description_metric = math_metric_computation(
@@ -1199,5 +1896,7 @@ def ComputeMetric(metricCollection, metric, modelName, modelFile1, modelVarName1
                 'metric': {'name': metric, 'method': description_metric, 'datasets': datasets, 'units': units},
                 'diagnostic': dict_diagnostic_metadata,
             }
+    dataset_memo.clear()
+    dataset_memo.resize(0)
     return dict_metrics, dict_metadata, dict_dive_down, dict_dive_down_metadata
 # ---------------------------------------------------------------------------------------------------------------------#
@@ -5125,10 +5125,12 @@ def EnsoFbSstLhf(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     lhf, lhf_areacell, keyerror2 = Read_data_mask_area(
         lhffile, lhfname, 'heat flux', metric, lhfbox, file_area=lhfareafile, name_area=lhfareaname,
-        file_mask=lhflandmaskfile, name_mask=lhflandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=lhflandmaskfile, name_mask=lhflandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst, lhf, keyerror3 = CheckTime(sst, lhf, metric_name=metric, debug=debug, **kwargs)
@@ -5458,7 +5460,8 @@ def EnsoFbSstLwr(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     lwr, lwr_areacell, keyerror2 = Read_data_mask_area_multifile(
         lwrfile, lwrname, 'heat flux', 'lwr', metric, lwrbox, file_area=lwrareafile, name_area=lwrareaname,
         file_mask=lwrlandmaskfile, name_mask=lwrlandmaskname, maskland=True, maskocean=False, debug=debug,
@@ -5792,10 +5795,12 @@ def EnsoFbSstShf(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     shf, shf_areacell, keyerror2 = Read_data_mask_area(
         shffile, shfname, 'heat flux', metric, shfbox, file_area=shfareafile, name_area=shfareaname,
-        file_mask=shflandmaskfile, name_mask=shflandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=shflandmaskfile, name_mask=shflandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst, shf, keyerror3 = CheckTime(sst, shf, metric_name=metric, debug=debug, **kwargs)
@@ -6121,7 +6126,8 @@ def EnsoFbSstSwr(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     swr, swr_areacell, keyerror2 = Read_data_mask_area_multifile(
         swrfile, swrname, 'heat flux', 'swr', metric, swrbox, file_area=swrareafile, name_area=swrareaname,
         file_mask=swrlandmaskfile, name_mask=swrlandmaskname, maskland=True, maskocean=False, debug=debug,
@@ -6460,7 +6466,8 @@ def EnsoFbSstThf(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     thf, thf_areacell, keyerror2 = Read_data_mask_area_multifile(
         thffile, thfname, 'heat flux', 'thf', metric, thfbox, file_area=thfareafile, name_area=thfareaname,
         file_mask=thflandmaskfile, name_mask=thflandmaskname, maskland=True, maskocean=False, debug=debug,
@@ -6773,7 +6780,8 @@ def EnsoAmpl(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sstlan
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -7008,7 +7016,8 @@ def EnsoDiversity(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, s
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -7274,7 +7283,8 @@ def EnsoDuration(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -7581,10 +7591,12 @@ def EnsodSstOce(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sst
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     enso, enso_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     sst, sst_areacell, keyerror2 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     thf, thf_areacell, keyerror3 = Read_data_mask_area_multifile(
         thffile, thfname, 'heat flux', 'thf', metric, thfbox, file_area=thfareafile, name_area=thfareaname,
         file_mask=thflandmaskfile, name_mask=thflandmaskname, maskland=True, maskocean=False, debug=debug,
@@ -7903,10 +7915,12 @@ def EnsoFbSstTaux(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, s
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     taux, taux_areacell, keyerror2 = Read_data_mask_area(
         tauxfile, tauxname, 'wind stress', metric, tauxbox, file_area=tauxareafile, name_area=tauxareaname,
-        file_mask=tauxlandmaskfile, name_mask=tauxlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=tauxlandmaskfile, name_mask=tauxlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst, taux, keyerror3 = CheckTime(sst, taux, metric_name=metric, debug=debug, **kwargs)
@@ -8211,10 +8225,12 @@ def EnsoFbSshSst(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, ss
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     ssh, ssh_areacell, keyerror2 = Read_data_mask_area(
         sshfile, sshname, 'sea surface height', metric, sshbox, file_area=sshareafile, name_area=sshareaname,
-        file_mask=sshlandmaskfile, name_mask=sshlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sshlandmaskfile, name_mask=sshlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst, ssh, keyerror3 = CheckTime(sst, ssh, metric_name=metric, debug=debug, **kwargs)
@@ -8543,10 +8559,12 @@ def EnsoFbTauxSsh(tauxfile, tauxname, tauxareafile, tauxareaname, tauxlandmaskfi
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     ssh, ssh_areacell, keyerror1 = Read_data_mask_area(
         sshfile, sshname, 'sea surface height', metric, sshbox, file_area=sshareafile, name_area=sshareaname,
-        file_mask=sshlandmaskfile, name_mask=sshlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sshlandmaskfile, name_mask=sshlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     taux, taux_areacell, keyerror2 = Read_data_mask_area(
         tauxfile, tauxname, 'wind stress', metric, tauxbox, file_area=tauxareafile, name_area=tauxareaname,
-        file_mask=tauxlandmaskfile, name_mask=tauxlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=tauxlandmaskfile, name_mask=tauxlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     ssh, taux, keyerror3 = CheckTime(ssh, taux, metric_name=metric, debug=debug, **kwargs)
@@ -8904,11 +8922,11 @@ def EnsoPrMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandmas
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     pr_mod, pr_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         prfilemod, prnamemod, 'precipitations', metric, prbox,file_area=prareafilemod, name_area=prareanamemod,
         file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod, maskland=False, maskocean=False,
@@ -9354,11 +9372,11 @@ def EnsoPrMapDjf(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
     sst_mod_box, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs_box, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug,  **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug,  average='horizontal', **kwargs)
     pr_mod, pr_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         prfilemod, prnamemod, 'precipitations', metric, prbox, file_area=prareafilemod, name_area=prareanamemod,
         file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod, maskland=False, maskocean=False,
@@ -9911,11 +9929,11 @@ def EnsoPrMapJja(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
     sst_mod_box, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs_box, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug,  **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug,  average='horizontal', **kwargs)
     pr_mod, pr_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         prfilemod, prnamemod, 'precipitations', metric, prbox, file_area=prareafilemod, name_area=prareanamemod,
         file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod, maskland=False, maskocean=False,
@@ -10467,11 +10485,11 @@ def EnsoPrDjfTel(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     if not isinstance(prbox, list):
         prbox = [prbox]
     prbox = sorted(prbox, key=str.lower)
@@ -10562,12 +10580,12 @@ def EnsoPrDjfTel(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
                     prfilemod, prnamemod, 'precipitations', metric, reg, file_area=prareafilemod,
                     name_area=prareanamemod, file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod,
                     maskland=maskland, maskocean=maskoce, time_bounds=kwargs['time_bounds_mod'], debug=debug,
-                    **kwargs)
+                    average='horizontal', **kwargs)
                 pr_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
                     prfileobs, prnameobs, 'precipitations', metric, reg, file_area=prareafileobs,
                     name_area=prareanameobs, file_mask=prlandmaskfileobs, name_mask=prlandmasknameobs,
                     maskland=maskland, maskocean=maskoce, time_bounds=kwargs['time_bounds_obs'], debug=debug,
-                    **kwargs)
+                    average='horizontal', **kwargs)
                 if keyerror_mod is not None or keyerror_obs is not None:
                     loop_keyerror = add_up_errors([loop_keyerror, keyerror_mod, keyerror_obs])
                 else:
@@ -10840,11 +10858,11 @@ def EnsoPrJjaTel(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     if not isinstance(prbox, list):
         prbox = [prbox]
     prbox = sorted(prbox, key=str.lower)
@@ -10935,12 +10953,12 @@ def EnsoPrJjaTel(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
                     prfilemod, prnamemod, 'precipitations', metric, reg, file_area=prareafilemod,
                     name_area=prareanamemod, file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod,
                     maskland=maskland, maskocean=maskoce, time_bounds=kwargs['time_bounds_mod'], debug=debug,
-                    **kwargs)
+                    average='horizontal', **kwargs)
                 pr_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
                     prfileobs, prnameobs, 'precipitations', metric, reg, file_area=prareafileobs,
                     name_area=prareanameobs, file_mask=prlandmaskfileobs, name_mask=prlandmasknameobs,
                     maskland=maskland, maskocean=maskoce, time_bounds=kwargs['time_bounds_obs'], debug=debug,
-                    **kwargs)
+                    average='horizontal', **kwargs)
                 if keyerror_mod is not None or keyerror_obs is not None:
                     loop_keyerror = add_up_errors([loop_keyerror, keyerror_mod, keyerror_obs])
                 else:
@@ -11141,7 +11159,8 @@ def EnsoSeasonality(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile,
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -11439,7 +11458,8 @@ def EnsoSstDiversity(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     sstmap, sstmap_areacell, keyerror2 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, box, file_area=sstareafile, name_area=sstareaname,
         file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
@@ -11772,7 +11792,8 @@ def EnsoSstSkew(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sst
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, sstbox, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -12041,11 +12062,11 @@ def EnsoSlpMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandma
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     slp_mod, slp_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         slpfilemod, slpnamemod, 'pressure', metric, slpbox,file_area=slpareafilemod, name_area=slpareanamemod,
         file_mask=slplandmaskfilemod, name_mask=slplandmasknamemod, maskland=False, maskocean=False,
@@ -12487,11 +12508,11 @@ def EnsoSlpMapDjf(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod_box, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs_box, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug,  **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug,  average='horizontal', **kwargs)
     slp_mod, slp_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         slpfilemod, slpnamemod, 'pressure', metric, slpbox, file_area=slpareafilemod, name_area=slpareanamemod,
         file_mask=slplandmaskfilemod, name_mask=slplandmasknamemod, maskland=False, maskocean=False,
@@ -13043,11 +13064,11 @@ def EnsoSlpMapJja(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod_box, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs_box, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug,  **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug,  average='horizontal', **kwargs)
     slp_mod, slp_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         slpfilemod, slpnamemod, 'pressure', metric, slpbox, file_area=slpareafilemod, name_area=slpareanamemod,
         file_mask=slplandmaskfilemod, name_mask=slplandmasknamemod, maskland=False, maskocean=False,
@@ -13590,11 +13611,11 @@ def EnsoMldLonRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     mld_mod, mld_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         mldfilemod, mldnamemod, 'depth', metric, mldbox, file_area=mldareafilemod, name_area=mldareanamemod,
         file_mask=mldlandmaskfilemod, name_mask=mldlandmasknamemod, maskland=False, maskocean=False,
@@ -14087,19 +14108,19 @@ def EnsoMldTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     mld_mod, mld_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         mldfilemod, mldnamemod, 'depth', metric, mldbox, file_area=mldareafilemod, name_area=mldareanamemod,
         file_mask=mldlandmaskfilemod, name_mask=mldlandmasknamemod, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     mld_obs, mld_obs_areacell, keyerror_obs2 = Read_data_mask_area(
         mldfileobs, mldnameobs, 'depth', metric, mldbox, file_area=mldareafileobs, name_area=mldareanameobs,
         file_mask=mldlandmaskfileobs, name_mask=mldlandmasknameobs, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst_mod, mld_mod, keyerror_mod3 = CheckTime(sst_mod, mld_mod, metric_name=metric, debug=debug, **kwargs)
@@ -14528,11 +14549,11 @@ def EnsoSstLonRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     sstmap_mod, sstmap_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, box, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
@@ -14994,11 +15015,11 @@ def EnsoSstMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandma
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     tsmap_mod, tsmap_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, tsbox, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=False, maskocean=False,
@@ -15402,11 +15423,11 @@ def EnsoSstMapDjf(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod_box, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs_box, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     ts_mod, ts_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, tsbox, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=False, maskocean=False,
@@ -15911,11 +15932,11 @@ def EnsoSstMapJja(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod_box, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs_box, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     ts_mod, ts_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, tsbox, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=False, maskocean=False,
@@ -16447,19 +16468,19 @@ def EnsoPrTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstland
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     pr_mod, pr_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         prfilemod, prnamemod, 'precipitations', metric, prbox, file_area=prareafilemod, name_area=prareanamemod,
         file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     pr_obs, pr_obs_areacell, keyerror_obs2 = Read_data_mask_area(
         prfileobs, prnameobs, 'precipitations', metric, prbox, file_area=prareafileobs, name_area=prareanameobs,
         file_mask=prlandmaskfileobs, name_mask=prlandmasknameobs, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst_mod, pr_mod, keyerror_mod3 = CheckTime(sst_mod, pr_mod, metric_name=metric, debug=debug, **kwargs)
@@ -16882,11 +16903,11 @@ def EnsoSstTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
@@ -17334,11 +17355,11 @@ def EnsoTauxLonRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstl
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     taux_mod, taux_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         tauxfilemod, tauxnamemod, 'wind stress', metric, tauxbox, file_area=tauxareafilemod, name_area=tauxareanamemod,
         file_mask=tauxlandmaskfilemod, name_mask=tauxlandmasknamemod, maskland=False, maskocean=False,
@@ -17838,19 +17859,19 @@ def EnsoTauxTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     taux_mod, taux_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         tauxfilemod, tauxnamemod, 'wind stress', metric, tauxbox, file_area=tauxareafilemod, name_area=tauxareanamemod,
         file_mask=tauxlandmaskfilemod, name_mask=tauxlandmasknamemod, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     taux_obs, taux_obs_areacell, keyerror_obs2 = Read_data_mask_area(
         tauxfileobs, tauxnameobs, 'wind stress', metric, tauxbox, file_area=tauxareafileobs, name_area=tauxareanameobs,
         file_mask=tauxlandmaskfileobs, name_mask=tauxlandmasknameobs, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst_mod, taux_mod, keyerror_mod3 = CheckTime(sst_mod, taux_mod, metric_name=metric, debug=debug, **kwargs)
@@ -18314,11 +18335,11 @@ def EnsoTauyLonRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstl
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     tauy_mod, tauy_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         tauyfilemod, tauynamemod, 'wind stress', metric, tauybox, file_area=tauyareafilemod, name_area=tauyareanamemod,
         file_mask=tauylandmaskfilemod, name_mask=tauylandmasknamemod, maskland=False, maskocean=False,
@@ -18818,19 +18839,19 @@ def EnsoTauyTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, sst_mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, sst_obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     tauy_mod, tauy_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         tauyfilemod, tauynamemod, 'wind stress', metric, tauybox, file_area=tauyareafilemod, name_area=tauyareanamemod,
         file_mask=tauylandmaskfilemod, name_mask=tauylandmasknamemod, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     tauy_obs, tauy_obs_areacell, keyerror_obs2 = Read_data_mask_area(
         tauyfileobs, tauynameobs, 'wind stress', metric, tauybox, file_area=tauyareafileobs, name_area=tauyareanameobs,
         file_mask=tauylandmaskfileobs, name_mask=tauylandmasknameobs, maskland=False, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Checks if the same time period is used for both variables and if the minimum number of time steps is respected
     sst_mod, tauy_mod, keyerror_mod3 = CheckTime(sst_mod, tauy_mod, metric_name=metric, debug=debug, **kwargs)
@@ -19303,11 +19324,11 @@ def NinaPrMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandmas
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     pr_mod, pr_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         prfilemod, prnamemod, 'precipitations', metric, prbox, file_area=prareafilemod, name_area=prareanamemod,
         file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod, maskland=False, maskocean=False,
@@ -19600,7 +19621,8 @@ def NinaSstDiv(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sstl
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -19873,11 +19895,11 @@ def NinaSstDivRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
@@ -20173,7 +20195,8 @@ def NinaSstDur(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sstl
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -20390,11 +20413,11 @@ def NinaSstLonRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
@@ -20793,11 +20816,11 @@ def NinaSlpMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandma
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     slp_mod, slp_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         slpfilemod, slpnamemod, 'pressure', metric, slpbox, file_area=slpareafilemod, name_area=slpareanamemod,
         file_mask=slplandmaskfilemod, name_mask=slplandmasknamemod, maskland=False, maskocean=False,
@@ -21107,11 +21130,11 @@ def NinaSstMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandma
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     tsmap_mod, tsmap_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, tsbox, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=False, maskocean=False,
@@ -21416,11 +21439,11 @@ def NinaSstTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
@@ -21768,11 +21791,11 @@ def NinoPrMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandmas
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     pr_mod, pr_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         prfilemod, prnamemod, 'precipitations', metric, prbox, file_area=prareafilemod, name_area=prareanamemod,
         file_mask=prlandmaskfilemod, name_mask=prlandmasknamemod, maskland=False, maskocean=False,
@@ -22065,7 +22088,8 @@ def NinoSstDiv(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sstl
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -22338,11 +22362,11 @@ def NinoSstDivRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
@@ -22638,7 +22662,8 @@ def NinoSstDur(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile, sstl
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
 
     # Number of years
     yearN = int(round(sst.shape[0] / 12))
@@ -22855,11 +22880,11 @@ def NinoSstLonRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstla
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
@@ -23258,11 +23283,11 @@ def NinoSlpMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandma
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     slp_mod, slp_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         slpfilemod, slpnamemod, 'pressure', metric, slpbox, file_area=slpareafilemod, name_area=slpareanamemod,
         file_mask=slplandmaskfilemod, name_mask=slplandmasknamemod, maskland=False, maskocean=False,
@@ -23555,7 +23580,8 @@ def NinoSstDiversity(sstfile, sstname, sstareafile, sstareaname, sstlandmaskfile
         EnsoErrorsWarnings.debug_mode('\033[92m', metric, 10)
     sst, sst_areacell, keyerror1 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, region_ev, file_area=sstareafile, name_area=sstareaname,
-        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
+        file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug,
+        average='horizontal', **kwargs)
     sstmap, sstmap_areacell, keyerror2 = Read_data_mask_area(
         sstfile, sstname, 'temperature', metric, box, file_area=sstareafile, name_area=sstareaname,
         file_mask=sstlandmaskfile, name_mask=sstlandmaskname, maskland=True, maskocean=False, debug=debug, **kwargs)
@@ -23871,11 +23897,11 @@ def NinoSstMap(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlandma
     sst_mod, mod_areacell, keyerror_mod1 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs1 = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
     tsmap_mod, tsmap_mod_areacell, keyerror_mod2 = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, tsbox, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=False, maskocean=False,
@@ -24180,11 +24206,11 @@ def NinoSstTsRmse(sstfilemod, sstnamemod, sstareafilemod, sstareanamemod, sstlan
     sst_mod, mod_areacell, keyerror_mod = Read_data_mask_area(
         sstfilemod, sstnamemod, 'temperature', metric, region_ev, file_area=sstareafilemod, name_area=sstareanamemod,
         file_mask=sstlandmaskfilemod, name_mask=sstlandmasknamemod, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_mod'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_mod'], debug=debug, average='horizontal', **kwargs)
     sst_obs, obs_areacell, keyerror_obs = Read_data_mask_area(
         sstfileobs, sstnameobs, 'temperature', metric, region_ev, file_area=sstareafileobs, name_area=sstareanameobs,
         file_mask=sstlandmaskfileobs, name_mask=sstlandmasknameobs, maskland=True, maskocean=False,
-        time_bounds=kwargs['time_bounds_obs'], debug=debug, **kwargs)
+        time_bounds=kwargs['time_bounds_obs'], debug=debug, average='horizontal', **kwargs)
 
     # Number of years
     yearN_mod = int(round(sst_mod.shape[0] / 12))
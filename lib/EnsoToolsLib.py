@@ -1,4 +1,5 @@
 # -*- coding:UTF-8 -*-
+from collections import OrderedDict
 from inspect import stack as INSPECTstack
 from numpy import array as NUMPYarray
 from numpy import square as NUMPYsquare
@@ -8,6 +9,97 @@ from scipy.stats import scoreatpercentile as SCIPYstats__scoreatpercentile
 from . import EnsoErrorsWarnings
 
 
+# ---------------------------------------------------------------------------------------------------------------------#
+#
+# Set of classes without CDAT
+#
+class LruCache:
+    """
+    #################################################################################
+    Description:
+    Size-bounded least-recently-used cache
+    When the total size of the stored values exceeds 'max_size', the least recently used values are evicted
+    #################################################################################
+
+    :param max_size: integer, optional
+        maximum total size (in bytes) of the values kept in the cache, 0 disables the cache
+        default value is 0
+    :param sizeof: function, optional
+        function returning the size (in bytes) of a value
+        default value is None, the size is the 'nbytes' attribute of the value (0 if not available)
+
+    Examples
+    ----------
+    cache = LruCache(max_size=1e9)
+    cache.set(('file.nc', 'ts'), tab)
+    tab = cache.get(('file.nc', 'ts'))
+    print cache.statistics()
+    {'hits': 1, 'misses': 0, 'evictions': 0, 'items': 1, 'size': 36000000, 'max_size': 1000000000}
+    """
+    def __init__(self, max_size=0, sizeof=None):
+        self.max_size = int(max_size)
+        self.sizeof = sizeof if sizeof is not None else self._nbytes
+        self.hits, self.misses, self.evictions, self.size = 0, 0, 0, 0
+        self._data = OrderedDict()
+
+    @staticmethod
+    def _nbytes(value):
+        size = getattr(value, 'nbytes', 0)
+        mask = getattr(value, 'mask', None)
+        return int(size + getattr(mask, 'nbytes', 0))
+
+    def enabled(self):
+        return self.max_size > 0
+
+    def clear(self):
+        self._data.clear()
+        self.hits, self.misses, self.evictions, self.size = 0, 0, 0, 0
+
+    def get(self, key):
+        """
+        Returns the value stored for 'key' (and marks it as most recently used), None if 'key' is not stored
+        """
+        if self.enabled() is False:
+            return None
+        try:
+            size, value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data[key] = (size, value)
+        self.hits += 1
+        return value
+
+    def resize(self, max_size):
+        self.max_size = int(max_size)
+        self._evict()
+
+    def set(self, key, value):
+        """
+        Stores 'value' for 'key', values larger than 'max_size' are not stored
+        """
+        if self.enabled() is False:
+            return
+        size = self.sizeof(value)
+        if key in self._data:
+            self.size -= self._data.pop(key)[0]
+        if size > self.max_size:
+            return
+        self._data[key] = (size, value)
+        self.size += size
+        self._evict()
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'items': len(self._data),
+                'size': self.size, 'max_size': self.max_size}
+
+    def _evict(self):
+        while self._data and self.size > self.max_size:
+            self.size -= self._data.popitem(last=False)[1][0]
+            self.evictions += 1
+# ---------------------------------------------------------------------------------------------------------------------#
+
+
 # ---------------------------------------------------------------------------------------------------------------------#
 #
 # Set of functions without CDAT
@@ -2,9 +2,18 @@
 from calendar import monthrange
 import copy
 from datetime import date
+from functools import wraps as FUNCTOOLSwraps
+from hashlib import sha1 as HASHLIBsha1
 from inspect import stack as INSPECTstack
 import ntpath
+from numpy import all as NPall
+from numpy import any as NPany
+from numpy import arange as NParange
 from numpy import array as NParray
+from numpy import concatenate as NPconcatenate
+from numpy import cumsum as NPcumsum
+from numpy import datetime64 as NPdatetime64
+from numpy import dtype as NPdtype
 from numpy import exp as NPexp
 from numpy import histogram as NPhistogram
 from numpy import isnan as NPisnan
@@ -12,32 +21,65 @@ from numpy import nan as NPnan
 from numpy import nonzero as NPnonzero
 from numpy import ones as NPones
 from numpy import product as NPproduct
+from numpy import round as NPround
+from numpy import searchsorted as NPsearchsorted
+from numpy import sqrt as NPsqrt
+from numpy import sum as NPsum
 from numpy import where as NPwhere
+from numpy import zeros as NPzeros
+from numpy.ma import array as NPma__array
+from numpy.ma import getmaskarray as NPma__getmaskarray
+from numpy.ma import masked_all as NPma__masked_all
+from numpy.ma import masked_where as NPma__masked_where
 from numpy.ma.core import MaskedArray as NPma__core__MaskedArray
+from os import getpid as OSgetpid
+from os import makedirs as OSmakedirs
+from os import rename as OSrename
 from os.path import isdir as OSpath_isdir
 from os.path import isfile as OSpath__isfile
 from os.path import join as OSpath__join
 from os.path import split as OSpath__split
+from queue import Queue as QUEUEqueue
+from scipy.ndimage import correlate1d as SCIPYndimage__correlate1d
 from scipy.signal import detrend as SCIPYsignal_detrend
 from scipy.stats import skew as SCIPYstats__skew
 from sys import prefix as SYS_prefix
+from threading import RLock as THREADINGrlock
+from threading import Thread as THREADINGthread
 
 # ENSO_metrics package functions:
 from .EnsoCollectionsLib import CmipVariables
 from .EnsoCollectionsLib import ReferenceObservations
 from .EnsoCollectionsLib import ReferenceRegions
 from . import EnsoErrorsWarnings
-from .EnsoToolsLib import add_up_errors, find_xy_min_max, string_in_dict
+from .EnsoToolsLib import add_up_errors, find_xy_min_max, LruCache, string_in_dict
 
 # uvcdat based functions:
+from cdms2 import CdmsRegrid as CDMS2CdmsRegrid
 from cdms2 import createAxis as CDMS2createAxis
 from cdms2 import createRectGrid as CDMS2createRectGrid
 from cdms2 import createUniformLatitudeAxis as CDMS2createUniformLatitudeAxis
 from cdms2 import createUniformLongitudeAxis as CDMS2createUniformLongitudeAxis
 from cdms2 import createVariable as CDMS2createVariable
+from cdms2 import getNetcdf4Flag as CDMS2getNetcdf4Flag
+from cdms2 import getNetcdfClassicFlag as CDMS2getNetcdfClassicFlag
+from cdms2 import getNetcdfDeflateFlag as CDMS2getNetcdfDeflateFlag
+from cdms2 import getNetcdfDeflateLevelFlag as CDMS2getNetcdfDeflateLevelFlag
+from cdms2 import getNetcdfShuffleFlag as CDMS2getNetcdfShuffleFlag
 from cdms2 import setAutoBounds as CDMS2setAutoBounds
+from cdms2 import setNetcdf4Flag as CDMS2setNetcdf4Flag
+from cdms2 import setNetcdfClassicFlag as CDMS2setNetcdfClassicFlag
+from cdms2 import setNetcdfDeflateFlag as CDMS2setNetcdfDeflateFlag
+from cdms2 import setNetcdfDeflateLevelFlag as CDMS2setNetcdfDeflateLevelFlag
+from cdms2 import setNetcdfShuffleFlag as CDMS2setNetcdfShuffleFlag
 from cdms2 import open as CDMS2open
+from cdms2.mvCdmsRegrid import getMinHorizontalMask as CDMS2getMinHorizontalMask
+from cdtime import Calendar360 as CDTIMECalendar360
 from cdtime import comptime as CDTIMEcomptime
+from cdtime import GregorianCalendar as CDTIMEGregorianCalendar
+from cdtime import MixedCalendar as CDTIMEMixedCalendar
+from cdtime import NoLeapCalendar as CDTIMENoLeapCalendar
+from cdtime import reltime as CDTIMEreltime
 import cdutil
 from genutil.statistics import correlation as GENUTILcorrelation
 from genutil.statistics import linearregression as GENUTILlinearregression
@@ -63,6 +105,205 @@ from MV2 import zeros as MV2zeros
 from regrid2.horizontal import Horizontal as REGRID2horizontal__Horizontal
 
 
+# cache of the variables read by ReadAndSelectRegion (decoded, sign corrected and masked) and of the variables derived
+# from several files by Read_data_mask_area_multifile (stored with their areacell and keyerror)
+# disabled by default (max_size=0), it is enabled for the length of a metric collection by
+# EnsoComputeMetricsLib.ComputeCollection
+read_cache = LruCache(max_size=0, sizeof=lambda value: sum(LruCache._nbytes(vv) for vv in value)
+                      if isinstance(value, list) else LruCache._nbytes(value))
+# superset region read once for a given (filename, varname) and its estimated size, the regions it contains are then
+# selected in memory
+# empty by default, it is set for the length of a metric collection by EnsoComputeMetricsLib.ComputeCollection (see
+# SetReadPlan)
+read_plan = dict()
+# on-disk cache of the fields preprocessed by PreProcessTS, files are named after a hash of the input field and of the
+# preprocessing parameters (see PreProcessCacheKey)
+# disabled by default (directory=None), it is set by EnsoComputeMetricsLib.ComputeCollection
+preprocess_cache = {'directory': None, 'hits': 0, 'misses': 0}
+# maximum size (in bytes) of the time chunks in which ReadAndSelectRegion reads a variable (see ReadByTimeChunks)
+# disabled by default (max_size=0, the variable is read at once), it can be set by
+# EnsoComputeMetricsLib.ComputeCollection
+read_chunk = {'max_size': 0}
+# regridders (and their weights) used by Regrid, see RegridCached
+regrid_cache = LruCache(max_size=20, sizeof=lambda value: 1)
+# destination grids created by Regrid from a grid name and a region
+newgrid_cache = dict()
+# fields read (Read_data_mask_area), preprocessed (PreProcessTS) and processed (event detection, seasonal means,
+# regression maps, regridding, see dataset_memoized) while a metric compares one model to several observational
+# datasets, so that the model side of the metric is computed once per metric and not once per observation
+# disabled by default (max_size=0), it is set for the length of a metric by EnsoComputeMetricsLib.ComputeMetric
+dataset_memo = LruCache(max_size=0, sizeof=lambda value: sum(LruCache._nbytes(vv) for vv in value))
+# areacell, landmask (read or estimated) and masked areacell, they depend only on the model grid and are shared by all
+# the variables and metrics computed in the process (see ReadAreaSelectRegion, ReadLandmaskSelectRegion and
+# Read_mask_area)
+fx_cache = LruCache(max_size=500e6, sizeof=lambda value: sum(LruCache._nbytes(vv) for vv in value))
+# year, month and day of each time step of the time axes seen in the process (see CalendarIndex), so that the functions
+# selecting months, seasons or years do not convert the time axis to component times each time they are called
+calendar_cache = LruCache(max_size=50e6, sizeof=lambda value: sum(vv.nbytes for vv in value.values()))
+# consolidated dive down NetCDF files, in which SaveNetcdf writes the variables of several metrics (one group per
+# metric), possibly from a background thread (see NetcdfWriterStart), in a process of a pool the variables are written
+# in files of their own in 'directory' ({file of the metric: file written}, see NetcdfWriterSaved)
+# disabled by default (no files), it can be set by EnsoComputeMetricsLib.ComputeCollection
+netcdf_writer = {'files': dict(), 'flags': None, 'queue': None, 'queue_size': 8, 'thread': None, 'errors': list(),
+                 'directory': None, 'saved': dict()}
+# lock held by every access to a NetCDF file (cdms2, netCDF and HDF5 libraries are not thread-safe), so that the
+# background thread writing the consolidated files never runs cdms2 at the same time as the reading functions
+netcdf_lock = THREADINGrlock()
+# outputs computed for all the members of an ensemble at once (see DetectEventsMembers), {function name: {memo key:
+# outputs}} with the same keys and outputs as dataset_memo, so that the metrics computed member by member reuse them
+# empty by default, it is filled by EnsoComputeMetricsLib.ComputeCollectionEnsemble
+ensemble_memo = dict()
+
+
+# ---------------------------------------------------------------------------------------------------------------------#
+#
+# Memoization of the functions processing one dataset (see dataset_memo)
+#
+def HashArray(sha, tab):
+    """
+    #################################################################################
+    Description:
+    Updates the given hash with the values, mask, axes and attributes of the given masked_array
+    #################################################################################
+
+    :param sha: hashlib hash object
+        hash to update
+    :param tab: masked_array
+        masked_array (uvcdat cdms2 or numpy)
+
+    :return:
+    """
+    attributes = getattr(tab, "attributes", {})
+    sha.update(str((tab.shape, str(tab.dtype), sorted((str(kk), str(vv)) for kk, vv in attributes.items())))
+               .encode("utf-8"))
+    sha.update(NPma__array(tab).filled(0).tobytes())
+    sha.update(NPma__getmaskarray(tab).tobytes())
+    for axis in (tab.getAxisList() if hasattr(tab, "getAxisList") else []):
+        sha.update(str((axis.id, getattr(axis, "units", ""), getattr(axis, "calendar", ""))).encode("utf-8"))
+        sha.update(NParray(axis[:]).tobytes())
+    return
+
+
+def HashArguments(sha, value):
+    """
+    #################################################################################
+    Description:
+    Updates the given hash with the given arguments (masked_arrays, numbers, strings, lists, tuples, dictionaries)
+    #################################################################################
+
+    :param sha: hashlib hash object
+        hash to update
+    :param value: any
+        arguments to hash
+
+    :return hashable: boolean
+        False if an argument cannot be hashed (e.g., a grid), the hash must not be used
+    """
+    if isinstance(value, NPma__core__MaskedArray):
+        sha.update(b"array")
+        HashArray(sha, value)
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        sha.update(repr(value).encode("utf-8"))
+    elif isinstance(value, (list, tuple)):
+        sha.update(("[" + str(len(value))).encode("utf-8"))
+        for vv in value:
+            if HashArguments(sha, vv) is False:
+                return False
+    elif isinstance(value, dict):
+        sha.update(("{" + str(len(value))).encode("utf-8"))
+        for kk in sorted(value.keys(), key=str):
+            sha.update(str(kk).encode("utf-8"))
+            if HashArguments(sha, value[kk]) is False:
+                return False
+    else:
+        return False
+    return True
+
+
+def DatasetMemoKey(name, args, kwargs):
+    """
+    #################################################################################
+    Description:
+    Computes the key of the outputs of the function 'name' called with the given arguments in dataset_memo (and
+    ensemble_memo)
+    #################################################################################
+
+    :param name: string
+        name of the function
+    :param args: list or tuple
+        positional arguments given to the function
+    :param kwargs: dict
+        keyword arguments given to the function
+
+    :return memo_key: tuple or None
+        key of the outputs, None if an argument cannot be hashed
+    """
+    sha = HASHLIBsha1(name.encode("utf-8"))
+    if HashArguments(sha, [list(args), kwargs]) is False:
+        return None
+    return ("dataset_memoized", sha.hexdigest())
+
+
+def dataset_memoized(function):
+    """
+    #################################################################################
+    Description:
+    Keeps the outputs of the given function in dataset_memo, keyed on a hash of its inputs, so that the model side of a
+    metric (event detection, seasonal means, regression maps, regridding) is computed once and reused for every
+    observational dataset the model is compared to
+    The outputs computed for all the members of an ensemble at once are looked up in ensemble_memo first
+    The function is called directly when dataset_memo is disabled or when an input cannot be hashed (e.g., a grid)
+    #################################################################################
+
+    :param function: function
+        function processing masked_arrays and returning new objects (inputs are not modified in place)
+
+    :return memoized: function
+        function with the same arguments and outputs as 'function'
+    """
+    @FUNCTOOLSwraps(function)
+    def memoized(*args, **kwargs):
+        if dataset_memo.enabled() is False and function.__name__ not in list(ensemble_memo.keys()):
+            return function(*args, **kwargs)
+        memo_key = DatasetMemoKey(function.__name__, args, kwargs)
+        if memo_key is None:
+            return function(*args, **kwargs)
+        memo = ensemble_memo.get(function.__name__, {}).get(memo_key)
+        if memo is None:
+            memo = dataset_memo.get(memo_key)
+        if memo is None:
+            output = function(*args, **kwargs)
+            values = list(output) if isinstance(output, tuple) else [output]
+            dataset_memo.set(memo_key, [isinstance(output, tuple)] + [
+                vv.clone() if hasattr(vv, "clone") else copy.deepcopy(vv) for vv in values])
+            return output
+        values = [vv.clone() if hasattr(vv, "clone") else copy.deepcopy(vv) for vv in memo[1:]]
+        return tuple(values) if memo[0] is True else values[0]
+    return memoized
+
+
+def netcdf_locked(function):
+    """
+    #################################################################################
+    Description:
+    Calls the given function while holding netcdf_lock, so that it does not access NetCDF files at the same time as the
+    background thread writing the consolidated files (see NetcdfWriterStart)
+    #################################################################################
+
+    :param function: function
+        function reading or writing NetCDF files through cdms2
+
+    :return locked: function
+        function with the same arguments and outputs as 'function'
+    """
+    @FUNCTOOLSwraps(function)
+    def locked(*args, **kwargs):
+        with netcdf_lock:
+            return function(*args, **kwargs)
+    return locked
+# ---------------------------------------------------------------------------------------------------------------------#
+
+
 # ---------------------------------------------------------------------------------------------------------------------#
 #
 # Set of simple uvcdat functions used in EnsoMetricsLib.py
@@ -358,6 +599,7 @@ def closest_grid(region, nlat, nlon):
     return grid
 
 
+@dataset_memoized
 def ComputeInterannualAnomalies(tab):
     """
     #################################################################################
@@ -794,8 +1036,27 @@ def TimeBounds(tab):
 
     Returns a tuple of strings: e.g., ('1979-1-1 11:59:60.0', '2016-12-31 11:59:60.0')
     """
-    time = tab.getTime().asComponentTime()
-    return str(time[0]), str(time[-1])
+    time_ax = tab.getTime()
+    return str(TimeComponent(time_ax, 0)), str(TimeComponent(time_ax, -1))
+
+
+def TimeComponent(time_axis, index):
+    """
+    #################################################################################
+    Description:
+    Converts one time step of the given time axis to a component time, without converting the whole axis (as
+    time_axis.asComponentTime() does)
+    #################################################################################
+
+    :param time_axis: time axis
+        time axis (uvcdat cdms2)
+    :param index: int
+        index of the time step (can be negative)
+
+    :return: component time
+        component time (cdtime), e.g., 1979-1-1 11:59:60.0
+    """
+    return CDTIMEreltime(float(time_axis[index]), time_axis.units).tocomp(time_axis.getCalendar())
 # ---------------------------------------------------------------------------------------------------------------------#
 
 
@@ -817,8 +1078,7 @@ def annualcycle(tab):
     initorder = tab.getOrder()
     tab = tab.reorder("t...")
     axes = tab.getAxisList()
-    time_ax = tab.getTime().asComponentTime()
-    months = MV2array(list(tt.month for tt in time_ax))
+    months = CalendarIndex(tab.getTime())["month"]
     cyc = []
     for ii in list(range(12)):
         ids = MV2compress(months == (ii + 1), list(range(len(tab))))
@@ -993,13 +1253,14 @@ def BasinMask(tab_in, region_mask, box=None, lat1=None, lat2=None, latkey='', lo
         dict_debug = {"line1": "(path) " + str(this_dir), "line2": "(file) " + str(this_filename),
                       "line3": "(basin) " + str(basin_generic_ncfile)}
         EnsoErrorsWarnings.debug_mode("\033[93m", "OSpath__split", 20, **dict_debug)
-    ff = CDMS2open(basin_generic_ncfile)
-    # read basins
-    if box is not None:
-        region_ref = ReferenceRegions(box)
-        basin = ff("basin", latitude=region_ref["latitude"], longitude=region_ref["longitude"])
-    else:
-        basin = ff("basin")
+    with netcdf_lock:
+        ff = CDMS2open(basin_generic_ncfile)
+        # read basins
+        if box is not None:
+            region_ref = ReferenceRegions(box)
+            basin = ff("basin", latitude=region_ref["latitude"], longitude=region_ref["longitude"])
+        else:
+            basin = ff("basin")
     if debug is True:
         dict_debug = {"axes1": str([ax.id for ax in basin.getAxisList()]), "shape1": str(basin.shape),
                       "line1": "order = " + str(basin.getOrder())}
@@ -1045,6 +1306,106 @@ def BasinMask(tab_in, region_mask, box=None, lat1=None, lat2=None, latkey='', lo
     return tab_out, keyerror
 
 
+def CalendarIndex(time_axis):
+    """
+    #################################################################################
+    Description:
+    Computes the year, month and day of each time step of the given time axis
+    The result is computed from the axis values with numpy (see CalendarIndexCompute), or with
+    time_axis.asComponentTime() if the units or the calendar are not handled, and is cached (see calendar_cache)
+    #################################################################################
+
+    :param time_axis: time axis
+        time axis (uvcdat cdms2)
+
+    :return dict_index: dictionary
+        {'year': array, 'month': array, 'day': array}, one integer per time step
+    """
+    values = NParray(time_axis[:], dtype="float64")
+    units = str(getattr(time_axis, "units", ""))
+    calendar = time_axis.getCalendar()
+    sha = HASHLIBsha1()
+    sha.update(str((units, calendar)).encode("utf-8"))
+    sha.update(values.tobytes())
+    key = sha.hexdigest()
+    dict_index = calendar_cache.get(key)
+    if dict_index is None:
+        dict_index = CalendarIndexCompute(values, units, calendar)
+        if dict_index is None:
+            time_comp = time_axis.asComponentTime()
+            dict_index = dict((att, NParray([getattr(tt, att) for tt in time_comp], dtype="int64"))
+                              for att in ["year", "month", "day"])
+        calendar_cache.set(key, dict_index)
+    return dict_index
+
+
+def CalendarIndexCompute(values, units, calendar):
+    """
+    #################################################################################
+    Description:
+    Computes the year, month and day of each given time value, for units '<unit> since <date>' (unit: seconds,
+    minutes, hours or days; months or years for integer values) and for the gregorian (after 1582 for the mixed
+    calendar), noleap and 360_day calendars
+    #################################################################################
+
+    :param values: array
+        time values
+    :param units: string
+        units of the time axis, e.g., 'days since 1850-01-01 00:00:00'
+    :param calendar: int
+        calendar of the time axis (cdtime), given by time_axis.getCalendar()
+
+    :return dict_index: dictionary or None
+        {'year': array, 'month': array, 'day': array}, None if the units or the calendar are not handled
+    """
+    dict_seconds = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+    if calendar not in [CDTIMECalendar360, CDTIMEGregorianCalendar, CDTIMEMixedCalendar, CDTIMENoLeapCalendar]:
+        return None
+    try:
+        unit, origin = units.split(" since ")
+        unit = unit.strip().lower().rstrip("s")
+        date_time = origin.strip().replace("T", " ").rstrip("Z").split()
+        year0, month0, day0 = [int(ii) for ii in date_time[0].split("-")]
+        seconds0 = 0.
+        if len(date_time) > 1:
+            seconds0 = sum(float(ii) * ff for ii, ff in zip(date_time[1].split(":"), [3600, 60, 1]))
+    except ValueError:
+        return None
+    if len(date_time) > 2 or year0 < 1 or not (1 <= month0 <= 12 and 1 <= day0 <= 31):
+        return None
+    if unit in ["month", "year"]:
+        # relative months or years are added to the origin, only integer values are handled
+        if day0 > 28 or NPany(values != NPround(values)):
+            return None
+        nbr_months = values.astype("int64") * (12 if unit == "year" else 1) + 12 * year0 + month0 - 1
+        return {"year": nbr_months // 12, "month": nbr_months % 12 + 1,
+                "day": NPones(len(values), dtype="int64") * day0}
+    if unit not in list(dict_seconds.keys()):
+        return None
+    days = NPround(values * dict_seconds[unit] + seconds0).astype("int64") // 86400
+    if calendar == CDTIMECalendar360:
+        days += 360 * year0 + 30 * (month0 - 1) + day0 - 1
+        return {"year": days // 360, "month": (days % 360) // 30 + 1, "day": days % 30 + 1}
+    if calendar == CDTIMENoLeapCalendar:
+        month_starts = NParray([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334], dtype="int64")
+        days += 365 * year0 + month_starts[month0 - 1] + day0 - 1
+        day_of_year = days % 365
+        months = NPsearchsorted(month_starts, day_of_year, side="right")
+        return {"year": days // 365, "month": months, "day": day_of_year - month_starts[months - 1] + 1}
+    # gregorian calendar (the mixed calendar is gregorian after 1582)
+    if year0 > 9999 or (calendar == CDTIMEMixedCalendar and year0 < 1583):
+        return None
+    dates = NPdatetime64(str(year0).zfill(4) + "-" + str(month0).zfill(2) + "-" + str(day0).zfill(2), "D") + \
+        days.astype("timedelta64[D]")
+    months = dates.astype("datetime64[M]")
+    dict_index = {"year": dates.astype("datetime64[Y]").astype("int64") + 1970,
+                  "month": months.astype("int64") % 12 + 1,
+                  "day": (dates - months.astype("datetime64[D]")).astype("int64") + 1}
+    if calendar == CDTIMEMixedCalendar and len(values) > 0 and dict_index["year"].min() < 1583:
+        return None
+    return dict_index
+
+
 def CheckTime(tab1, tab2, frequency="monthly", min_time_steps=None, metric_name="", debug=False, **kwargs):
     """
     #################################################################################
@@ -1072,12 +1433,12 @@ def CheckTime(tab1, tab2, frequency="monthly", min_time_steps=None, metric_name=
         dict_debug = {"shape1": "tab1.shape = " + str(tab1.shape), "shape2": "tab2.shape = " + str(tab2.shape)}
         EnsoErrorsWarnings.debug_mode("\033[93m", "in CheckTime (input)", 20, **dict_debug)
     # gets dates of the first and last the time steps of tab1
-    stime1 = tab1.getTime().asComponentTime()[0]
-    etime1 = tab1.getTime().asComponentTime()[-1]
+    stime1 = TimeComponent(tab1.getTime(), 0)
+    etime1 = TimeComponent(tab1.getTime(), -1)
 
     # gets dates of the first and last the time steps of tab2
-    stime2 = tab2.getTime().asComponentTime()[0]
-    etime2 = tab2.getTime().asComponentTime()[-1]
+    stime2 = TimeComponent(tab2.getTime(), 0)
+    etime2 = TimeComponent(tab2.getTime(), -1)
 
     # retains only the latest start date and the earliest end date
     if stime1.year > stime2.year:
@@ -1116,18 +1477,7 @@ def CheckTime(tab1, tab2, frequency="monthly", min_time_steps=None, metric_name=
     # etime = min(etime1, etime2)
 
     # defines the period between the two dates
-    if frequency == "daily":
-        stime_adjust = CDTIMEcomptime(stime.year, stime.month, stime.day, 0, 0, 0.0)
-        etime_adjust = CDTIMEcomptime(etime.year, etime.month, etime.day, 23, 59, 0)
-    elif frequency == "monthly":
-        etime_day = monthrange(etime.year, etime.month)[-1]
-        stime_adjust = CDTIMEcomptime(stime.year, stime.month, 1, 0, 0, 0.0)
-        etime_adjust = CDTIMEcomptime(etime.year, etime.month, etime_day, 23, 59, 0)
-    elif frequency == "yearly":
-        stime_adjust = CDTIMEcomptime(stime.year, 1, 1, 0, 0, 0.0)
-        etime_adjust = CDTIMEcomptime(etime.year, 12, 31, 23, 59, 0)
-    else:
-        EnsoErrorsWarnings.unknown_frequency(frequency, INSPECTstack())
+    stime_adjust, etime_adjust = AdjustTimePeriod(stime, etime, frequency=frequency)
 
     # retains only the time-period common to both tab1 and tab2
     tab1_sliced = tab1(time=(stime_adjust, etime_adjust))
@@ -1168,6 +1518,91 @@ def CheckTime(tab1, tab2, frequency="monthly", min_time_steps=None, metric_name=
     return tab1_sliced, tab2_sliced, keyerror
 
 
+def CheckTimeList(list_tab, frequency="monthly", min_time_steps=None, metric_name="", debug=False, **kwargs):
+    """
+    #################################################################################
+    Description:
+    Same as CheckTime for any number of arrays
+    The period common to all the arrays is computed once and each array is sliced once
+    #################################################################################
+
+    :param list_tab: list of masked_array
+    :param frequency: string, optional
+        time frequency of the datasets
+        e.g., frequency='monthly'
+    :param min_time_steps: int, optional
+        minimum number of time steps for the metric to make sens
+        e.g., for 30 years of monthly data mintimesteps=360
+    :param metric_name: string, optional
+        name of the metric calling the function
+    :return list_sliced, keyerror: list of masked_array, string
+        arrays sliced on the common period (sharing the time axis of the first one), keyerror is None if no error
+    """
+    # retains only the latest start date and the earliest end date
+    stime = max([TimeComponent(tab.getTime(), 0) for tab in list_tab])
+    etime = min([TimeComponent(tab.getTime(), -1) for tab in list_tab])
+    # defines the period between the two dates
+    stime_adjust, etime_adjust = AdjustTimePeriod(stime, etime, frequency=frequency)
+    # retains only the time-period common to all arrays
+    list_sliced = [tab(time=(stime_adjust, etime_adjust)) for tab in list_tab]
+    list_length = [len(tab) for tab in list_sliced]
+    if debug is True:
+        dict_debug = dict(("shape" + str(ii + 1), "tab" + str(ii + 1) + ".shape = " + str(tab.shape))
+                          for ii, tab in enumerate(list_sliced))
+        EnsoErrorsWarnings.debug_mode("\033[93m", "in CheckTimeList (output)", 20, **dict_debug)
+    if len(set(list_length)) > 1:
+        keyerror1 = "missing time step within the given period"
+    else:
+        keyerror1 = None
+        for tab in list_sliced[1:]:
+            tab.setAxis(0, list_sliced[0].getTime())
+    # checks if the remaining time-period fulfills the minimum length criterion
+    keyerror2 = None
+    if min_time_steps is not None and min(list_length) < min_time_steps:
+        EnsoErrorsWarnings.too_short_time_period(metric_name, min(list_length), min_time_steps, INSPECTstack())
+        keyerror2 = "too short time period (" + " ; ".join(
+            "variable" + str(ii + 1) + ":" + str(nn) for ii, nn in enumerate(list_length)) + ")"
+    # errors
+    if keyerror1 is not None or keyerror2 is not None:
+        keyerror = add_up_errors([keyerror1, keyerror2])
+    else:
+        keyerror = None
+    return list_sliced, keyerror
+
+
+def AdjustTimePeriod(stime, etime, frequency="monthly"):
+    """
+    #################################################################################
+    Description:
+    Extends the given dates to include the whole first and last time steps of the given frequency
+    #################################################################################
+
+    :param stime: cdtime.comptime
+        first date
+    :param etime: cdtime.comptime
+        last date
+    :param frequency: string, optional
+        time frequency of the datasets
+        e.g., frequency='monthly'
+    :return stime_adjust, etime_adjust: cdtime.comptime
+        beginning of the first time step and end of the last time step
+    """
+    stime_adjust, etime_adjust = None, None
+    if frequency == "daily":
+        stime_adjust = CDTIMEcomptime(stime.year, stime.month, stime.day, 0, 0, 0.0)
+        etime_adjust = CDTIMEcomptime(etime.year, etime.month, etime.day, 23, 59, 0)
+    elif frequency == "monthly":
+        etime_day = monthrange(etime.year, etime.month)[-1]
+        stime_adjust = CDTIMEcomptime(stime.year, stime.month, 1, 0, 0, 0.0)
+        etime_adjust = CDTIMEcomptime(etime.year, etime.month, etime_day, 23, 59, 0)
+    elif frequency == "yearly":
+        stime_adjust = CDTIMEcomptime(stime.year, 1, 1, 0, 0, 0.0)
+        etime_adjust = CDTIMEcomptime(etime.year, 12, 31, 23, 59, 0)
+    else:
+        EnsoErrorsWarnings.unknown_frequency(frequency, INSPECTstack())
+    return stime_adjust, etime_adjust
+
+
 def CheckUnits(tab, var_name, name_in_file, units, return_tab_only=True, **kwargs):
     """
     #################################################################################
@@ -1292,15 +1727,12 @@ def Event_selection(tab, frequency, nbr_years_window=None, list_event_years=[]):
     if frequency not in ["daily", "monthly", "yearly"]:
         EnsoErrorsWarnings.unknown_frequency(frequency, INSPECTstack())
     if len(list_event_years) == 0:
-        tax = tab.getTime().asComponentTime()
-        list_event_years = sorted(list(set([tax[ii].year for ii in list(range(len(tax)))])))
+        list_event_years = sorted(list(set(CalendarIndex(tab.getTime())["year"].tolist())))
     else:
         list_event_years = sorted(list_event_years)
     # function to fill array with masked value where the data is not available
     def fill_array(tab, units, freq):
-        y1 = tab.getTime().asComponentTime()[0].year
-        m1 = tab.getTime().asComponentTime()[0].month
-        d1 = tab.getTime().asComponentTime()[0].day
+        time1 = TimeComponent(tab.getTime(), 0)
         if len(tab.shape) == 1:
             tab_out = MV2zeros(nbr_years_window * 12)
         elif len(tab.shape) == 2:
@@ -1311,22 +1743,17 @@ def Event_selection(tab, frequency, nbr_years_window=None, list_event_years=[]):
         axis = CDMS2createAxis(list(range(len(tab_out))), id="time")
         axis.units = units
         tab_out.setAxis(0, axis)
-        for ii in list(range(len(tab))):
-            y2 = tab_out.getTime().asComponentTime()[ii].year
-            m2 = tab_out.getTime().asComponentTime()[ii].month
-            d2 = tab_out.getTime().asComponentTime()[ii].day
-            if freq == "yearly":
-                if y2 == y1:
-                    tab_out[ii:ii + len(tab)] = copy.copy(tab)
-                    break
-            elif freq == "monthly":
-                if y2 == y1 and m2 == m1:
-                    tab_out[ii:ii + len(tab)] = copy.copy(tab)
-                    break
-            elif freq == "daily":
-                if y2 == y1 and m2 == m1 and d2 == d1:
-                    tab_out[ii:ii + len(tab)] = copy.copy(tab)
-                    break
+        # first time step of tab_out (among the len(tab) first ones) with the same date as the first time step of tab
+        dict_index = CalendarIndex(tab_out.getTime())
+        same_date = dict_index["year"][:len(tab)] == time1.year
+        if freq in ["monthly", "daily"]:
+            same_date = same_date & (dict_index["month"][:len(tab)] == time1.month)
+        if freq == "daily":
+            same_date = same_date & (dict_index["day"][:len(tab)] == time1.day)
+        same_date = NPnonzero(same_date)[0]
+        if len(same_date) > 0:
+            ii = int(same_date[0])
+            tab_out[ii:ii + len(tab)] = copy.copy(tab)
         return tab_out
     # compute composite
     if nbr_years_window is not None:
@@ -1371,8 +1798,7 @@ def Event_selection(tab, frequency, nbr_years_window=None, list_event_years=[]):
             axes = axes + tab.getAxisList()[1:]
         composite.setAxisList(axes)
     else:
-        time_ax = tab.getTime().asComponentTime()  # gets component time of tab
-        list_years = [yy.year for yy in time_ax[:]]  # listing years in tab (from component time)
+        list_years = CalendarIndex(tab.getTime())["year"].tolist()  # listing years in tab (from its time axis)
         indices = MV2arange(tab.size)
         # creates a tab of "condition" where True is set when the event is found, False otherwise
         try:
@@ -1387,11 +1813,13 @@ def Event_selection(tab, frequency, nbr_years_window=None, list_event_years=[]):
     return composite
 
 
+@dataset_memoized
 def Composite(tab, list_event_years, frequency, nbr_years_window=None):
     return MV2average(
         Event_selection(tab, frequency, nbr_years_window=nbr_years_window, list_event_years=list_event_years), axis=0)
 
 
+@dataset_memoized
 def DetectEvents(tab, season, threshold, normalization=False, nino=True, compute_season=True, duration=1):
     """
     #################################################################################
@@ -1399,11 +1827,13 @@ def DetectEvents(tab, season, threshold, normalization=False, nino=True, compute
     Detects Nina or Nino events
     These events are detected when 'tab' anomalies during 'season' are above (less) then 'threshold'
     The anomalies can be normalized
-    Uses MV2 (uvcdat) to create an empty array, to create an array of indices, to define conditions, to select the
-    indices depending on the conditions and to select the years of the events
+    All the seasonal anomalies needed are computed in one pass (see SeasonalAnomaliesByYear) and the duration windows
+    are evaluated with cumulative sums
+    'tab' can have a leading axis (e.g., members of an ensemble), in this case all the time series are scanned at once
     #################################################################################
     :param tab: masked_array
         masked_array containing a variable from which the events are detected. Most likely SST
+        the time axis must be the first axis, or the second axis if the first one is the members axis
     :param season: string
         one month (e.g, 'DEC'), two months (e.g., 'DJ'), three months (e.g., 'NDJ'), four months (e.g., 'NDJF'), period
         when the events are detected
@@ -1418,105 +1848,100 @@ def DetectEvents(tab, season, threshold, normalization=False, nino=True, compute
     :param duration: integer, optional
         number of consecutive months/seasons when given threshold must be met to define an ENSO event
     :return list_of_years: list
-        list of years including a detected event
+        list of years including a detected event (list of lists if 'tab' has a members axis)
     """
-    if duration == 1:
-        # Seasonal mean and anomalies
-        if compute_season is True:
-            tab = SeasonalMean(tab, season, compute_anom=True)
-        # Normalization ?
-        if normalization is True:
-            threshold = threshold * float(GENUTILstd(tab, axis=0, centered=1, biased=1))
-        # Initialization
-        tab_threshold = MV2zeros(tab.shape)
-        tab_threshold.fill(threshold)
-        list_years = sorted(list(set([tab.getTime().asComponentTime()[yy].year for yy in range(len(tab))])))
-        indices = MV2arange(len(list_years))
-        # Conditions
-        if nino is True:
-            condition = MV2where(tab > tab_threshold, True, False)
-        else:
-            condition = MV2where(tab < tab_threshold, True, False)
-        # Indices of the events
-        ids = MV2compress(condition, indices)
-        # Events years
-        events = list(MV2take(list_years, ids, axis=0))
-    else:
-        if season == "DEC":
-            lseasons = ["NOV", season, "JAN"]
-            if duration >= 3:
-                lseasons = ["OCT"] + lseasons + ["FEB"]
-            if duration >= 4:
-                lseasons = ["SEP"] + lseasons + ["MAR"]
-            if duration >= 5:
-                lseasons = ["AUG"] + lseasons + ["APR"]
-            if duration >= 6:
-                lseasons = ["JUL"] + lseasons + ["MAY"]
-        elif season == "NDJ":
-            lseasons = ["OND", season, "DJF"]
-            if duration >= 3:
-                lseasons = ["SON"] + lseasons + ["JFM"]
-            if duration >= 4:
-                lseasons = ["ASO"] + lseasons + ["FMA"]
-            if duration >= 5:
-                lseasons = ["JAS"] + lseasons + ["MAM"]
-            if duration >= 6:
-                lseasons = ["JJA"] + lseasons + ["AMJ"]
-        else:
-            lseasons = list()
-            list_strings = ["ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": season",
-                            str().ljust(5) + "unknown season for ENSO event detection: " + str(season)]
-            EnsoErrorsWarnings.my_error(list_strings)
-        # Main seasonal mean and anomalies
-        enso = SeasonalMean(tab, season, compute_anom=True)
-        list_years = [enso.getTime().asComponentTime()[yy].year for yy in range(len(enso))]
-        indices = MV2arange(len(list_years))
-        y0 = list_years[0]
-        enso_by_sea = list()
-        for sea in lseasons:
-            # Seasonal mean and anomalies
-            tmp = SeasonalMean(tab, sea, compute_anom=True)
-            y1 = tmp.getTime().asComponentTime()[0].year
-            if y1 == y0:
-                tmp = tmp[:len(enso)]
-            elif y1+1 == y0:
-                tmp = tmp[1:len(enso)+1]
-            if sea == "DEC" or (season == "NDJ" and sea == "DJF"):
-                y0 += 1
-            enso_by_sea.append(tmp)
-            del tmp, y1
-        enso_by_sea = MV2array(enso_by_sea)
-        # Normalization ?
-        if normalization is True:
-            thr = threshold * float(GENUTILstd(enso, axis=0, centered=1, biased=1))
-        else:
-            thr = copy.deepcopy(threshold)
-        # Initialization
-        tab_threshold = MV2zeros(enso_by_sea.shape)
-        tab_threshold.fill(thr)
-        # Conditions
-        if nino is True:
-            condition = MV2where(enso_by_sea > tab_threshold, 1, 0)
-        else:
-            condition = MV2where(enso_by_sea < tab_threshold, 1, 0)
-        # sum by duration window
-        d_window = MV2zeros(enso_by_sea.shape)
-        d_window = d_window[:len(lseasons) - duration + 1]
-        for ii in range(len(d_window)):
-            d_window[ii] = MV2sum(condition[ii: ii + duration], axis=0)
-        # test if threshold met during at least duration
-        tab_threshold = MV2zeros(d_window.shape)
-        tab_threshold.fill(duration)
-        condition = MV2where(d_window >= tab_threshold, 1, 0)
-        condition = MV2sum(condition, axis=0)
-        condition = MV2where(condition >= 1, True, False)
-        # Indices of the events
-        ids = MV2compress(condition, indices)
-        # Events years
-        events = list(MV2take(list_years, ids, axis=0))
+    members = (len(tab.shape) > 1 and tab.getOrder().index("t") == 1)
+    if compute_season is False and duration == 1:
+        # 'tab' is already a time series of seasonal anomalies
+        list_years = CalendarIndex(tab.getTime())["year"].tolist()
+        anomalies = NPma__array(tab, dtype="float64")
+        if members is False:
+            anomalies = anomalies.reshape((1, len(anomalies)))
+        anomalies = anomalies.reshape((1,) + anomalies.shape)
+    else:
+        # seasonal mean anomalies of the main season and of the 'duration - 1' seasons before and after it
+        anomalies, list_years = SeasonalAnomaliesByYear(tab, season, list_offsets=list(range(1 - duration, duration)))
+        if members is False:
+            anomalies = anomalies.reshape((anomalies.shape[0], 1, anomalies.shape[1]))
+    # Normalization ?
+    if normalization is True:
+        # standard deviation of the main season (centered and biased), one value per member
+        enso = anomalies[duration - 1]
+        thr = threshold * enso.std(axis=-1).filled(0.)
+        thr = thr.reshape((1, len(thr), 1))
+    else:
+        thr = copy.deepcopy(threshold)
+    # Conditions
+    if nino is True:
+        condition = anomalies > thr
+    else:
+        condition = anomalies < thr
+    condition = NPma__array(condition).filled(False).astype("int32")
+    # number of seasons meeting the threshold in each window of 'duration' consecutive seasons, each window includes
+    # the main season
+    condition = NPcumsum(NPconcatenate((NPzeros((1,) + condition.shape[1:], dtype="int32"), condition), axis=0), axis=0)
+    d_window = condition[duration:] - condition[:len(condition) - duration]
+    condition = NPany(d_window >= duration, axis=0)
+    # Events years
+    events = [[list_years[ii] for ii in NPnonzero(condition[mm])[0]] for mm in range(len(condition))]
+    if members is False:
+        events = events[0]
     return events
 
 
+def DetectEventsMembers(list_tab, season, threshold, normalization=False):
+    """
+    #################################################################################
+    Description:
+    Detects Nino and Nina events in the time series of all the members of an ensemble at once
+    The time series sharing the same time axis are stacked along a members axis and scanned by one call of DetectEvents
+    per sign of 'threshold'
+    The event years of each member are kept in ensemble_memo as the outputs of the calls
+    DetectEvents(tab, season, threshold, normalization=normalization, nino=True) and
+    DetectEvents(tab, season, -threshold, normalization=normalization, nino=False) made by the metrics
+    #################################################################################
+    :param list_tab: list
+        list of masked_arrays, time series (one per member) from which the events are detected. Most likely SST
+    :param season: string
+        one month (e.g, 'DEC'), two months (e.g., 'DJ'), three months (e.g., 'NDJ'), four months (e.g., 'NDJF'), period
+        when the events are detected
+    :param threshold: float
+        threshold to define El Nino events (e.g., 0.75), -threshold defines La Nina events
+    :param normalization: boolean, optional
+        True if events are detected based on the standard deviation, if not pass anything but True
+
+    :return:
+    """
+    # time series grouped by time axis
+    dict_groups = dict()
+    for tab in list_tab:
+        if len(tab.shape) != 1 or tab.getTime() is None:
+            continue
+        time_axis = tab.getTime()
+        sha = HASHLIBsha1(str((getattr(time_axis, "units", ""), getattr(time_axis, "calendar", ""))).encode("utf-8"))
+        sha.update(NParray(time_axis[:]).tobytes())
+        try:
+            dict_groups[sha.hexdigest()].append(tab)
+        except KeyError:
+            dict_groups[sha.hexdigest()] = [tab]
+    dict_memo = ensemble_memo.setdefault("DetectEvents", dict())
+    for list_group in list(dict_groups.values()):
+        # (members, time) array
+        stack = NPma__masked_all((len(list_group), len(list_group[0])), dtype="float64")
+        for ii, tab in enumerate(list_group):
+            stack[ii] = NPma__array(tab, dtype="float64")
+        members_axis = CDMS2createAxis(NParange(len(list_group), dtype="float64"), id="members")
+        stack = CDMS2createVariable(stack, axes=[members_axis, list_group[0].getTime()], id="members")
+        for nino, thr in [(True, threshold), (False, -threshold)]:
+            events = DetectEvents(stack, season, thr, normalization=normalization, nino=nino)
+            for tab, list_years in zip(list_group, events):
+                memo_key = DatasetMemoKey(
+                    "DetectEvents", [tab, season, thr], {"normalization": normalization, "nino": nino})
+                if memo_key is not None:
+                    dict_memo[memo_key] = [False, list_years]
+    return
+
+
 def Detrend(tab, info, axis=0, method="linear", bp=0):
     """
     #################################################################################
@@ -1727,6 +2152,9 @@ def get_year_by_year(tab, frequency="monthly"):
     #################################################################################
     Description:
     Reshape array to a year by year array
+    Each time step is placed at its (year, step of the year) position in one pass, incomplete first and last years are
+    padded with masked values
+    Daily data are placed on a 365-day year (29 February is dropped)
     #################################################################################
 
     :param tab: masked_array
@@ -1737,53 +2165,41 @@ def get_year_by_year(tab, frequency="monthly"):
         array of the year by year values
     """
     tab = tab.reorder("t...")
-    time_ax = tab.getTime().asComponentTime()
-    myshape = [1] + [ss for ss in tab.shape[1:]]
-    zeros = MV2zeros(myshape)
-    zeros = MV2masked_where(zeros == 0, zeros)
+    dict_index = CalendarIndex(tab.getTime())
+    years, months = dict_index["year"], dict_index["month"]
     if frequency == "daily":
-        days = MV2array(list(tt.day for tt in time_ax))
-        months = MV2array(list(tt.month for tt in time_ax))
-        months = MV2array([(mm*100)+dd for dd, mm in zip(days, months)])
+        # day of the year in a 365-day calendar
+        days = dict_index["day"]
+        first_day = NPcumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+        keep = NPnonzero((months != 2) | (days != 29))[0]
+        steps = first_day[months[keep] - 1] + days[keep] - 1
         tmm = CDMS2createAxis(list(range(365)), id="days")
-        m1 = time_ax[0].day
-        m2 = time_ax[-1].day
         t2 = 365
     elif frequency == "monthly":
-        months = MV2array(list(tt.month for tt in time_ax))
+        keep = NParange(len(years))
+        steps = months - 1
         tmm = CDMS2createAxis(list(range(12)), id="months")
-        m1 = time_ax[0].month
-        m2 = time_ax[-1].month
         t2 = 12
     else:
         EnsoErrorsWarnings.unknown_frequency(frequency, INSPECTstack())
-    years = sorted(set(MV2array(list(tt.year for tt in time_ax))))
-    tyy = CDMS2createAxis(MV2array(years, dtype="int32"), id="years")
+    list_years = sorted(set(years))
+    tyy = CDMS2createAxis(NParray(list_years, dtype="int32"), id="years")
     axes = [tyy] + [tmm]
-    val = sorted(set(months))
-    tab_out = list()
-    if frequency == "daily":
-        val.remove(129)
-    for ii in val:
-        tmp = tab.compress(months == ii, axis=0)
-        if m1 != 1 and len(tmp) != len(years):
-            tmp = MV2concatenate((zeros, tmp))
-        if m2 != t2 and len(tmp) != len(years):
-            tmp = MV2concatenate((tmp, zeros))
-        tab_out.append(tmp)
-    tab_out = MV2array(tab_out)
-    tab_out = MV2masked_where(tab_out == 0, tab_out)
-    tab_out = tab_out.reorder("10")
+    # (year, step) array filled at once, missing steps are masked
+    tab_out = NPma__masked_all((len(list_years), t2) + tab.shape[1:], dtype=tab.dtype)
+    tab_out[years[keep] - list_years[0], steps] = NPma__array(tab)[keep]
+    # zeros are masked and every time step has the mask of the first one
+    mask_out = NPma__getmaskarray(tab_out)
+    mask_out |= (tab_out.data == 0)
     if len(tab.shape) == 1:
+        tab_out.mask = mask_out
         tab_out = CDMS2createVariable(tab_out, axes=axes, attributes=tab.attributes, id=tab.id)
     else:
         axes = axes + tab.getAxisList()[1:]
         grid = tab[0].getGrid()
-        mask = tab[0].mask
-        mask_out = MV2zeros(tab_out.shape)
-        mask_out[:, :] = mask
-        tab_out = CDMS2createVariable(tab_out, axes=axes, grid=grid, mask=mask_out, attributes=tab.attributes,
-                                      id=tab.id)
+        mask_out |= NPma__getmaskarray(tab[0])
+        tab_out.mask = mask_out
+        tab_out = CDMS2createVariable(tab_out, axes=axes, grid=grid, attributes=tab.attributes, id=tab.id)
     return tab_out
 
 
@@ -1806,7 +2222,8 @@ def Normalize(tab, frequency):
     """
     #################################################################################
     Description:
-    Removes trend along 'axis' from 'tab'
+    Divides each time step of 'tab' by the standard deviation of this step of the year (e.g., all Januaries)
+    The time series is viewed as a (year, step of the year, ...) array, no per-year copy is made
     #################################################################################
 
     :param tab: array
@@ -1818,7 +2235,7 @@ def Normalize(tab, frequency):
         normalized data
     """
     keyerror = None
-    axes = tab.getAxisList()
+    tab_out = None
     if frequency == "daily":
         time_steps_per_year = 365
     elif frequency == "monthly":
@@ -1831,7 +2248,6 @@ def Normalize(tab, frequency):
         EnsoErrorsWarnings.unknown_frequency(frequency, INSPECTstack())
     if time_steps_per_year is not None:
         if len(tab) % time_steps_per_year != 0:
-            tab_out = None
             keyerror = "cannot perform normalization: the function can only handle full years (len(tab) = " +\
                        str(len(tab)) + ")"
             list_strings = [
@@ -1843,30 +2259,23 @@ def Normalize(tab, frequency):
                 str(len(tab) / float(time_steps_per_year)) + " years",
             ]
             EnsoErrorsWarnings.my_warning(list_strings)
-    else:
-        # reshape tab like [yy,nb]
-        new_tab = list()
-        for yy in list(range(len(tab) // time_steps_per_year)):
-            new_tab.append(tab[yy * time_steps_per_year:(yy + 1) * time_steps_per_year])
-        new_tab = MV2array(new_tab)
-        std = MV2zeros(new_tab[0].shape)
-        for dd in list(range(time_steps_per_year)):
-            std[dd] = float(GENUTILstd(new_tab[:,dd], weights=None, axis=0, centered=1, biased=1))
-        tab_out = copy.copy(tab)
-        for yy in list(range(len(tab) / time_steps_per_year)):
-            tab_out[yy * time_steps_per_year:(yy + 1) * time_steps_per_year] = \
-                tab_out[yy * time_steps_per_year:(yy + 1) * time_steps_per_year] / std
-        if len(tab.shape) == 1:
-            tab_out = CDMS2createVariable(tab_out, axes=axes, attributes=tab.attributes, id=tab.id)
         else:
-            axes = axes + tab.getAxisList()[1:]
-            grid = tab.getGrid()
-            mask = tab.mask
-            tab_out = CDMS2createVariable(tab_out, axes=axes, grid=grid, mask=mask, attributes=tab.attributes, id=tab.id)
+            # reshape tab like [yy,nb,...] (view)
+            new_tab = NPma__array(tab, copy=False).reshape(
+                (len(tab) // time_steps_per_year, time_steps_per_year) + tab.shape[1:])
+            # biased and centered standard deviation of each step of the year
+            std = new_tab.std(axis=0)
+            tab_out = (new_tab / std).reshape(tab.shape)
+            if len(tab.shape) == 1:
+                tab_out = CDMS2createVariable(tab_out, axes=tab.getAxisList(), attributes=tab.attributes, id=tab.id)
+            else:
+                tab_out = CDMS2createVariable(tab_out, axes=tab.getAxisList(), grid=tab.getGrid(),
+                                              attributes=tab.attributes, id=tab.id)
     return tab_out, keyerror
 
 
-def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency=None, **kwargs):
+@netcdf_locked
+def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency=None, reduction=None, **kwargs):
     """
     #################################################################################
     Description:
@@ -1879,8 +2288,10 @@ def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency
         string of the path to the file and name of the file to read
     :param varname: string
         name of the variable to read from 'filename'
-    :param box: string
+    :param box: string or dict
         name of a region to select, must be defined in EnsoCollectionsLib.ReferenceRegions
+        or dictionary defining the region like EnsoCollectionsLib.ReferenceRegions
+        e.g., box={'latitude': (-15., 15.), 'longitude': (120., 285.)}
     :param time_bounds: tuple, optional
         tuple of the first and last dates to extract from the files (strings)
         e.g., time_bounds=('1979-01-01T00:00:00', '2017-01-01T00:00:00')
@@ -1889,30 +2300,62 @@ def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency
         time frequency of the datasets
         e.g., frequency='monthly'
         default value is None
+    :param reduction: dict, optional
+        when the variable is read by time chunks, each chunk is reduced by reduction['function'] (e.g., masked and
+        averaged horizontally) and only the reduced chunks are kept (see ReadByTimeChunks), reduction['done'] is set to
+        True if the returned masked_array is reduced
+        default value is None, the whole field is returned
 
     :return tab: masked_array
         masked_array containing 'varname' in 'box'
     """
+    if isinstance(box, dict):
+        box_key = (tuple(box["latitude"]), tuple(box["longitude"]))
+    else:
+        box_key = box
+    time_key = None if time_bounds is None else tuple(time_bounds)
+    # variable already read (e.g., by another metric of the collection)
+    tab = read_cache.get((filename, varname, box_key, time_key, frequency))
+    if tab is not None:
+        return tab.clone()
+    # a larger region including 'box' is read once for this variable, 'box' is selected in memory
+    superset = read_plan.get((filename, varname))
+    if isinstance(box, str) and superset is not None and read_cache.enabled() is True and \
+            RegionInRegion(ReferenceRegions(box), superset["region"]) is True:
+        superset_key = (filename, varname, (tuple(superset["region"]["latitude"]),
+                                            tuple(superset["region"]["longitude"])), time_key, frequency)
+        tab = read_cache.get(superset_key)
+        if tab is None and superset["nbytes"] <= read_cache.max_size:
+            tab = ReadAndSelectRegion(filename, varname, box=superset["region"], time_bounds=time_bounds,
+                                      frequency=frequency)
+            if read_cache.get(superset_key) is None:
+                # the superset could not be stored in the cache, the next regions are read directly from the file
+                read_plan.pop((filename, varname), None)
+        if tab is not None:
+            # the selection is copied: the caller may modify it in place and the superset is shared through the cache
+            region_ref = ReferenceRegions(box)
+            return tab(latitude=region_ref["latitude"], longitude=region_ref["longitude"]).clone()
     # Temp corrections for cdms2 to find the right axis
     CDMS2setAutoBounds("on")
     # Open file and get time dimension
     fi = CDMS2open(filename)
-    if box is None:  # no box given
-        if time_bounds is None:  # no time period given
-            # read file
-            tab = fi(varname)
-        else:  # time period given by the user
-            # read file
-            tab = fi(varname, time=time_bounds)
-    else:  # box given by the user
+    dict_selection = dict()
+    if time_bounds is not None:  # time period given by the user
+        dict_selection["time"] = time_bounds
+    if box is not None:  # box given by the user
         # define box
-        region_ref = ReferenceRegions(box)
-        if time_bounds is None:  # no time period given
-            #  read file
-            tab = fi(varname, latitude=region_ref["latitude"], longitude=region_ref["longitude"])
-        else:
-            # read file
-            tab = fi(varname, time=time_bounds, latitude=region_ref["latitude"], longitude=region_ref["longitude"])
+        region_ref = box if isinstance(box, dict) else ReferenceRegions(box)
+        dict_selection.update({"latitude": region_ref["latitude"], "longitude": region_ref["longitude"]})
+    # read file (by chunks of time steps if the variable is too large)
+    tab = None
+    if read_chunk["max_size"] > 0:
+        tab = ReadByTimeChunks(fi, varname, read_chunk["max_size"], reduction=reduction,
+                               masked_value=-1000 if "HadISST" in filename or "hadisst" in filename else None,
+                               **dict_selection)
+        if tab is not None and reduction is not None:
+            reduction["done"] = True
+    if tab is None:
+        tab = fi(varname, **dict_selection)
     # sign correction
     try:
         att1 = tab.attributes["standard_name"].lower().replace(" ", "_")
@@ -1933,7 +2376,7 @@ def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency
             print("\033[93m" + str().ljust(25) + varname + " sign reversed" + "\033[0m")
             print("\033[93m" + str().ljust(5) + "range old = " + "{0:+.2f}".format(round(MV2minimum(tab), 2)) + " to " +
                   "{0:+.2f}".format(round(MV2maximum(tab), 2)) + "\033[0m")
-            tab = -1 * tab
+            tab *= -1
             print("\033[93m" + str().ljust(5) + "range new = " + "{0:+.2f}".format(round(MV2minimum(tab), 2)) + " to " +
                   "{0:+.2f}".format(round(MV2maximum(tab), 2)) + "\033[0m")
             reversed_sign = True
@@ -1942,12 +2385,12 @@ def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency
         # this section checks if one time step has not been included by error at the beginning or the end of the time
         # series
         if isinstance(time_bounds[0], str):
-            if str(tab.getTime().asComponentTime()[0]) < time_bounds[0]:
+            if str(TimeComponent(tab.getTime(), 0)) < time_bounds[0]:
                 tab = tab[1:]
-            if str(tab.getTime().asComponentTime()[-1]) > time_bounds[1]:
+            if str(TimeComponent(tab.getTime(), -1)) > time_bounds[1]:
                 tab = tab[:-1]
     time_ax = tab.getTime()
-    time_units = "days since " + str(time_ax.asComponentTime()[0].year) + "-01-01 12:00:00"
+    time_units = "days since " + str(TimeComponent(time_ax, 0).year) + "-01-01 12:00:00"
     time_ax.id = "time"
     time_ax.toRelativeTime(time_units)
     tab.setAxis(0, time_ax)
@@ -1965,21 +2408,19 @@ def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency
     if tab.getLevel():
         if len(tab.getLevel()) == 1:
             tab = tab(squeeze=1)
+    # masks are modified in place, no copy of the data is made
+    mask_nd = NPma__getmaskarray(tab)
     # HadISST has -1000 values... mask them
     if "HadISST" in filename or "hadisst" in filename:
-        tab = MV2masked_where(tab == -1000, tab)
+        mask_nd |= (tab.data == -1000)
     # check if the mask is constant through time
-    if len(NPwhere(tab[0].mask != tab[1:].mask)[0]) > 0:
+    mask = NPany(mask_nd, axis=0)
+    if NPany(mask != NPall(mask_nd, axis=0)):
         # the mask is not constant -> make it constant
-        # sum mask through time
-        mask = MV2sum(tab.mask.astype("f"), axis=0)
         # mask where at least one time step is masked
-        mask = MV2where(mask > 0, True, False)
-        # create a mask the same size as the original data
-        mask_nd = MV2zeros(tab.shape)
-        mask_nd[:] = mask
-        # apply mask to original data
-        tab = MV2masked_where(mask_nd, tab)
+        mask_nd |= mask
+    tab.mask = mask_nd
+    del mask, mask_nd
     # check taux sign
     if varname in ["taux", "tauu", "tauuo", "uflx"] and reversed_sign is False:
         # define box
@@ -1999,9 +2440,104 @@ def ReadAndSelectRegion(filename, varname, box=None, time_bounds=None, frequency
                       str(float(taux)) + ")" + "\033[0m")
                 tab = -1 * tab
     fi.close()
+    if read_cache.enabled() is True and (reduction is None or reduction["done"] is False):
+        read_cache.set((filename, varname, box_key, time_key, frequency), tab.clone())
     return tab
 
 
+def ReadByTimeChunks(fi, varname, max_size, time=None, reduction=None, masked_value=None, **kwargs):
+    """
+    #################################################################################
+    Description:
+    Reads the given 'varname' from the given opened file by chunks of time steps of at most 'max_size' bytes
+    Without 'reduction', each chunk is copied in an array allocated once, the memory needed is the size of the variable
+    plus the size of one chunk (instead of about twice the size of the variable when cdms2 reads it at once)
+    With 'reduction', each chunk is masked as in ReadAndSelectRegion (the mask is constant through time) and reduced,
+    only the reduced chunks are kept, the memory needed is the size of one chunk plus the size of the reduced variable
+    #################################################################################
+
+    :param fi: cdms2 dataset
+        file opened by cdms2
+    :param varname: string
+        name of the variable to read from 'fi', time must be its first axis
+    :param max_size: float
+        maximum size (in bytes) of a chunk
+    :param time: tuple, optional
+        tuple of the first and last dates to extract from the file (strings)
+        default value is None, the whole time axis is read
+    :param reduction: dict, optional
+        reduction['function'] reduces a masked chunk (e.g., averages it horizontally) without changing its time axis,
+        it returns None if the chunk cannot be reduced
+        default value is None, the whole field is read
+    :param masked_value: float, optional
+        value to mask (e.g., -1000 in HadISST), only used with 'reduction'
+        default value is None
+    usual kwargs:
+    :param latitude: tuple, optional
+        latitude bounds to select (same as cdms2)
+    :param longitude: tuple, optional
+        longitude bounds to select (same as cdms2)
+
+    :return tab: masked_array or None
+        masked_array containing 'varname' (reduced if 'reduction' is given), None if 'varname' has no time axis, if the
+        given period is not in the file, if it fits in one chunk (it can be read at once) or if a chunk cannot be
+        reduced
+    """
+    time_ax = fi[varname].getTime()
+    if time_ax is None or fi[varname].getOrder()[0] != "t":
+        return None
+    if time is None:
+        first, last = 0, len(time_ax)
+    else:
+        interval = time_ax.mapInterval(time)
+        if interval is None:
+            return None
+        first, last = interval[0], interval[1]
+    # size of one time step
+    tab = fi(varname, time=slice(first, first + 1), **kwargs)
+    nbr_steps = max(1, int(max_size // max(1, tab.size * tab.dtype.itemsize)))
+    if last - first <= nbr_steps:
+        return None
+    list_chunks = [(tt, min(tt + nbr_steps, last)) for tt in range(first, last, nbr_steps)]
+    if reduction is None:
+        data = NPma__masked_all((last - first,) + tab.shape[1:], dtype=tab.dtype)
+        for t1, t2 in list_chunks:
+            chunk = fi(varname, time=slice(t1, t2), **kwargs)
+            data[t1 - first: t2 - first] = chunk
+            del chunk
+        axes = [time_ax.subAxis(first, last)] + tab.getAxisList()[1:]
+        return CDMS2createVariable(data, axes=axes, grid=tab.getGrid(), attributes=tab.attributes, id=tab.id)
+    # a point masked at one time step is masked at all time steps: the mask of the previous chunks is applied to each
+    # chunk, the chunks reduced before the mask was extended by a later chunk are read and reduced again
+    mask, data, list_nbr_masked = None, None, list()
+    for redo in [False, True]:
+        for ii, (t1, t2) in enumerate(list_chunks):
+            if redo is True and list_nbr_masked[ii] == int(NPsum(mask)):
+                continue
+            chunk = fi(varname, time=slice(t1, t2), **kwargs)
+            if chunk.getLevel() is not None and len(chunk.getLevel()) == 1:
+                chunk = chunk(squeeze=1)
+            mask_nd = NPma__getmaskarray(chunk)
+            if masked_value is not None:
+                mask_nd |= (chunk.data == masked_value)
+            mask = NPany(mask_nd, axis=0) if mask is None else (mask | NPany(mask_nd, axis=0))
+            mask_nd |= mask
+            chunk.mask = mask_nd
+            del mask_nd
+            if redo is False:
+                list_nbr_masked.append(int(NPsum(mask)))
+            reduced = reduction["function"](chunk)
+            if reduced is None:
+                return None
+            if data is None:
+                data = NPma__masked_all((last - first,) + reduced.shape[1:], dtype=reduced.dtype)
+                axes = [time_ax.subAxis(first, last)] + reduced.getAxisList()[1:]
+            data[t1 - first: t2 - first] = reduced
+            del chunk, reduced
+    return CDMS2createVariable(data, axes=axes, attributes=tab.attributes, id=tab.id)
+
+
+@netcdf_locked
 def ReadAreaSelectRegion(filename, areaname='', box=None, **kwargs):
     """
     #################################################################################
@@ -2021,6 +2557,11 @@ def ReadAreaSelectRegion(filename, areaname='', box=None, **kwargs):
     :return area: masked_array
         masked_array containing areacell in 'box'
     """
+    # areacell already read (e.g., for another variable or metric)
+    cache_key = ("ReadAreaSelectRegion", filename, areaname, box)
+    cached = fx_cache.get(cache_key)
+    if cached is not None:
+        return None if cached[0] is None else cached[0].clone()
     # Temp corrections for cdms2 to find the right axis
     CDMS2setAutoBounds('on')
     # Open file and get time dimension
@@ -2058,9 +2599,11 @@ def ReadAreaSelectRegion(filename, areaname='', box=None, **kwargs):
                     except:
                         areacell = None
     fi.close()
+    fx_cache.set(cache_key, [None if areacell is None else areacell.clone()])
     return areacell
 
 
+@netcdf_locked
 def ReadLandmaskSelectRegion(tab, filename, landmaskname='', box=None, **kwargs):
     """
     #################################################################################
@@ -2080,6 +2623,11 @@ def ReadLandmaskSelectRegion(tab, filename, landmaskname='', box=None, **kwargs)
     :return area: masked_array
         masked_array containing landmask in 'box'
     """
+    # landmask already read or estimated on this grid (e.g., for another variable or metric)
+    cache_key = ("ReadLandmaskSelectRegion", filename, landmaskname, box, GridKey(tab))
+    cached = fx_cache.get(cache_key)
+    if cached is not None:
+        return cached[0].clone()
     # Temp corrections for cdms2 to find the right axis
     CDMS2setAutoBounds('on')
     # Get landmask
@@ -2129,10 +2677,126 @@ def ReadLandmaskSelectRegion(tab, filename, landmaskname='', box=None, **kwargs)
             region_ref = ReferenceRegions(box)
             # subset
             landmask = landmask(latitude=region_ref['latitude'], longitude=region_ref['longitude'])
+    fx_cache.set(cache_key, [landmask.clone()])
     # Return
     return landmask
 
 
+def RegionInRegion(region1, region2):
+    """
+    #################################################################################
+    Description:
+    Tests if 'region1' is included in 'region2'
+    #################################################################################
+
+    :param region1: dict
+        region defined like in EnsoCollectionsLib.ReferenceRegions (with 'latitude' and 'longitude' keys)
+    :param region2: dict
+        region defined like in EnsoCollectionsLib.ReferenceRegions (with 'latitude' and 'longitude' keys)
+
+    :return: boolean
+        True if 'region1' is included in 'region2'
+    """
+    lat1, lon1 = region1["latitude"], region1["longitude"]
+    lat2, lon2 = region2["latitude"], region2["longitude"]
+    return lat2[0] <= lat1[0] and lat1[1] <= lat2[1] and lon2[0] <= lon1[0] and lon1[1] <= lon2[1]
+
+
+def RegionSuperset(list_regions):
+    """
+    #################################################################################
+    Description:
+    Computes the smallest region including all the given regions
+    Regions crossing the 0-360 longitude boundary (e.g., 'MED') are not included in the superset
+    #################################################################################
+
+    :param list_regions: list
+        list of names of regions, must be defined in EnsoCollectionsLib.ReferenceRegions
+
+    :return superset: dict or None
+        region including all given regions {'latitude': (lat1, lat2), 'longitude': (lon1, lon2)}, None if no region
+        can be included
+    """
+    list_ref = [ReferenceRegions(reg) for reg in sorted(set(list_regions))]
+    list_ref = [ref for ref in list_ref if 0 <= ref["longitude"][0] and ref["longitude"][1] <= 360]
+    if len(list_ref) == 0:
+        return None
+    superset = {
+        "latitude": (min(ref["latitude"][0] for ref in list_ref), max(ref["latitude"][1] for ref in list_ref)),
+        "longitude": (min(ref["longitude"][0] for ref in list_ref), max(ref["longitude"][1] for ref in list_ref))}
+    return superset
+
+
+@netcdf_locked
+def EstimateReadSize(filename, varname, region):
+    """
+    #################################################################################
+    Description:
+    Estimates the size (in bytes) of the given 'varname' read from the given 'filename' in the given 'region' (all time
+    steps), from the shape, type and horizontal axes of the variable in the file
+    #################################################################################
+
+    :param filename: string
+        string of the path to the file and name of the file to read
+    :param varname: string
+        name of the variable to read from 'filename'
+    :param region: dict
+        dictionary defining the region like EnsoCollectionsLib.ReferenceRegions
+        e.g., region={'latitude': (-15., 15.), 'longitude': (120., 285.)}
+
+    :return nbytes: integer or None
+        estimated size of the data and of its mask, None if the variable cannot be inspected
+    """
+    try:
+        fi = CDMS2open(filename)
+        try:
+            var = fi[varname]
+            nbytes = float(NPproduct(var.shape)) * (NPdtype(var.typecode()).itemsize + 1)
+            lat, lon = var.getLatitude(), var.getLongitude()
+            if lat is not None and len(lat) > 0:
+                lat = NParray(lat[:])
+                nbytes *= float(NPsum((lat >= region["latitude"][0]) & (lat <= region["latitude"][1]))) / len(lat)
+            if lon is not None and len(lon) > 0:
+                lon = NParray(lon[:]) % 360
+                nbytes *= float(NPsum((lon >= region["longitude"][0]) & (lon <= region["longitude"][1]))) / len(lon)
+        finally:
+            fi.close()
+    except Exception:
+        return None
+    return int(nbytes)
+
+
+def SetReadPlan(dict_regions):
+    """
+    #################################################################################
+    Description:
+    Sets the superset region read once by ReadAndSelectRegion for each given (filename, varname)
+    The superset is kept in 'read_cache' and every region it includes is selected in memory instead of being read
+    from the file again
+    Given (filename, varname) needing only one region are not planned ('read_cache' already avoids rereading them)
+    A superset larger than the cache (e.g., the whole globe of a daily or high resolution field when a variable is used
+    for both 'global' and 'nino3.4') is not planned either, the regions are then read directly from the file
+    #################################################################################
+
+    :param dict_regions: dict
+        dictionary {(filename, varname): list of regions} listing all the regions needed for each variable
+        regions must be defined in EnsoCollectionsLib.ReferenceRegions
+        an empty dictionary removes the current read plan
+
+    :return:
+    """
+    read_plan.clear()
+    for key, list_regions in dict_regions.items():
+        if len(set(list_regions)) > 1:
+            superset = RegionSuperset(list_regions)
+            if superset is None:
+                continue
+            nbytes = EstimateReadSize(key[0], key[1], superset)
+            if nbytes is not None and nbytes <= read_cache.max_size:
+                read_plan[key] = {"region": superset, "nbytes": nbytes}
+    return
+
+
 def EstimateLandmask(d):
     """
     #################################################################################
@@ -2158,15 +2822,40 @@ def EstimateLandmask(d):
     return lmsk
 
 
-def Regrid(tab_to_regrid, newgrid, missing=None, order=None, mask=None, regridder='cdms', regridTool='esmf',
-           regridMethod='linear', **kwargs):
+def GridKey(tab):
     """
     #################################################################################
     Description:
-    Regrids 'tab_to_regrid' to 'togrid'
+    Computes a key identifying the horizontal grid of the given array (shape and coordinates of its latitude and
+    longitude), used to share the fields depending only on the grid (see fx_cache)
     #################################################################################
 
-    for more information:
+    :param tab: masked_array
+        masked_array (uvcdat cdms2)
+
+    :return key: string
+        hexadecimal key
+    """
+    sha = HASHLIBsha1()
+    for axis in [tab.getLatitude(), tab.getLongitude()]:
+        if axis is None:
+            sha.update(b"None")
+        else:
+            sha.update(str(axis.shape).encode("utf-8"))
+            sha.update(NParray(axis[:]).tobytes())
+    return sha.hexdigest()
+
+
+@dataset_memoized
+def Regrid(tab_to_regrid, newgrid, missing=None, order=None, mask=None, regridder='cdms', regridTool='esmf',
+           regridMethod='linear', **kwargs):
+    """
+    #################################################################################
+    Description:
+    Regrids 'tab_to_regrid' to 'togrid'
+    #################################################################################
+
+    for more information:
     import cdms2
     help(cdms2.avariable)
 
@@ -2242,7 +2931,11 @@ def Regrid(tab_to_regrid, newgrid, missing=None, order=None, mask=None, regridde
                 str().ljust(10) + "known regridMethod: " + str(list_method)]
             EnsoErrorsWarnings.my_error(list_strings)
     # test the given 'newgrid'
-    if isinstance(newgrid, str) or newgrid is None:
+    if (isinstance(newgrid, str) or newgrid is None) and \
+            (kwargs.get("newgrid_name"), kwargs.get("region")) in list(newgrid_cache.keys()):
+        # this grid has already been created
+        newgrid = newgrid_cache[(kwargs["newgrid_name"], kwargs["region"])]
+    elif isinstance(newgrid, str) or newgrid is None:
         #
         # newgrid is not a grid, so a grid will be created
         # to do this, kwargs['newgrid_name'] and kwargs['region'] must be defined
@@ -2299,6 +2992,7 @@ def Regrid(tab_to_regrid, newgrid, missing=None, order=None, mask=None, regridde
         # create grid
         newgrid = CDMS2createRectGrid(lat, lon, "yx", type=GridType, mask=None)
         newgrid.id = kwargs["newgrid_name"]
+        newgrid_cache[(kwargs["newgrid_name"], kwargs["region"])] = newgrid
     #
     # regrid
     #
@@ -2308,8 +3002,14 @@ def Regrid(tab_to_regrid, newgrid, missing=None, order=None, mask=None, regridde
         if len(tab_to_regrid.shape) == 3 and (axis.id == "months" or axis.id == "years"):
             axis.id = "time"
             tab_to_regrid.setAxis(0, axis)
-        new_tab = tab_to_regrid.regrid(newgrid, missing=missing, order=order, mask=mask, regridTool=regridTool,
-                                       regridMethod=regridMethod)
+        new_tab = None
+        if regridTool in ["esmf", "libcf"] and regridMethod in ["linear", "patch"] and missing is None and \
+                order is None and mask is None:
+            # reuses the regridder (and its weights) if this source grid has already been regridded to newgrid
+            new_tab = RegridCached(tab_to_regrid, newgrid, regridTool=regridTool, regridMethod=regridMethod)
+        if new_tab is None:
+            new_tab = tab_to_regrid.regrid(newgrid, missing=missing, order=order, mask=mask, regridTool=regridTool,
+                                           regridMethod=regridMethod)
         axis = tab_to_regrid.getAxis(0)
         axis.id = idname
         tab_to_regrid.setAxis(0, axis)
@@ -2321,6 +3021,59 @@ def Regrid(tab_to_regrid, newgrid, missing=None, order=None, mask=None, regridde
     return new_tab
 
 
+def RegridCached(tab_to_regrid, newgrid, regridTool='esmf', regridMethod='linear'):
+    """
+    #################################################################################
+    Description:
+    Regrids 'tab_to_regrid' to 'newgrid' with a regridder kept in 'regrid_cache'
+    Computing the regridding weights is the most expensive part of the regridding, so the regridder is computed once
+    per source grid, source mask, destination grid, regridTool and regridMethod and then reused (e.g., for all the
+    metrics and observational datasets regridded to 'generic_1x1deg')
+    #################################################################################
+
+    for more information:
+    import cdms2
+    help(cdms2.CdmsRegrid)
+
+    :param tab_to_regrid: masked_array
+        masked_array to regrid (must include a CDMS grid!)
+    :param newgrid: CDMS grid
+        destination grid
+    :param regridTool: string, optional
+        regridding tools (either 'esmf', 'libcf')
+        default value is 'esmf'
+    :param regridMethod: string, optional
+        regridding methods ('linear' or 'patch' for 'esmf', 'linear' for 'libcf')
+        default value is 'linear'
+
+    :return new_tab: masked_array or None
+        tab_to_regrid regridded on newgrid, None if the regridder could not be used (use Regrid instead)
+    """
+    try:
+        src_grid = tab_to_regrid.getGrid()
+        # same as cdms2 regrid: the source mask is the mask common to all horizontal slices
+        if NPany(NPma__getmaskarray(tab_to_regrid)):
+            src_mask = CDMS2getMinHorizontalMask(tab_to_regrid)
+        else:
+            src_mask = None
+        sha = HASHLIBsha1()
+        for grid in [src_grid, newgrid]:
+            sha.update(str(grid.shape).encode("utf-8"))
+            sha.update(NParray(grid.getLatitude()[:]).tobytes())
+            sha.update(NParray(grid.getLongitude()[:]).tobytes())
+        sha.update(b"None" if src_mask is None else NParray(src_mask).tobytes())
+        key = (sha.hexdigest(), str(tab_to_regrid.dtype), regridTool, regridMethod)
+        regridder = regrid_cache.get(key)
+        if regridder is None:
+            regridder = CDMS2CdmsRegrid(src_grid, newgrid, dtype=tab_to_regrid.dtype, regridMethod=regridMethod,
+                                        regridTool=regridTool, srcGridMask=src_mask)
+            regrid_cache.set(key, regridder)
+        new_tab = regridder(tab_to_regrid)
+    except Exception:
+        new_tab = None
+    return new_tab
+
+
 def SaveNetcdf(netcdf_name, var1=None, var1_attributes={}, var1_name='', var1_time_name=None, var2=None,
                var2_attributes={}, var2_name='', var2_time_name=None, var3=None, var3_attributes={}, var3_name='',
                var3_time_name=None, var4=None, var4_attributes={}, var4_name='', var4_time_name=None, var5=None,
@@ -2335,82 +3088,23 @@ def SaveNetcdf(netcdf_name, var1=None, var1_attributes={}, var1_name='', var1_ti
             "ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": given path does not exist",
             str().ljust(5) + "netcdf_name = " + str(netcdf_name)]
         EnsoErrorsWarnings.my_error(list_strings)
-    if OSpath__isfile(netcdf_name) is True:
-        o = CDMS2open(netcdf_name, "a")
-    else:
-        o = CDMS2open(netcdf_name, "w+")
-    if var1 is not None:
-        if var1_name == '':
-            var1_name = var1.id
-        if var1_time_name is not None:
-            var1 = TimeButNotTime(var1, var1_time_name, frequency)
-        o.write(var1, attributes=var1_attributes, dtype="float32", id=var1_name)
-    if var2 is not None:
-        if var2_name == '':
-            var2_name = var2.id
-        if var2_time_name is not None:
-            var2 = TimeButNotTime(var2, var2_time_name, frequency)
-        o.write(var2, attributes=var2_attributes, dtype="float32", id=var2_name)
-    if var3 is not None:
-        if var3_name == '':
-            var3_name = var3.id
-        if var3_time_name is not None:
-            var3 = TimeButNotTime(var3, var3_time_name, frequency)
-        o.write(var3, attributes=var3_attributes, dtype="float32", id=var3_name)
-    if var4 is not None:
-        if var4_name == '':
-            var4_name = var4.id
-        if var4_time_name is not None:
-            var4 = TimeButNotTime(var4, var4_time_name, frequency)
-        o.write(var4, attributes=var4_attributes, dtype="float32", id=var4_name)
-    if var5 is not None:
-        if var5_name == '':
-            var5_name = var5.id
-        if var5_time_name is not None:
-            var5 = TimeButNotTime(var5, var5_time_name, frequency)
-        o.write(var5, attributes=var5_attributes, dtype="float32", id=var5_name)
-    if var6 is not None:
-        if var6_name == '':
-            var6_name = var6.id
-        if var6_time_name is not None:
-            var6 = TimeButNotTime(var6, var6_time_name, frequency)
-        o.write(var6, attributes=var6_attributes, dtype="float32", id=var6_name)
-    if var7 is not None:
-        if var7_name == '':
-            var7_name = var7.id
-        if var7_time_name is not None:
-            var7 = TimeButNotTime(var7, var7_time_name, frequency)
-        o.write(var7, attributes=var7_attributes, dtype="float32", id=var7_name)
-    if var8 is not None:
-        if var8_name == '':
-            var8_name = var8.id
-        if var8_time_name is not None:
-            var8 = TimeButNotTime(var8, var8_time_name, frequency)
-        o.write(var8, attributes=var8_attributes, dtype="float32", id=var8_name)
-    if var9 is not None:
-        if var9_name == '':
-            var9_name = var9.id
-        if var9_time_name is not None:
-            var9 = TimeButNotTime(var9, var9_time_name, frequency)
-        o.write(var9, attributes=var9_attributes, dtype="float32", id=var9_name)
-    if var10 is not None:
-        if var10_name == '':
-            var10_name = var10.id
-        if var10_time_name is not None:
-            var10 = TimeButNotTime(var10, var10_time_name, frequency)
-        o.write(var10, attributes=var10_attributes, dtype="float32", id=var10_name)
-    if var11 is not None:
-        if var11_name == '':
-            var11_name = var11.id
-        if var11_time_name is not None:
-            var11 = TimeButNotTime(var11, var11_time_name, frequency)
-        o.write(var11, attributes=var11_attributes, dtype="float32", id=var11_name)
-    if var12 is not None:
-        if var12_name == '':
-            var12_name = var12.id
-        if var12_time_name is not None:
-            var12 = TimeButNotTime(var12, var12_time_name, frequency)
-        o.write(var12, attributes=var12_attributes, dtype="float32", id=var12_name)
+    # list of the variables to save: [variable, attributes, name]
+    list_variables = list()
+    for var, attributes, name, time_name in [
+            (var1, var1_attributes, var1_name, var1_time_name), (var2, var2_attributes, var2_name, var2_time_name),
+            (var3, var3_attributes, var3_name, var3_time_name), (var4, var4_attributes, var4_name, var4_time_name),
+            (var5, var5_attributes, var5_name, var5_time_name), (var6, var6_attributes, var6_name, var6_time_name),
+            (var7, var7_attributes, var7_name, var7_time_name), (var8, var8_attributes, var8_name, var8_time_name),
+            (var9, var9_attributes, var9_name, var9_time_name),
+            (var10, var10_attributes, var10_name, var10_time_name),
+            (var11, var11_attributes, var11_name, var11_time_name),
+            (var12, var12_attributes, var12_name, var12_time_name)]:
+        if var is not None:
+            if name == '':
+                name = var.id
+            if time_name is not None:
+                var = TimeButNotTime(var, time_name, frequency)
+            list_variables.append([var, attributes, name])
     my_keys = sorted([key for key in list(kwargs.keys())
                       if "var" in key and str(key.replace("var", "")).isdigit() is True],
                      key=lambda v: v.upper())
@@ -2423,13 +3117,264 @@ def SaveNetcdf(netcdf_name, var1=None, var1_attributes={}, var1_name='', var1_ti
                 kwargs[key] = TimeButNotTime(kwargs[key], kwargs[key + "_time_name"], frequency)
             if key + "_attributes" not in list(kwargs.keys()):
                 kwargs[key + "_attributes"] = {}
-            o.write(kwargs[key], attributes=kwargs[key + "_attributes"], dtype="float32", id=kwargs[key + "_name"])
+            list_variables.append([kwargs[key], kwargs[key + "_attributes"], kwargs[key + "_name"]])
+    # the file of a metric may be a group of a consolidated file (see NetcdfWriterStart)
+    consolidated_name, group = NetcdfConsolidatedName(netcdf_name)
+    if consolidated_name is not None and netcdf_writer['directory'] is not None:
+        # process of a pool: written in a file of its own, copied in the consolidated file by the main process
+        if netcdf_name not in list(netcdf_writer['saved'].keys()):
+            netcdf_writer['saved'][netcdf_name] = OSpath__join(
+                netcdf_writer['directory'], HASHLIBsha1(netcdf_name.encode("utf-8")).hexdigest() + ".nc")
+        NetcdfWrite(netcdf_writer['saved'][netcdf_name], list_variables, global_attributes)
+        return
+    if consolidated_name is not None:
+        list_variables = [[NetcdfGroupVariable(var, group), attributes, group + "__" + name]
+                          for var, attributes, name in list_variables]
+        global_attributes = dict((group + "__" + att, global_attributes[att]) for att in list(global_attributes.keys()))
+        if netcdf_writer['queue'] is not None:
+            # written by the background thread
+            netcdf_writer['queue'].put([consolidated_name, list_variables, global_attributes])
+            return
+        netcdf_name = consolidated_name
+    NetcdfWrite(netcdf_name, list_variables, global_attributes)
+    return
+
+
+def NetcdfConsolidatedName(netcdf_name):
+    """
+    #################################################################################
+    Description:
+    Finds the consolidated file (see NetcdfWriterStart) in which the variables given to SaveNetcdf for netcdf_name are
+    written, netcdf_name must be the root name of the consolidated file followed by '_' + name of the metric
+    #################################################################################
+
+    :param netcdf_name: string
+        name of the NetCDF file given to SaveNetcdf,
+        e.g., netcdf_name='/path/to/directory/USER_DATE_METRICCOLLECTION_MODEL_EnsoAmpl.nc'
+
+    :return consolidated_name, group: string or None, string or None
+        name of the consolidated file and name of the group of the metric, (None, None) if netcdf_name does not belong
+        to a consolidated file
+    """
+    for root in sorted(list(netcdf_writer['files'].keys()), key=lambda v: len(v), reverse=True):
+        if netcdf_name.startswith(root + "_"):
+            group = netcdf_name[len(root) + 1:]
+            if group.endswith(".nc"):
+                group = group[:-3]
+            return netcdf_writer['files'][root], group
+    return None, None
+
+
+def NetcdfGroupVariable(tab, group):
+    """
+    #################################################################################
+    Description:
+    Copies tab with its axes renamed after the group (group + '__' + axis name), so that the axes of the different
+    groups (metrics) of a consolidated file do not collide
+    cdms2 does not handle NetCDF4 groups, a group is a prefix of the names of its variables, axes and attributes
+    #################################################################################
+
+    :param tab: masked_array
+        masked_array (uvcdat cdms2)
+    :param group: string
+        name of the group, e.g., the name of the metric
+
+    :return: masked_array
+        copy of tab
+    """
+    tab_out = tab.clone()
+    for ii, axis in enumerate(tab.getAxisList()):
+        new_axis = axis.clone()
+        new_axis.id = group + "__" + axis.id
+        tab_out.setAxis(ii, new_axis)
+    return tab_out
+
+
+@netcdf_locked
+def NetcdfWrite(netcdf_name, list_variables, global_attributes={}):
+    """
+    #################################################################################
+    Description:
+    Writes the given variables (float32) and global attributes in netcdf_name (appended if the file exists)
+    #################################################################################
+
+    :param netcdf_name: string
+        name of the NetCDF file
+    :param list_variables: list
+        list of [variable, attributes, name]
+    :param global_attributes: dict, optional
+        global attributes
+
+    :return:
+    """
+    if OSpath__isfile(netcdf_name) is True:
+        o = CDMS2open(netcdf_name, "a")
+    else:
+        o = CDMS2open(netcdf_name, "w+")
+    for var, attributes, name in list_variables:
+        o.write(var, attributes=attributes, dtype="float32", id=name)
     for att in sorted(list(global_attributes.keys()), key=lambda v: v.upper()):
         o.__setattr__(att, global_attributes[att])
     o.close()
     return
 
 
+def NetcdfCopy(filename, netcdf_name):
+    """
+    #################################################################################
+    Description:
+    Copies the variables and global attributes of the given file in netcdf_name through SaveNetcdf (netcdf_name may
+    thus be the file of a metric in a consolidated file, see NetcdfWriterStart)
+    #################################################################################
+
+    :param filename: string
+        name of the NetCDF file to copy
+    :param netcdf_name: string
+        name of the NetCDF file given to SaveNetcdf
+
+    :return:
+    """
+    # the lock is released before SaveNetcdf, which may wait for the background thread
+    with netcdf_lock:
+        fi = CDMS2open(filename)
+        dict_variables = dict()
+        for ii, name in enumerate(sorted(fi.listvariables())):
+            dict_variables["var" + str(ii + 1)] = fi(name)
+            dict_variables["var" + str(ii + 1) + "_name"] = name
+        global_attributes = dict(fi.attributes)
+        fi.close()
+    SaveNetcdf(netcdf_name, global_attributes=global_attributes, **dict_variables)
+    return
+
+
+def NetcdfWriterLoop():
+    """
+    #################################################################################
+    Description:
+    Writes the variables queued by SaveNetcdf in the consolidated files until NetcdfWriterStop is called (run in a
+    background thread, see NetcdfWriterStart)
+    #################################################################################
+
+    :return:
+    """
+    while True:
+        job = netcdf_writer['queue'].get()
+        if job is None:
+            break
+        try:
+            NetcdfWrite(*job)
+        except Exception as err:
+            netcdf_writer['errors'].append([job[0], [name for var, attributes, name in job[1]], str(err)])
+    return
+
+
+def NetcdfWriterStart(dict_files, deflate_level=4, background=True, directory=None):
+    """
+    #################################################################################
+    Description:
+    Writes the dive down variables given to SaveNetcdf for several metrics in one consolidated NetCDF4 file, deflated
+    (and thus chunked by the NetCDF library), instead of one file per metric
+    For each root name R in dict_files, the variables given to SaveNetcdf with netcdf_name = R + '_' + metric are
+    written in the file dict_files[R], prefixed by the metric (see NetcdfGroupVariable)
+    In a process of a pool (directory given), the variables of each metric are written in a file of their own in
+    directory, to be copied in the consolidated file by the main process (see NetcdfWriterSaved), so that each
+    consolidated file is written by one process only
+    #################################################################################
+
+    :param dict_files: dict
+        dictionary {root name: name of the consolidated file}, root names are given without '.nc'
+    :param deflate_level: int, optional
+        deflate level (1 to 9) of the consolidated files
+        default value = 4
+    :param background: boolean, optional
+        True to write the files in a background thread, so that the computation does not wait for the writing
+        the thread and the functions reading NetCDF files take turns through netcdf_lock (see netcdf_locked)
+        default value = True
+    :param directory: string, optional
+        directory in which a process of a pool writes the variables of each metric
+        default value = None, the variables are written in the consolidated files
+
+    :return:
+    """
+    NetcdfWriterStop()
+    if len(dict_files) == 0:
+        return
+    if directory is not None:
+        netcdf_writer.update({'files': dict_files, 'directory': directory})
+        return
+    netcdf_writer['flags'] = [CDMS2getNetcdfClassicFlag(), CDMS2getNetcdf4Flag(), CDMS2getNetcdfShuffleFlag(),
+                              CDMS2getNetcdfDeflateFlag(), CDMS2getNetcdfDeflateLevelFlag()]
+    SetNetcdfFlags(0, 1, 1, 1, deflate_level)
+    netcdf_writer['files'] = dict_files
+    if background is True:
+        netcdf_writer['queue'] = QUEUEqueue(maxsize=netcdf_writer['queue_size'])
+        netcdf_writer['thread'] = THREADINGthread(target=NetcdfWriterLoop, name="NetcdfWriter")
+        netcdf_writer['thread'].daemon = True
+        netcdf_writer['thread'].start()
+    return
+
+
+def NetcdfWriterStop():
+    """
+    #################################################################################
+    Description:
+    Waits for the variables queued by SaveNetcdf to be written and goes back to one file per metric (see
+    NetcdfWriterStart), the errors raised while writing are given as warnings
+    #################################################################################
+
+    :return:
+    """
+    if netcdf_writer['thread'] is not None:
+        netcdf_writer['queue'].put(None)
+        netcdf_writer['thread'].join()
+    if netcdf_writer['flags'] is not None:
+        SetNetcdfFlags(*netcdf_writer['flags'])
+    for netcdf_name, list_names, err in netcdf_writer['errors']:
+        list_strings = [
+            "WARNING" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": cannot write NetCDF file",
+            str().ljust(5) + "netcdf_name = " + str(netcdf_name), str().ljust(5) + "variables = " + str(list_names),
+            str().ljust(5) + str(err)]
+        EnsoErrorsWarnings.my_warning(list_strings)
+    netcdf_writer.update({'files': dict(), 'flags': None, 'queue': None, 'thread': None, 'errors': list(),
+                          'directory': None, 'saved': dict()})
+    return
+
+
+def NetcdfWriterSaved():
+    """
+    #################################################################################
+    Description:
+    Gives the files written by a process of a pool since the last call, to be copied in the consolidated files by the
+    main process (see NetcdfWriterStart)
+    #################################################################################
+
+    :return dict_saved: dict
+        dictionary {name of the NetCDF file given to SaveNetcdf: name of the file written}
+    """
+    dict_saved = netcdf_writer['saved']
+    netcdf_writer['saved'] = dict()
+    return dict_saved
+
+
+def SetNetcdfFlags(classic, netcdf4, shuffle, deflate, deflate_level):
+    """
+    #################################################################################
+    Description:
+    Sets the format and compression flags used by cdms2 to create NetCDF files
+    #################################################################################
+
+    for more information:
+    import cdms2
+    help(cdms2.setNetcdfDeflateFlag)
+    """
+    CDMS2setNetcdfClassicFlag(classic)
+    CDMS2setNetcdf4Flag(netcdf4)
+    CDMS2setNetcdfShuffleFlag(shuffle)
+    CDMS2setNetcdfDeflateFlag(deflate)
+    CDMS2setNetcdfDeflateLevelFlag(deflate_level)
+    return
+
+
 def SkewnessTemporal(tab):
     """
     #################################################################################
@@ -2507,57 +3452,14 @@ def SmoothGaussian(tab, axis=0, window=5):
         list_strings = ["ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": axis",
                         str().ljust(5) + "axis number too big: " + str(axis)]
         EnsoErrorsWarnings.my_error(list_strings)
-    # Reorder tab in order to put 'axis' in first position
-    indices = list(range(len(tab.shape)))
-    indices.remove(axis)
-    newOrder = str(axis)
-    for ii in indices:
-        newOrder = newOrder + str(ii)
-    new_tab = tab.reorder(newOrder)
-
     # degree
     degree = window // 2
 
     # Create the gaussian weight array
-    weight = list()
-    for ii in list(range(window)):
-        ii = ii - degree + 1
-        frac = ii / float(window)
-        gauss = float(1. / (NPexp((4 * frac) ** 2)))
-        ww = MV2zeros(new_tab.shape[1:])
-        ww.fill(gauss)
-        weight.append(ww)
-        del frac, gauss, ww
-    weight = MV2array(weight)
+    weight = NParray([float(1. / (NPexp((4 * (ii - degree + 1) / float(window)) ** 2))) for ii in range(window)])
 
     # Smoothing
-    smoothed_tab = MV2zeros(new_tab.shape)
-    smoothed_tab = smoothed_tab[:len(new_tab) - window + 1]
-    for ii in range(len(smoothed_tab)):
-        tmp1 = MV2array(new_tab[ii: ii + window])
-        tmp2 = MV2masked_where(tmp1.mask, weight)
-        tmp1 = MV2sum(tmp1 * tmp2, axis=0) / MV2sum(tmp2, axis=0)
-        tmp1 = MV2masked_where(MV2sum(tmp2.mask.astype("f"), axis=0) / window > 0.5, tmp1)
-        smoothed_tab[ii] = tmp1
-        del tmp1, tmp2
-
-    # Axes list
-    axes0 = new_tab[degree: len(new_tab) - degree].getAxisList()[0]
-    if len(tab.shape) > 1:
-        axes = [axes0] + new_tab.getAxisList()[1:]
-    else:
-        axes = [axes0]
-    smoothed_tab.setAxisList(axes)
-    if tab.getGrid():
-        try:
-            smoothed_tab.setGrid(tab.getGrid())
-        except:
-            pass
-
-    # Reorder to the input order
-    for ii in range(axis):
-        smoothed_tab = smoothed_tab.reorder(newOrder)
-    return smoothed_tab
+    return SmoothWindow(tab, weight, axis=axis)
 
 
 def SmoothSquare(tab, axis=0, window=5):
@@ -2587,48 +3489,11 @@ def SmoothSquare(tab, axis=0, window=5):
                         str().ljust(5) + "axis number too big: " + str(axis)]
         EnsoErrorsWarnings.my_error(list_strings)
 
-    # Reorder tab in order to put 'axis' in first position
-    indices = list(range(len(tab.shape)))
-    indices.remove(axis)
-    newOrder = str(axis)
-    for ii in indices:
-        newOrder = newOrder+str(ii)
-    new_tab = tab.reorder(newOrder)
-
-    # degree
-    degree = window // 2
-
     # Create the weight array (uniform)
-    weight = MV2ones((window,) + new_tab.shape[1:])
+    weight = NPones(window)
 
     # Smoothing
-    smoothed_tab = MV2zeros(new_tab.shape)
-    smoothed_tab = smoothed_tab[:len(new_tab) - window + 1]
-    for ii in range(len(smoothed_tab)):
-        tmp1 = MV2array(new_tab[ii: ii + window])
-        tmp2 = MV2masked_where(tmp1.mask, weight)
-        tmp1 = MV2sum(tmp1, axis=0) / MV2sum(tmp2, axis=0)
-        tmp1 = MV2masked_where(MV2sum(tmp2.mask.astype("f"), axis=0)/window>0.5, tmp1)
-        smoothed_tab[ii] = tmp1
-        del tmp1, tmp2
-
-    # Axes list
-    axes0 = new_tab[degree: len(new_tab) - degree].getAxisList()[0]
-    if len(tab.shape) > 1:
-        axes = [axes0] + new_tab.getAxisList()[1:]
-    else:
-        axes = [axes0]
-    smoothed_tab.setAxisList(axes)
-    if tab.getGrid():
-        try:
-            smoothed_tab.setGrid(tab.getGrid())
-        except:
-            pass
-
-    # Reorder to the input order
-    for ii in range(axis):
-        smoothed_tab = smoothed_tab.reorder(newOrder)
-    return smoothed_tab
+    return SmoothWindow(tab, weight, axis=axis)
 
 
 def SmoothTriangle(tab, axis=0, window=5):
@@ -2658,36 +3523,60 @@ def SmoothTriangle(tab, axis=0, window=5):
                         str().ljust(5) + "axis number too big: " + str(axis)]
         EnsoErrorsWarnings.my_error(list_strings)
 
+    # degree
+    degree = window // 2
+
+    # Create the weight array (triangle)
+    weight = NParray([float(1 + degree - abs(degree - ii)) for ii in range(0, (2 * degree) + 1)])
+
+    # Smoothing
+    return SmoothWindow(tab, weight, axis=axis)
+
+
+def SmoothWindow(tab, weight, axis=0):
+    """
+    #################################################################################
+    Description:
+    Smooth 'tab' along 'axis' using moving window average of given 'weight'
+    Masked values are not used and a point is masked if more than half of its window is masked
+    The weighted values, the weights of the unmasked values and the fraction of masked values in each window are
+    computed with convolutions along 'axis'
+
+    Uses scipy.ndimage
+    #################################################################################
+    :param tab: masked_array
+        masked_array to smooth
+    :param weight: array
+        weight of each point of the moving window (odd number of points)
+    :param axis: integer, optional
+        axis along which to smooth the data
+        default value is the first axis (0)
+    :return smoothed_tab: masked_array
+        smoothed data
+    """
     # Reorder tab in order to put 'axis' in first position
     indices = list(range(len(tab.shape)))
     indices.remove(axis)
     newOrder = str(axis)
     for ii in indices:
-        newOrder = newOrder+str(ii)
+        newOrder = newOrder + str(ii)
     new_tab = tab.reorder(newOrder)
 
     # degree
+    window = len(weight)
     degree = window // 2
 
-    # Create the weight array (triangle)
-    weight = list()
-    for ii in range(0, (2 * degree)+1):
-        ww = MV2zeros(new_tab.shape[1:])
-        ww.fill(float(1 + degree - abs(degree - ii)))
-        weight.append(ww)
-        del ww
-    weight = MV2array(weight)
-
-    # Smoothing
-    smoothed_tab = MV2zeros(new_tab.shape)
-    smoothed_tab = smoothed_tab[:len(new_tab) - window + 1]
-    for ii in range(len(smoothed_tab)):
-        tmp1 = MV2array(new_tab[ii: ii + window])
-        tmp2 = MV2masked_where(tmp1.mask, weight)
-        tmp1 = MV2sum(tmp1 * tmp2, axis=0) / MV2sum(tmp2, axis=0)
-        tmp1 = MV2masked_where(MV2sum(tmp2.mask.astype("f"), axis=0) / window > 0.5, tmp1)
-        smoothed_tab[ii] = tmp1
-        del tmp1, tmp2
+    # Smoothing (only the windows fully included in 'tab' are kept)
+    values = NPma__array(new_tab, dtype="float64")
+    missing = NPma__getmaskarray(values).astype("float64")
+    weighted_sum = SCIPYndimage__correlate1d(values.filled(0.), weight, axis=0, mode="constant")
+    weight_sum = SCIPYndimage__correlate1d(1. - missing, weight, axis=0, mode="constant")
+    missing = SCIPYndimage__correlate1d(missing, NPones(window), axis=0, mode="constant") / window
+    weighted_sum = weighted_sum[degree: len(new_tab) - degree]
+    weight_sum = weight_sum[degree: len(new_tab) - degree]
+    missing = missing[degree: len(new_tab) - degree]
+    smoothed_tab = MV2masked_where((missing > 0.5) | (weight_sum <= 0),
+                                   weighted_sum / NPwhere(weight_sum > 0, weight_sum, 1.))
 
     # Axes list
     axes0 = new_tab[degree: len(new_tab) - degree].getAxisList()[0]
@@ -2725,6 +3614,91 @@ sea_dict = dict(JAN=cdutil.JAN, FEB=cdutil.FEB, MAR=cdutil.MAR, APR=cdutil.APR,
                 ONDJ=cdutil.times.Seasons("ONDJ"),NDJF=cdutil.times.Seasons("NDJF"),DJFM=cdutil.times.Seasons("DJFM"))
 
 
+def SeasonalAnomaliesByYear(tab, season, list_offsets=[0]):
+    """
+    #################################################################################
+    Description:
+    Computes the seasonal mean anomalies of 'tab' for 'season' and for the seasons of the same length shifted by the
+    given numbers of months (e.g., season='DEC' and list_offsets=[-1, 0, 1] gives NOV, DEC and JAN anomalies)
+    The monthly time series is put in a (year, month) array and all seasonal means are computed with cumulative sums
+    along time (months weighted by their length, as cdutil does), incomplete seasons are masked
+
+    Uses numpy instead of calling SeasonalMean for each season
+    #################################################################################
+
+    :param tab: masked_array
+        masked_array (uvcdat cdms2) containing a monthly time series
+        the time axis must be the first axis, or the second axis if the first one is the members axis
+    :param season: string
+        name of a season, must be defined in 'sea_dict'
+    :param list_offsets: list of integers, optional
+        shifts (in months) of the seasons to compute from 'season'
+        default value = [0], only 'season' is computed
+    :return anomalies: masked_array
+        seasonal mean anomalies, shape = (len(list_offsets), [members,] years)
+    :return list_years: list
+        years of the seasons, the year of 'season' is the year of its first month (e.g., for season='DEC' and
+        list_offsets=[0, 1], DEC 1980 and JAN 1981 are given for the year 1980)
+    """
+    # Checks if the season has been defined
+    try:
+        sea_dict[season]
+    except:
+        list_strings = ["ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": season",
+                        str().ljust(5) + "unknown season: " + str(season)]
+        EnsoErrorsWarnings.my_error(list_strings)
+    # first month and length of the season
+    list_months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+    if season in list_months:
+        first_month, length = list_months.index(season), 1
+    else:
+        first_month, length = (2 * "JFMAMJJASOND").index(season), len(season)
+    # monthly time series as (member, year * 12 + month) arrays
+    members = (len(tab.shape) > 1 and tab.getOrder().index("t") == 1)
+    values = NPma__array(tab, dtype="float64")
+    if members is False:
+        values = values.reshape((1, len(values)))
+    time_axis = tab.getTime()
+    dict_index = CalendarIndex(time_axis)
+    years, months = dict_index["year"], dict_index["month"]
+    bounds = time_axis.getBounds()
+    if bounds is None:
+        weights = NPones(len(years))
+    else:
+        weights = NParray(bounds[:, 1] - bounds[:, 0], dtype="float64")
+    first_year = int(years.min())
+    nyear = int(years.max()) - first_year + 1
+    index = (years - first_year) * 12 + months - 1
+    tab_val = NPzeros((values.shape[0], nyear * 12))
+    tab_wei = NPzeros(nyear * 12)
+    tab_mis = NPones((values.shape[0], nyear * 12), dtype="int32")
+    tab_val[:, index] = values.filled(0.) * weights
+    tab_wei[index] = weights
+    tab_mis[:, index] = NPma__getmaskarray(values).astype("int32")
+    # cumulative sums: the sum over a season is the difference between two cumulative sums
+    cum_val = NPconcatenate((NPzeros((values.shape[0], 1)), NPcumsum(tab_val, axis=1)), axis=1)
+    cum_wei = NPconcatenate((NPzeros(1), NPcumsum(tab_wei)))
+    cum_mis = NPconcatenate((NPzeros((values.shape[0], 1), dtype="int32"), NPcumsum(tab_mis, axis=1)), axis=1)
+    anomalies = NPma__masked_all((len(list_offsets), values.shape[0], nyear))
+    for ii, offset in enumerate(list_offsets):
+        ind1 = NParange(nyear) * 12 + first_month + offset
+        ind2 = ind1 + length
+        inside = NPwhere((ind1 >= 0) & (ind2 <= nyear * 12))[0]
+        ind1, ind2 = ind1[inside], ind2[inside]
+        sea_val = cum_val[:, ind2] - cum_val[:, ind1]
+        sea_wei = (cum_wei[ind2] - cum_wei[ind1]).reshape((1, len(inside)))
+        complete = ((cum_mis[:, ind2] - cum_mis[:, ind1]) == 0) & (sea_wei > 0)
+        # climatology: mean of all the complete seasons
+        clim_wei = NPwhere(complete, sea_wei, 0.).sum(axis=1)
+        clim = NPwhere(complete, sea_val, 0.).sum(axis=1) / NPwhere(clim_wei > 0, clim_wei, 1.)
+        sea_val = sea_val / NPwhere(sea_wei > 0, sea_wei, 1.) - clim.reshape((len(clim), 1))
+        anomalies[ii, :, inside] = NPma__masked_where(~complete, sea_val).T
+    if members is False:
+        anomalies = anomalies[:, 0]
+    return anomalies, list(range(first_year, first_year + nyear))
+
+
+@dataset_memoized
 def SeasonalMean(tab, season, compute_anom=False):
     """
     #################################################################################
@@ -2760,39 +3734,15 @@ def SeasonalMean(tab, season, compute_anom=False):
             # these 'seasons' are between two years
             # if I don't custom 'tab' cdutil will compute half season mean
             # (i.e., for NDJ the first element would be for J only and the last for ND only)
-            time_ax_comp = tab.getTime().asComponentTime()
-            ntime = len(time_ax_comp)
-            ii, jj = 0, 0
-            if season == 'DJ':
-                for ii in list(range(ntime)):
-                    if time_ax_comp[ii].month == 12: break
-                for jj in list(range(ntime)):
-                    if time_ax_comp[ntime - 1 - jj].month == 1: break
-            elif season == 'NDJ':
-                for ii in list(range(ntime)):
-                    if time_ax_comp[ii].month == 11: break
-                for jj in list(range(ntime)):
-                    if time_ax_comp[ntime - 1 - jj].month == 1: break
-            elif season == 'DJF':
-                for ii in list(range(ntime)):
-                    if time_ax_comp[ii].month == 12: break
-                for jj in list(range(ntime)):
-                    if time_ax_comp[ntime - 1 - jj].month == 2: break
-            elif season == 'ONDJ':
-                for ii in list(range(ntime)):
-                    if time_ax_comp[ii].month == 10: break
-                for jj in list(range(ntime)):
-                    if time_ax_comp[ntime - 1 - jj].month == 1: break
-            elif season == 'NDJF':
-                for ii in list(range(ntime)):
-                    if time_ax_comp[ii].month == 11: break
-                for jj in list(range(ntime)):
-                    if time_ax_comp[ntime - 1 - jj].month == 2: break
-            elif season == 'DJFM':
-                for ii in list(range(ntime)):
-                    if time_ax_comp[ii].month == 12: break
-                for jj in list(range(ntime)):
-                    if time_ax_comp[ntime - 1 - jj].month == 3: break
+            months = CalendarIndex(tab.getTime())["month"]
+            ntime = len(months)
+            # first and last months of the season
+            dict_bounds = {'DJ': (12, 1), 'NDJ': (11, 1), 'DJF': (12, 2), 'ONDJ': (10, 1), 'NDJF': (11, 2),
+                           'DJFM': (12, 3)}
+            first_month, last_month = dict_bounds[season]
+            ii, jj = NPnonzero(months == first_month)[0], NPnonzero(months[::-1] == last_month)[0]
+            ii = int(ii[0]) if len(ii) > 0 else max(ntime - 1, 0)
+            jj = int(jj[0]) if len(jj) > 0 else max(ntime - 1, 0)
             tab = tab[ii:ntime - jj]
         if compute_anom:
             tab = sea_dict[season].departures(tab)  # extracts 'season' seasonal anomalies (from climatology)
@@ -2860,8 +3810,7 @@ def SkewMonthly(tab):
     initorder = tab.getOrder()
     tab = tab.reorder('t...')
     axes = tab.getAxisList()
-    time_ax = tab.getTime().asComponentTime()
-    months = MV2array(list(tt.month for tt in time_ax))
+    months = CalendarIndex(tab.getTime())["month"]
     cyc = []
     for ii in list(range(12)):
         tmp = tab.compress(months == (ii + 1), axis=0)
@@ -2890,8 +3839,7 @@ def StdMonthly(tab):
     initorder = tab.getOrder()
     tab = tab.reorder('t...')
     axes = tab.getAxisList()
-    time_ax = tab.getTime().asComponentTime()
-    months = MV2array(list(tt.month for tt in time_ax))
+    months = CalendarIndex(tab.getTime())["month"]
     cyc = []
     for ii in list(range(12)):
         tmp = tab.compress(months == (ii + 1), axis=0)
@@ -2909,8 +3857,8 @@ def StdMonthly(tab):
 def TimeButNotTime(tab, new_time_name, frequency):
     tab_out = copy.copy(tab)
     time_num = get_num_axis(tab_out, 'time')
-    timeax = tab_out.getAxis(time_num).asComponentTime()
-    year1, month1, day1 = timeax[0].year, timeax[0].month, timeax[0].day
+    time1 = TimeComponent(tab_out.getAxis(time_num), 0)
+    year1, month1, day1 = time1.year, time1.month, time1.day
     if frequency == 'daily':
         freq = 'days'
     elif frequency == 'monthly':
@@ -2994,44 +3942,16 @@ def CustomLinearRegression(y, x, sign_x=0, return_stderr=True, return_intercept=
         unadjusted standard error of the linear regression of y over x (if return_stderr=True)
     """
     if sign_x != 0:
+        if x.shape != y.shape:
+            list_strings = [
+                "ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": array shape",
+                str().ljust(5) + "different array shape for x " + str(x.shape) + " and y " + str(y.shape)]
+            EnsoErrorsWarnings.my_error(list_strings)
+        slope, intercept, stderr = CustomLinearRegressionNd(y, x, sign_x=sign_x)
         try:
             len(y[0])
         except:
-            slope, intercept, stderr = CustomLinearRegression1d(y, x, sign_x=sign_x)
-        else:
-            if x.shape != y.shape:
-                list_strings = [
-                    "ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": array shape",
-                    str().ljust(5) + "different array shape for x " + str(x.shape) + " and y " + str(y.shape)]
-                EnsoErrorsWarnings.my_error(list_strings)
-            slope, intercept, stderr = MV2zeros(y[0].shape), MV2zeros(y[0].shape), MV2zeros(y[0].shape)
-            for ii in list(range(len(y[0]))):
-                try:
-                    len(y[0, ii])
-                except:
-                    slope[ii], intercept[ii], stderr[ii] = CustomLinearRegression1d(y[:, ii], x[:, ii], sign_x=sign_x)
-                else:
-                    for jj in list(range(len(y[0, ii]))):
-                        try:
-                            len(y[0, ii, jj])
-                        except:
-                            slope[ii, jj], intercept[ii, jj], stderr[ii, jj] = \
-                                CustomLinearRegression1d(y[:, ii, jj], x[:, ii, jj], sign_x=sign_x)
-                        else:
-                            for kk in list(range(len(y[0, ii, jj]))):
-                                try:
-                                    len(y[0, ii, jj, kk])
-                                except:
-                                    slope[ii, jj, kk], intercept[ii, jj, kk], stderr[ii, jj, kk] = \
-                                        CustomLinearRegression1d(y[:, ii, jj, kk], x[:, ii, jj, kk], sign_x=sign_x)
-                                else:
-                                    list_strings = [
-                                        "ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) +
-                                        ": array shape",
-                                        str().ljust(5) + str(x.shape) + " too many dimensions (not programmed)",
-                                        str().ljust(5) + "Please ckeck and modify the program if needed"]
-                                    EnsoErrorsWarnings.my_error(list_strings)
-
+            slope, intercept, stderr = float(slope), float(intercept), float(stderr)
     else:
         results = GENUTILlinearregression(y, x=x, error=1, nointercept=None)
         slope, intercept, stderr = results[0][0], results[0][1], results[1][0]
@@ -3061,18 +3981,52 @@ def CustomLinearRegression(y, x, sign_x=0, return_stderr=True, return_intercept=
     return tab
 
 
-def CustomLinearRegression1d(y, x, sign_x=1):
-    x = NParray(x)
-    y = NParray(y)
+def CustomLinearRegressionNd(y, x, sign_x=1):
+    """
+    #################################################################################
+    Description:
+    Linear regression of y over x for values of x>0 (sign_x=1) or x<0 (sign_x=-1), computed along the first axis for all
+    the points of the other axes at once
+    Masked values are not used, slope, intercept and standard error are set to 0 where they cannot be computed
+
+    Uses numpy
+    #################################################################################
+
+    :param y: masked_array
+        masked_array of any shape, the regression is computed along the first axis
+    :param x: masked_array
+        masked_array of the same shape as 'y'
+    :param sign_x: int, optional
+        default value = 1, computes the linear regression for x>0. You can pass -1 to compute it for x<0
+    :return slope, intercept, stderr: arrays
+        slope, interception value and unadjusted standard error of the linear regression of y over x, arrays of the
+        shape of 'y[0]'
+    """
+    x = NPma__array(x, dtype="float64")
+    y = NPma__array(y, dtype="float64")
     if sign_x == 1:
-        idx = NPnonzero(x > 0.)
-    elif sign_x == -1:
-        idx = NPnonzero(x < 0.)
-    if len(idx[0]) == 0:
-        slope, intercept, stderr = 0, 0, 0
-    else:
-        results = GENUTILlinearregression(y[idx], x=x[idx], error=1, nointercept=None)
-        slope, intercept, stderr = float(results[0][0]), float(results[0][1]), float(results[1][0])
+        selected = x.filled(0.) > 0.
+    else:
+        selected = x.filled(0.) < 0.
+    selected = selected & ~NPma__getmaskarray(y)
+    nbr = selected.sum(axis=0)
+    nbr_div = NPwhere(nbr > 0, nbr, 1)
+    x = NPwhere(selected, x.filled(0.), 0.)
+    y = NPwhere(selected, y.filled(0.), 0.)
+    x_mean = x.sum(axis=0) / nbr_div
+    y_mean = y.sum(axis=0) / nbr_div
+    # anomalies of the selected values
+    x = NPwhere(selected, x - x_mean, 0.)
+    y = NPwhere(selected, y - y_mean, 0.)
+    sxx = (x * x).sum(axis=0)
+    computed = sxx > 0
+    slope = NPwhere(computed, (x * y).sum(axis=0) / NPwhere(computed, sxx, 1.), 0.)
+    intercept = NPwhere(computed, y_mean - slope * x_mean, 0.)
+    # unadjusted standard error of the slope
+    residuals = NPwhere(selected, y - slope * x, 0.)
+    computed = computed & (nbr > 2)
+    stderr = NPwhere(computed, NPsqrt((residuals * residuals).sum(axis=0) / NPwhere(computed, (nbr - 2.) * sxx, 1.)),
+                     0.)
     return slope, intercept, stderr
 
 
@@ -3250,15 +4204,22 @@ def MyDeriveCompute(list_var, dict_var, dict_att={}, variable='', isObs=False, p
         else:
             keyerror = None
             # compute the output variable
+            # the components are accumulated in place in a copy of the first one (no temporary array per operator)
+            outvar = dict_var[list_var[0]].clone()
             if list_operator[0] == 'minus':
-                outvar = -1 * dict_var[list_var[0]]
-            else:
-                outvar = dict_var[list_var[0]]
+                outvar *= -1
             for ii in list(range(1, len(list_var))):
-                outvar = dict_operations[list_operator[ii]](outvar, dict_var[list_var[ii]])
-            outvar.setAxisList(dict_var[list_var[0]].getAxisList())
-            outvar = MV2masked_where(dict_var[list_var[0]].mask, outvar)
-            outvar.setGrid(dict_var[list_var[0]].getGrid())
+                if outvar.shape != dict_var[list_var[ii]].shape:
+                    EnsoErrorsWarnings.mismatch_shapes_error(outvar, dict_var[list_var[ii]], INSPECTstack())
+                if list_operator[ii] == 'plus':
+                    outvar += dict_var[list_var[ii]]
+                elif list_operator[ii] == 'minus':
+                    outvar -= dict_var[list_var[ii]]
+                else:
+                    outvar = dict_operations[list_operator[ii]](outvar, dict_var[list_var[ii]])
+                    outvar.setAxisList(dict_var[list_var[0]].getAxisList())
+                    outvar = MV2masked_where(dict_var[list_var[0]].mask, outvar)
+                    outvar.setGrid(dict_var[list_var[0]].getGrid())
     return outvar, keyerror
 
 
@@ -3295,6 +4256,7 @@ def LinearRegressionAndNonlinearity(y, x, return_stderr=True, return_intercept=T
     return all_values, positive_values, negative_values
 
 
+@dataset_memoized
 def LinearRegressionTsAgainstMap(y, x, return_stderr=True):
     """
     #################################################################################
@@ -3327,6 +4289,7 @@ def LinearRegressionTsAgainstMap(y, x, return_stderr=True):
         return slope
 
 
+@dataset_memoized
 def LinearRegressionTsAgainstTs(y, x, nbr_years_window, return_stderr=True, frequency=None, debug=False):
     """
     #################################################################################
@@ -3377,7 +4340,7 @@ def LinearRegressionTsAgainstTs(y, x, nbr_years_window, return_stderr=True, freq
         tmp1 = tab_yy_mm[:, ii]
         tmp2 = copy.copy(x)
         yy1 = tab_yy_mm.getAxis(0)[0]
-        yy2 = tmp2.getTime().asComponentTime()[0].year
+        yy2 = TimeComponent(tmp2.getTime(), 0).year
         if yy1 == yy2:
             tmp1 = tmp1[:len(tmp2)]
         elif yy1 < yy2:
@@ -3413,9 +4376,124 @@ def LinearRegressionTsAgainstTs(y, x, nbr_years_window, return_stderr=True, freq
         return slope_out
 
 
+def PreProcessCacheKey(tab, info, areacell=None, **kwargs):
+    """
+    #################################################################################
+    Description:
+    Computes the key of the preprocessed field in the on-disk cache (preprocess_cache)
+    The key is a hash of the given field (values, mask, axes, attributes), of the areacell and of the preprocessing
+    parameters, so that it does not change between runs as long as the inputs are the same
+    #################################################################################
+
+    :param tab: masked_array
+        masked_array (uvcdat cdms2) to preprocess
+    :param info: string
+        description of the preprocessing already applied to 'tab'
+    :param areacell: masked_array, optional
+        masked_array (uvcdat cdms2) of the areacell used to average 'tab'
+    usual kwargs:
+    all preprocessing parameters given to PreProcessTS (average, compute_anom, detrending, frequency,...)
+
+    :return key: string
+        hexadecimal key
+    """
+    sha = HASHLIBsha1()
+    for arr in [tab, areacell]:
+        if arr is None:
+            sha.update(b"None")
+            continue
+        HashArray(sha, arr)
+    sha.update(str(info).encode("utf-8"))
+    sha.update(str(sorted((str(kk), str(vv)) for kk, vv in kwargs.items())).encode("utf-8"))
+    return sha.hexdigest()
+
+
+@netcdf_locked
+def PreProcessCacheRead(key):
+    """
+    #################################################################################
+    Description:
+    Reads the preprocessed field saved under 'key' in the on-disk cache (preprocess_cache)
+    #################################################################################
+
+    :param key: string
+        key of the preprocessed field, computed by PreProcessCacheKey
+
+    :return tab, info: masked_array, string
+        preprocessed field and description of the preprocessing, (None, None) if 'key' is not in the cache
+    """
+    filename = OSpath__join(preprocess_cache["directory"], key + ".nc")
+    if OSpath__isfile(filename) is False:
+        preprocess_cache["misses"] += 1
+        return None, None
+    try:
+        fi = CDMS2open(filename)
+        tab = fi("preprocessed")
+        info = fi.preprocessing_info
+        tab.id = fi.variable_id
+        fi.close()
+    except:
+        preprocess_cache["misses"] += 1
+        return None, None
+    preprocess_cache["hits"] += 1
+    return tab, info
+
+
+@netcdf_locked
+def PreProcessCacheWrite(key, tab, info):
+    """
+    #################################################################################
+    Description:
+    Saves the preprocessed field under 'key' in the on-disk cache (preprocess_cache)
+    The file is written under a temporary name and renamed, so that concurrent runs never read a partial file
+    #################################################################################
+
+    :param key: string
+        key of the preprocessed field, computed by PreProcessCacheKey
+    :param tab: masked_array
+        preprocessed field
+    :param info: string
+        description of the preprocessing
+
+    :return:
+    """
+    directory = preprocess_cache["directory"]
+    filename = OSpath__join(directory, key + ".nc")
+    tmp_name = filename + ".tmp" + str(OSgetpid())
+    try:
+        if OSpath_isdir(directory) is False:
+            OSmakedirs(directory)
+        o = CDMS2open(tmp_name, "w+")
+        o.write(tab, id="preprocessed")
+        o.preprocessing_info = info
+        o.variable_id = tab.id
+        o.close()
+        OSrename(tmp_name, filename)
+    except Exception as e:
+        print("\033[93m" + str().ljust(25) + "NOTE: preprocessed field not saved in cache (" + str(e) + ")\033[0m")
+    return
+
+
 def PreProcessTS(tab, info, areacell=None, average=False, compute_anom=False, compute_sea_cycle=False, debug=False,
                  region=None, **kwargs):
     keyerror = None
+    # this field may have already been preprocessed (for another observational dataset of the same metric, by another
+    # metric or during a previous run)
+    cache_key = None
+    if (preprocess_cache["directory"] is not None or dataset_memo.enabled() is True) and len(tab.shape) > 0:
+        cache_key = PreProcessCacheKey(
+            tab, info, areacell=areacell, average=average, compute_anom=compute_anom,
+            compute_sea_cycle=compute_sea_cycle, region=region,
+            **dict((arg, kwargs.get(arg)) for arg in ["detrending", "frequency", "normalization", "regridding",
+                                                      "smoothing"]))
+        memo = dataset_memo.get(("PreProcessTS", cache_key))
+        if memo is not None:
+            return memo[0].clone(), memo[1], keyerror
+        if preprocess_cache["directory"] is not None:
+            tab_cached, info_cached = PreProcessCacheRead(cache_key)
+            if tab_cached is not None:
+                dataset_memo.set(("PreProcessTS", cache_key), [tab_cached.clone(), info_cached])
+                return tab_cached, info_cached, keyerror
     # removes annual cycle (anomalies with respect to the annual cycle)
     if compute_anom is True:
         tab = ComputeInterannualAnomalies(tab)
@@ -3443,6 +4521,9 @@ def PreProcessTS(tab, info, areacell=None, average=False, compute_anom=False, co
         # computes mean annual cycle
         if compute_sea_cycle is True:
             tab = annualcycle(tab)
+        # the field may have been averaged horizontally while it was read by time chunks (see Read_data_mask_area)
+        if average == "horizontal" and tab.getLatitude() is None and tab.getLongitude() is None:
+            average = False
         # average
         if average is not False:
             if debug is True:
@@ -3477,10 +4558,15 @@ def PreProcessTS(tab, info, areacell=None, average=False, compute_anom=False, co
                 EnsoErrorsWarnings.unknown_averaging(average, list(dict_average.keys()), INSPECTstack())
     else:
         tab = None
+    if cache_key is not None and keyerror is None and tab is not None and len(tab.shape) > 0:
+        dataset_memo.set(("PreProcessTS", cache_key), [tab.clone(), info])
+        if preprocess_cache["directory"] is not None:
+            PreProcessCacheWrite(cache_key, tab, info)
     return tab, info, keyerror
 
 
-def ReadSelectRegionCheckUnits(filename, varname, varfamily, box=None, time_bounds=None, frequency=None, **keyarg):
+def ReadSelectRegionCheckUnits(filename, varname, varfamily, box=None, time_bounds=None, frequency=None, reduction=None,
+                               **keyarg):
     """
     #################################################################################
     Description:
@@ -3507,11 +4593,15 @@ def ReadSelectRegionCheckUnits(filename, varname, varfamily, box=None, time_boun
         time frequency of the datasets
         e.g., frequency='monthly'
         default value is None
+    :param reduction: dict, optional
+        see ReadAndSelectRegion
+        default value is None
 
     :return tab: masked_array
         masked_array containing 'varname' in 'box'
     """
-    tab = ReadAndSelectRegion(filename, varname, box=box, time_bounds=time_bounds, frequency=frequency)
+    tab = ReadAndSelectRegion(filename, varname, box=box, time_bounds=time_bounds, frequency=frequency,
+                              reduction=reduction)
     tab, units, keyerror = CheckUnits(tab, varfamily, varname, tab.units, return_tab_only=False)
     tab.name = varname
     tab.units = units
@@ -3519,14 +4609,39 @@ def ReadSelectRegionCheckUnits(filename, varname, varfamily, box=None, time_boun
 
 
 def Read_data_mask_area(file_data, name_data, type_data, metric, region, file_area='', name_area='', file_mask='',
-                        name_mask='', maskland=False, maskocean=False, time_bounds=None, debug=False, **kwargs):
+                        name_mask='', maskland=False, maskocean=False, time_bounds=None, debug=False, average=False,
+                        **kwargs):
     keyerror1, keyerror2, keyerror3 = None, None, None
+    # this field may have already been read for another observational dataset of the same metric
+    memo_key = None
+    if dataset_memo.enabled() is True:
+        memo_key = ("Read_data_mask_area", str(file_data), str(name_data), type_data, str(region), str(file_area),
+                    str(name_area), str(file_mask), str(name_mask), maskland, maskocean, str(time_bounds), str(average),
+                    str(sorted((str(kk), str(vv)) for kk, vv in kwargs.items())))
+        memo = dataset_memo.get(memo_key)
+        if memo is not None:
+            return [vv.clone() if hasattr(vv, "clone") else vv for vv in memo]
     # Read variable
     if debug is True:
         dict_debug = {'file1': '(' + type_data + ') ' + str(file_data), 'var1': '(' + type_data + ') ' + str(name_data)}
         EnsoErrorsWarnings.debug_mode('\033[93m', 'Files', 20, **dict_debug)
+    # when the caller only needs the average of the field (given by 'average') and the field is read by time chunks,
+    # each chunk is masked and averaged while it is read and the whole field is never kept in memory
+    # the normalization (by the standard deviation of each point) must be done before averaging
+    reduction = None
+    if average is not False and read_chunk["max_size"] > 0 and not kwargs.get("normalization"):
+        reduction = {"done": False, "keyerror": None}
+
+        def reduce_chunk(chunk):
+            chunk, chunk_areacell, reduction["keyerror"] = Read_mask_area(
+                chunk, name_data, file_data, type_data, region, file_area=file_area, name_area=name_area,
+                file_mask=file_mask, name_mask=name_mask, maskland=maskland, maskocean=maskocean, **kwargs)
+            if reduction["keyerror"] is None:
+                chunk, reduction["keyerror"] = dict_average[average](chunk, chunk_areacell, region=region, **kwargs)
+            return chunk if reduction["keyerror"] is None else None
+        reduction["function"] = reduce_chunk
     variable, keyerror1 = ReadSelectRegionCheckUnits(file_data, name_data, type_data, box=region,
-                                                     time_bounds=time_bounds, **kwargs)
+                                                     time_bounds=time_bounds, reduction=reduction, **kwargs)
     if debug is True:
         dict_debug = {'axes1': '(' + type_data + ') ' + str([ax.id for ax in variable.getAxisList()]),
                       'shape1': '(' + type_data + ') ' + str(variable.shape),
@@ -3538,19 +4653,36 @@ def Read_data_mask_area(file_data, name_data, type_data, metric, region, file_ar
             EnsoErrorsWarnings.too_short_time_period(metric, len(variable), kwargs['min_time_steps'], INSPECTstack())
             keyerror2 = "too short time period (" + str(len(variable)) + ")"
     # Read areacell & mask
-    variable, areacell, keyerror3 = Read_mask_area(
-        variable, name_data, file_data, type_data, region, file_area=file_area, name_area=name_area,
-        file_mask=file_mask, name_mask=name_mask, maskland=maskland, maskocean=maskocean, debug=debug, **kwargs)
+    if reduction is not None and reduction["done"] is True:
+        # already masked and averaged, the areacell is not needed anymore
+        areacell = None
+    else:
+        variable, areacell, keyerror3 = Read_mask_area(
+            variable, name_data, file_data, type_data, region, file_area=file_area, name_area=name_area,
+            file_mask=file_mask, name_mask=name_mask, maskland=maskland, maskocean=maskocean, debug=debug, **kwargs)
     if keyerror1 is not None or keyerror2 is not None or keyerror3 is not None:
         keyerror = add_up_errors([keyerror1, keyerror2, keyerror3])
     else:
         keyerror = None
+    if memo_key is not None:
+        dataset_memo.set(memo_key, [vv.clone() if hasattr(vv, "clone") else vv
+                                    for vv in [variable, areacell, keyerror]])
     return variable, areacell, keyerror
 
 
 def Read_data_mask_area_multifile(file_data, name_data, type_data, variable, metric, region, file_area='', name_area='',
                                   file_mask='', name_mask='', maskland=False, maskocean=False, debug=False,
                                   interpreter='', **kwargs):
+    # this variable may have already been read and derived (e.g., the heat fluxes read by all the feedback metrics)
+    cache_key = None
+    if read_cache.enabled() is True:
+        cache_key = ("Read_data_mask_area_multifile", str(file_data), str(name_data), type_data, variable, str(region),
+                     str(file_area), str(name_area), str(file_mask), str(name_mask), maskland, maskocean,
+                     str(kwargs.get(interpreter)),
+                     str([kwargs.get(kk) for kk in ["frequency", "min_time_steps", "time_bounds"]]))
+        cached = read_cache.get(cache_key)
+        if cached is not None:
+            return [vv.clone() if hasattr(vv, "clone") else vv for vv in cached]
     dict_area, dict_keye, dict_var = dict(), dict(), dict()
     if isinstance(file_data, str):
         tab, areacell, keyerror = \
@@ -3604,17 +4736,16 @@ def Read_data_mask_area_multifile(file_data, name_data, type_data, variable, met
     if keyerror is None:
         list_var = sorted(list(dict_var.keys()))
         if len(list_var) > 1:
-            for ii in list(range(2)):
-                for var in list_var[1:]:
-                    dict_var[list_var[0]], dict_var[var], keyerror =\
-                        CheckTime(dict_var[list_var[0]], dict_var[var], metric_name=metric, **kwargs)
-                    if keyerror is not None:
-                        break
+            # all the components are sliced once on their common period
+            list_tab, keyerror = CheckTimeList([dict_var[var] for var in list_var], metric_name=metric, **kwargs)
+            dict_var = dict(zip(list_var, list_tab))
     if keyerror is not None:
         tab, areacell = None, None
     else:
         tab, keyerror = MyDerive(kwargs[interpreter], variable, dict_var)
         areacell = dict_area[list(dict_area.keys())[0]]
+    if cache_key is not None:
+        read_cache.set(cache_key, [vv.clone() if hasattr(vv, "clone") else vv for vv in [tab, areacell, keyerror]])
     return tab, areacell, keyerror
 
 
@@ -3662,9 +4793,18 @@ def Read_mask_area(tab, name_data, file_data, type_data, region, file_area='', n
     if landmask is not None:
         tab_out, keyerror1 = ApplyLandmask(tab_out, landmask, maskland=maskland, maskocean=maskocean)
         if keyerror1 is None:
-            if areacell is None:
-                areacell = ArrayOnes(landmask, id='areacell')
-            areacell, keyerror2 = ApplyLandmaskToArea(areacell, landmask, maskland=maskland, maskocean=maskocean)
+            # masked areacell already computed on this grid (e.g., for another variable or metric)
+            cache_key = ("ApplyLandmaskToArea", file_area if file_area else file_data, name_area,
+                         file_mask if file_mask else file_data, name_mask, region, GridKey(tab), areacell is None,
+                         maskland, maskocean)
+            cached = fx_cache.get(cache_key)
+            if cached is not None:
+                areacell, keyerror2 = cached[0].clone(), cached[1]
+            else:
+                if areacell is None:
+                    areacell = ArrayOnes(landmask, id='areacell')
+                areacell, keyerror2 = ApplyLandmaskToArea(areacell, landmask, maskland=maskland, maskocean=maskocean)
+                fx_cache.set(cache_key, [areacell.clone(), keyerror2])
     if keyerror1 is not None or keyerror2 is not None:
         keyerror = add_up_errors([keyerror1, keyerror2])
     else:
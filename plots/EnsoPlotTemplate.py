@@ -60,6 +60,9 @@ mod_nicknames = ["CMIP5", "CMIP6"]
 article_fig = False  # True
 plot_for_wiki = False  # True
 
+# Basemap instances and projected grids, by map extent and resolution (see my_map_background)
+map_backgrounds = dict()
+
 
 def cmip_boxplot(dict_param, dict_values, units, reference, val_type, my_text, figure_name):
     # concatenate every mips
@@ -900,6 +903,30 @@ def my_hovmoeller(model, filename_nc, dict_param, reference, metric_variables, f
     return
 
 
+def my_map_background(lon, lat, resolution="c"):
+    """
+    Returns the cylindrical Basemap covering the given grid and the projected coordinates of the grid
+    Basemap instances (coastlines clipped to the map extent) and projected grids are kept in map_backgrounds to be
+    reused by all the panels and figures plotted by the process
+    """
+    if lat[-1] - lat[0] < 40:
+        extent = (float(lat[0] - 5), float(lat[-1] + 5), float(lon[0]), float(lon[-1]))
+    else:
+        extent = (float(lat[0]), float(lat[-1]), float(lon[0]), float(lon[-1]))
+    key = extent + (resolution,)
+    if key not in list(map_backgrounds.keys()):
+        locmap = Basemap(projection="cyl", llcrnrlat=extent[0], urcrnrlat=extent[1], llcrnrlon=extent[2],
+                         urcrnrlon=extent[3], resolution=resolution)
+        map_backgrounds[key] = {"basemap": locmap, "grids": dict()}
+    background = map_backgrounds[key]
+    grid = (tuple(lon), tuple(lat))
+    if grid not in list(background["grids"].keys()):
+        xx, yy = NUMPYmeshgrid(lon, lat)
+        background["grids"][grid] = background["basemap"](xx, yy)
+    xx, yy = background["grids"][grid]
+    return background["basemap"], xx, yy
+
+
 def my_map(model, filename_nc, dict_param, reference, metric_variables, figure_name, models2=None, member=None,
            metric_type=None, metric_values=None, metric_units=None, diagnostic_values=None, diagnostic_units=None,
            regions=None, shading=False, plot_ref=False):
@@ -1093,6 +1120,8 @@ def my_map(model, filename_nc, dict_param, reference, metric_variables, figure_n
             if plot_ref is False:
                 for kk in range(len(tab_mod)):
                     tab.append(tab_mod[kk][ii])
+    # map background and projected grid (shared by all panels)
+    locmap, xx, yy = my_map_background(lon, lat)
     for ii in range(nbr_panel):
         if nbr_panel == 1:
             ax = axes
@@ -1141,28 +1170,21 @@ def my_map(model, filename_nc, dict_param, reference, metric_variables, figure_n
                         ax.text(0.5, 1. + 60 * hspa2, dict_param["title"][(ii - 1) / (len(filename_nc) + 1)],
                                 fontsize=15, weight="bold", horizontalalignment="center", verticalalignment="center",
                                 transform=ax.transAxes)
-        # map
-        xx, yy = NUMPYmeshgrid(lon, lat)
-        if lat[-1] - lat[0] < 40:
-            locmap = Basemap(projection="cyl", llcrnrlat=lat[0] - 5, urcrnrlat=lat[-1] + 5, llcrnrlon=lon[0],
-                             urcrnrlon=lon[-1], ax=ax)
-        else:
-            locmap = Basemap(projection="cyl", llcrnrlat=lat[0], urcrnrlat=lat[-1], llcrnrlon=lon[0], urcrnrlon=lon[-1],
-                             ax=ax)
+        # map (the Basemap is shared by all panels, the axis must be given to every drawing method)
         # draw coastlines
-        locmap.drawcoastlines()
+        locmap.drawcoastlines(ax=ax)
         # fill continents
         if maskland is True:
-            locmap.fillcontinents(color="gainsboro")
+            locmap.fillcontinents(color="gainsboro", ax=ax)
         if maskocean is True:
-            locmap.drawmapboundary(fill_color="white")
+            locmap.drawmapboundary(fill_color="white", ax=ax)
         # draw parallels
-        locmap.drawparallels(ylabel_ticks, labels=[1, 0, 0, 0], fontsize=12, dashes=[3, 1], linewidth=1)
+        locmap.drawparallels(ylabel_ticks, labels=[1, 0, 0, 0], fontsize=12, dashes=[3, 1], linewidth=1, ax=ax)
         # draw meridians
-        locmap.drawmeridians(xlabel_ticks, labels=[0, 0, 0, 1], fontsize=12, dashes=[3, 1], linewidth=1)
+        locmap.drawmeridians(xlabel_ticks, labels=[0, 0, 0, 1], fontsize=12, dashes=[3, 1], linewidth=1, ax=ax)
         #cs = locmap.pcolormesh(xx, yy, tab[ii], vmin=min(labelbar), vmax=max(labelbar), cmap=colorbar)
         levels = create_levels(labelbar)
-        cs = locmap.contourf(xx, yy, tab[ii], levels=levels, extend="both", cmap=colorbar)
+        cs = locmap.contourf(xx, yy, tab[ii], levels=levels, extend="both", cmap=colorbar, ax=ax)
         # my text
         if (ii > 0 and plot_metric is True and isinstance(variables, list) is False) or\
                 (isinstance(variables, list) is True and "nina" in variables[0] and "nino" in variables[1] and
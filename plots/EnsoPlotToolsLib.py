@@ -1,19 +1,37 @@
 # -*- coding:UTF-8 -*-
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from inspect import stack as INSPECTstack
 from math import ceil as MATHceil
 from math import floor as MATHfloor
+from os.path import isfile as OSpath__isfile
+from os.path import join as OSpath__join
+from os.path import split as OSpath__split
 from numpy import arange as NUMPYarange
 from numpy import around as NUMPYaround
 from numpy import array as NUMPYarray
+from numpy import broadcast_to as NUMPYbroadcast_to
+from numpy import clip as NUMPYclip
+from numpy import concatenate as NUMPYconcatenate
+from numpy import errstate as NUMPYerrstate
+from numpy import inf as NUMPYinf
 from numpy import isnan as NUMPYisnan
 from numpy import mean as NUMPYmean
+from numpy import minimum as NUMPYminimum
 from numpy import nan as NUMPYnan
 from numpy import sort as NUMPYsort
+from numpy import sqrt as NUMPYsqrt
 from numpy import where as NUMPYwhere
+from numpy import zeros as NUMPYzeros
+from numpy.ma import array as NUMPYma__array
+from numpy.ma import getmaskarray as NUMPYma__getmaskarray
 from numpy.ma import masked_invalid as NUMPYma__masked_invalid
-from numpy.random import randint as NUMPYrandom__randint
+from numpy.ma import masked_where as NUMPYma__masked_where
+from numpy.random import default_rng as NUMPYrandom__default_rng
+from numpy.random import SeedSequence as NUMPYrandom__SeedSequence
+from scipy.stats import rankdata as SCIPYstats__rankdata
 from scipy.stats import scoreatpercentile as SCIPYstats__scoreatpercentile
+from scipy.stats import t as SCIPYstats__t
 
 # xarray based functions
 from xarray import open_dataset
@@ -62,17 +80,113 @@ models_order = [
     "NorESM2-MM", "SAM0-UNICON", "TaiESM1", "UKESM1-0-LL"]
 
 
-def bootstrap(tab, num_samples=1000000, alpha=0.05, nech=None, statistic=NUMPYmean):
-    """Returns bootstrap estimate of 100.0*(1-alpha) CI for statistic."""
-    n = len(tab)
+def bootstrap(tab, num_samples=1000000, alpha=0.05, nech=None, statistic=NUMPYmean, seed=None, chunk_size=10000,
+              n_workers=1):
+    """Returns bootstrap estimate of 100.0*(1-alpha) CI for statistic.
+
+    The samples are drawn and reduced to the statistic by chunks of chunk_size samples, so that the memory needed is
+    bounded by chunk_size * nech values instead of num_samples * nech. Each chunk has its own random generator spawned
+    from seed: the result is reproducible for a given seed and chunk_size and does not depend on n_workers, the number
+    of processes computing the chunks.
+    """
+    tab = NUMPYarray(tab)
     if nech is None:
-        nech = deepcopy(n)
-    idx = NUMPYrandom__randint(0, n, (num_samples, nech))
-    samples = tab[idx]
-    stat = NUMPYsort(statistic(samples, 1))
+        nech = deepcopy(len(tab))
+    list_sizes = [min(chunk_size, num_samples - ii) for ii in range(0, num_samples, chunk_size)]
+    list_seeds = NUMPYrandom__SeedSequence(seed).spawn(len(list_sizes))
+    list_args = [[tab] * len(list_sizes), list_sizes, [nech] * len(list_sizes), [statistic] * len(list_sizes),
+                 list_seeds]
+    if n_workers > 1 and len(list_sizes) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            stat = list(executor.map(bootstrap_chunk, *list_args))
+    else:
+        stat = list(map(bootstrap_chunk, *list_args))
+    # statistic of each sample (num_samples values), the chunks are merged to compute the percentiles
+    stat = NUMPYsort(NUMPYconcatenate(stat))
     return [stat[int(round((alpha / 2.)*num_samples))], stat[int(round((1 - alpha / 2.)*num_samples))]]
 
 
+def bootstrap_chunk(tab, num_samples, nech, statistic, seed):
+    """Returns statistic of num_samples samples of nech values drawn (with replacement) in tab."""
+    idx = NUMPYrandom__default_rng(seed).integers(0, len(tab), (num_samples, nech))
+    return statistic(tab[idx], 1)
+
+
+def correlation_matrix(tab, method="pearson", bootstrap_samples=0, seed=None):
+    """Returns the correlations and their two-sided p-values between the rows of tab (e.g., metrics x models).
+
+    The correlations are pairwise-complete (computed on the columns where both rows are not masked) and computed for
+    all the pairs at once with matrix products. method is 'pearson' or 'spearman' (pearson correlation of the ranks).
+    The p-value is the one of scipy.stats.linregress (t-test) or, if bootstrap_samples > 0, twice the fraction of
+    bootstrap_samples resamplings of the columns (drawn with the generator seeded by seed) in which the correlation does
+    not have the sign of the correlation. Pairs with less than 3 common values are masked.
+    """
+    if method not in ["pearson", "spearman"]:
+        list_strings = ["ERROR" + EnsoErrorsWarnings.message_formating(INSPECTstack()) + ": unknown method",
+                        str().ljust(5) + "method = " + str(method) + " ; it must be 'pearson' or 'spearman'"]
+        EnsoErrorsWarnings.my_error(list_strings)
+    tab = NUMPYma__masked_invalid(NUMPYma__array(tab, dtype="float64"))
+    valid = ~NUMPYma__getmaskarray(tab)
+    values = tab.filled(0.)
+    rval, nval = correlation_pairwise(values, valid, method)
+    if bootstrap_samples > 0:
+        generator = NUMPYrandom__default_rng(seed)
+        negative, positive = NUMPYzeros(rval.shape), NUMPYzeros(rval.shape)
+        for ii in range(bootstrap_samples):
+            idx = generator.integers(0, values.shape[1], values.shape[1])
+            rbst = correlation_pairwise(values[:, idx], valid[:, idx], method)[0]
+            rbst[NUMPYisnan(rbst)] = 0.
+            negative += (rbst <= 0)
+            positive += (rbst >= 0)
+        pval = NUMPYminimum(1., 2. * NUMPYwhere(rval > 0, negative, positive) / bootstrap_samples)
+    else:
+        with NUMPYerrstate(divide="ignore", invalid="ignore"):
+            tval = rval * NUMPYsqrt((nval - 2) / ((1. - rval) * (1. + rval)))
+            pval = 2 * SCIPYstats__t.sf(abs(tval), nval - 2)
+    mask = (nval < 3) | NUMPYisnan(rval)
+    return NUMPYma__masked_where(mask, rval), NUMPYma__masked_where(mask, pval)
+
+
+def correlation_pairwise(values, valid, method="pearson"):
+    """Returns the pairwise-complete correlations and the number of common values between the rows of values.
+
+    valid is True where the values are available. The pearson correlations of all the pairs are computed with matrix
+    products of the (centered) values and of the availability. For the spearman correlation, the ranks depend on the
+    columns available for both rows: the correlations of one row with all the others are computed at once.
+    """
+    available = valid.astype("float64")
+    nval = available.dot(available.T)
+    if method == "spearman":
+        rval = NUMPYzeros(nval.shape)
+        for ii in range(len(values)):
+            common = valid & valid[ii]
+            rank1 = SCIPYstats__rankdata(NUMPYwhere(common, NUMPYbroadcast_to(values[ii], values.shape), NUMPYinf),
+                                         axis=1)
+            rank2 = SCIPYstats__rankdata(NUMPYwhere(common, values, NUMPYinf), axis=1)
+            rval[ii] = correlation_rowwise(rank1, rank2, common)
+        return rval, nval
+    with NUMPYerrstate(divide="ignore", invalid="ignore"):
+        # centered values (the correlation does not depend on it, the sums below are more accurate)
+        xx = NUMPYwhere(valid, values - (values * available).sum(axis=1, keepdims=True) /
+                        available.sum(axis=1, keepdims=True), 0.)
+        sum1 = xx.dot(available.T)
+        sum11 = (xx ** 2).dot(available.T)
+        cov = xx.dot(xx.T) - sum1 * sum1.T / nval
+        rval = cov / NUMPYsqrt((sum11 - sum1 ** 2 / nval) * (sum11.T - sum1.T ** 2 / nval))
+    return NUMPYclip(rval, -1., 1.), nval
+
+
+def correlation_rowwise(tab1, tab2, valid):
+    """Returns the pearson correlation between each row of tab1 and the same row of tab2, where valid is True."""
+    available = valid.astype("float64")
+    with NUMPYerrstate(divide="ignore", invalid="ignore"):
+        nval = available.sum(axis=1, keepdims=True)
+        xx = NUMPYwhere(valid, tab1 - (tab1 * available).sum(axis=1, keepdims=True) / nval, 0.)
+        yy = NUMPYwhere(valid, tab2 - (tab2 * available).sum(axis=1, keepdims=True) / nval, 0.)
+        rval = (xx * yy).sum(axis=1) / NUMPYsqrt((xx ** 2).sum(axis=1) * (yy ** 2).sum(axis=1))
+    return NUMPYclip(rval, -1., 1.)
+
+
 def create_labels(label_name, label_ticks):
     if label_name == "months":
         if len(label_ticks) > 40:
@@ -256,11 +370,11 @@ def my_average(tab, axis=None, remove_masked=False):
     return NUMPYmean(tmp, axis=axis)
 
 
-def my_bootstrap(tab1, tab2):
+def my_bootstrap(tab1, tab2, seed=None, n_workers=1):
     mea1 = float(NUMPYarray(tab1).mean())
     mea2 = float(NUMPYarray(tab2).mean())
-    bst1 = bootstrap(NUMPYarray(tab1), nech=len(tab2))
-    bst2 = bootstrap(NUMPYarray(tab2), nech=len(tab1))
+    bst1 = bootstrap(NUMPYarray(tab1), nech=len(tab2), seed=seed, n_workers=n_workers)
+    bst2 = bootstrap(NUMPYarray(tab2), nech=len(tab1), seed=seed, n_workers=n_workers)
     return bst1, bst2, mea1, mea2
 
 
@@ -393,9 +507,41 @@ def read_obs(xml, variables_in_xml, metric_variables, varname, dict_metric, mode
     return tab_out, metric_value, obs
 
 
+def open_divedown(filename_nc):
+    """Returns the dive down dataset of a metric, read from filename_nc (root + '_' + metric + '.nc').
+
+    If filename_nc does not exist, the metric is read in the consolidated file of the run (root + '.nc'), in which the
+    variables, dimensions and global attributes of the metric are prefixed by metric + '__' (see
+    EnsoUvcdatToolsLib.NetcdfWriterStart), the prefix is removed so that the dataset looks like filename_nc.
+    """
+    if OSpath__isfile(filename_nc) is True:
+        return open_dataset(filename_nc, decode_times=False)
+    directory, name = OSpath__split(filename_nc)
+    name = name[:-3] if name.endswith(".nc") else name
+    parts = name.split("_")
+    for ii in range(len(parts) - 1, 0, -1):
+        consolidated_name = OSpath__join(directory, "_".join(parts[:ii]) + ".nc")
+        if OSpath__isfile(consolidated_name) is False:
+            continue
+        prefix = "_".join(parts[ii:]) + "__"
+        ff = open_dataset(consolidated_name, decode_times=False)
+        list_names = [var for var in list(ff.data_vars) if var.startswith(prefix)]
+        if len(list_names) == 0:
+            ff.close()
+            continue
+        group = ff[list_names]
+        group = group.rename(dict((var, var[len(prefix):]) for var in list(group.variables) if var.startswith(prefix)))
+        group.attrs = dict((att[len(prefix):], ff.attrs[att]) for att in list(ff.attrs.keys())
+                           if att.startswith(prefix))
+        group.set_close(ff.close)
+        return group
+    # neither the file of the metric nor a consolidated file, raises the error of the file of the metric
+    return open_dataset(filename_nc, decode_times=False)
+
+
 def reader(filename_nc, model, reference, var_to_read, metric_variables, dict_metric, member=None, met_in_file=False,
            met_type=None, met_pattern=""):
-    ff = open_dataset(filename_nc, decode_times=False)
+    ff = open_divedown(filename_nc)
     variables_in_file = sorted([var for var in list(ff.keys())], key=lambda v: v.upper())
     # read model
     tab_mod = list()
@@ -82,6 +82,17 @@ print('netcdf_path:', netcdf_path)
 debug = param.debug
 print('debug:', debug)
 
+# On-disk cache of preprocessed fields (shared by all metrics collections run on the same model)
+preprocess_cache_dir = param.preprocess_cache_dir
+print('preprocess_cache_dir:', preprocess_cache_dir)
+# On-disk store of observational diagnostics (shared by all models and members)
+obs_diagnostics_dir = param.obs_diagnostics_dir
+print('obs_diagnostics_dir:', obs_diagnostics_dir)
+read_chunk_size = param.read_chunk_size
+print('read_chunk_size:', read_chunk_size)
+n_workers = param.n_workers
+print('n_workers:', n_workers)
+
 # =================================================
 # Prepare loop iteration
 # -------------------------------------------------
@@ -371,7 +382,12 @@ for mod in models:
             print("\n### Compute the metric collection ###\n")
             cdms2.setAutoBounds('on')
             dict_metric[mod][run], dict_dive[mod][run] = ComputeCollection(mc_name, dictDatasets, mod_run, netcdf=param.nc_out,
-                                                                           netcdf_name=netcdf, debug=debug)
+                                                                           netcdf_name=netcdf, debug=debug,
+                                                                           preprocess_cache_dir=preprocess_cache_dir,
+                                                                           n_workers=n_workers,
+                                                                           obs_diagnostics_dir=obs_diagnostics_dir,
+                                                                           read_chunk_size=read_chunk_size,
+                                                                           netcdf_consolidated=param.nc_consolidated)
             if debug:
                 print('file_name:', file_name)
                 print('list_files:', list_files)
@@ -1,15 +1,20 @@
 from __future__ import print_function
 from collections import defaultdict
 from pcmdi_metrics.driver.pmp_parser import PMPParser
+from subprocess import Popen
 
 import copy
 import collections
 import datetime
 import glob
+import json
+import multiprocessing
 import os
 import sys
 import pcmdi_metrics
 import re
+import time
+import xml.etree.ElementTree as ET
 
 
 def AddParserArgument():
@@ -77,6 +82,43 @@ def AddParserArgument():
                    const=True, default=True,
                    type=bool,
                    help="Option for generate netCDF file output: True (default) / False")
+    P.add_argument("--preprocess_cache_dir",
+                   type=str,
+                   dest='preprocess_cache_dir',
+                   default=None,
+                   help="Directory where preprocessed fields are saved and reused by later runs (default: None, no cache)")
+    P.add_argument("--obs_diagnostics_dir",
+                   type=str,
+                   dest='obs_diagnostics_dir',
+                   default=None,
+                   help="Directory where observational diagnostics (and their dive down fields when nc_out is True) "
+                        "are saved and reused by later runs (default: None, no store)")
+    P.add_argument("--read_chunk_size",
+                   type=int,
+                   dest='read_chunk_size',
+                   default=0,
+                   help="Maximum size (in MB) of the time chunks in which large variables are read "
+                        "(default: 0, variables are read at once)")
+    P.add_argument("--nc_consolidated", nargs='?',
+                   const=True, default=False,
+                   type=bool,
+                   help="Option for saving the netCDF output of all the metrics of a collection in one compressed "
+                        "file written in the background: True / False (default, one file per metric)")
+    P.add_argument("--n_workers",
+                   type=int,
+                   dest='n_workers',
+                   default=1,
+                   help="Number of processes computing the metrics of a collection in parallel (default: 1)")
+    P.add_argument("--num_workers",
+                   type=int,
+                   dest='num_workers',
+                   default=None,
+                   help="Number of runs executed at the same time by the parallel drivers (default: number of CPUs)")
+    P.add_argument("--max_retries",
+                   type=int,
+                   dest='max_retries',
+                   default=1,
+                   help="Number of times a failed run is restarted by the parallel drivers (default: 1)")
     
     param = P.get_parameter()
 
@@ -185,3 +227,129 @@ def get_file(path):
     elif len(file_list) == 0:
         path_to_return = path
     return path_to_return
+
+
+def xml_data_files(xml_path):
+    """
+    List of the data files of the given CDAT xml catalog (cdscan), from the 'directory' and 'cdms_filemap' attributes of
+    its dataset
+    """
+    try:
+        root = ET.parse(xml_path).getroot()
+    except (ET.ParseError, OSError):
+        return []
+    directory = root.get('directory', os.path.dirname(xml_path))
+    if not os.path.isabs(directory):
+        directory = os.path.join(os.path.dirname(xml_path), directory)
+    filemap = root.get('cdms_filemap', '')
+    # the filemap lists [first time step, last time step, -, -, -, file name] for each file of each variable
+    files = sorted(set(re.findall(r'[,\[]([^,\[\]]+\.nc4?)\]', filemap)))
+    return [os.path.join(directory, file_name) for file_name in files]
+
+
+def job_size(path_list):
+    """
+    Total size (in bytes) of the files matching the given list of paths (glob patterns allowed), used to start the
+    longest runs first
+    The size of an xml catalog is the size of the data files it lists
+    """
+    size = 0
+    for path in path_list:
+        for file_path in glob.glob(path):
+            list_files = [file_path]
+            if file_path.endswith('.xml'):
+                list_files = xml_data_files(file_path) or list_files
+            for file1 in list_files:
+                try:
+                    size += os.path.getsize(file1)
+                except OSError:
+                    pass
+    return size
+
+
+def write_job_status(status_file, jobs):
+    """
+    Writes the status of the jobs in a JSON file (written in a temporary file first so that the file is always
+    readable while the jobs are running)
+    """
+    if status_file is None:
+        return
+    tmp_file = status_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'updated': time.ctime(), 'jobs': jobs}, f, indent=4, sort_keys=True)
+    os.rename(tmp_file, status_file)
+
+
+def run_parallel_jobs(jobs, num_workers=None, max_retries=1, log_dir='.', status_file=None, poll_interval=1.):
+    """
+    Runs the given commands as subprocesses, keeping 'num_workers' of them running at all time
+
+    The jobs are started from the largest to the smallest (according to their 'size'), a job ending with a non-zero
+    exit code is put back at the end of the queue up to 'max_retries' times, and the status of all jobs is written
+    in 'status_file' each time a job starts or ends
+
+    :param jobs: list of dict
+        each job is a dictionary {'name': string, 'cmd': list of string, 'size': integer (optional)}
+        'name' is used for the log files: <log_dir>/<name>_stdout.txt and <log_dir>/<name>_stderr.txt
+    :param num_workers: integer, optional
+        number of subprocesses running at the same time, default is the number of CPUs
+    :param max_retries: integer, optional
+        number of times a failed job is restarted, default is 1
+    :param log_dir: string, optional
+        directory of the log files, default is the current directory
+    :param status_file: string, optional
+        path to the JSON file recording the status of the jobs, default is None (no file)
+    :param poll_interval: float, optional
+        time (in seconds) between two checks of the running subprocesses, default is 1
+    :return: dict_status: dict
+        status of the jobs {name: {'cmd', 'size', 'status', 'attempts', 'returncode', 'start', 'end', 'duration'}}
+        status is one of 'pending', 'running', 'done' or 'failed'
+    """
+    if num_workers is None or num_workers < 1:
+        num_workers = multiprocessing.cpu_count()
+    dict_status = collections.OrderedDict()
+    for job in jobs:
+        dict_status[job['name']] = {
+            'cmd': ' '.join(job['cmd']), 'size': job.get('size', 0), 'status': 'pending', 'attempts': 0,
+            'returncode': None, 'start': None, 'end': None, 'duration': None}
+    # largest jobs first
+    queue = sorted(jobs, key=lambda job: job.get('size', 0), reverse=True)
+    running = dict()
+    write_job_status(status_file, dict_status)
+    while len(queue) > 0 or len(running) > 0:
+        # fill the free slots
+        while len(queue) > 0 and len(running) < num_workers:
+            job = queue.pop(0)
+            status = dict_status[job['name']]
+            status['attempts'] += 1
+            status['status'] = 'running'
+            status['start'] = time.time()
+            print(time.ctime(), 'start', job['name'], '(attempt ' + str(status['attempts']) + ')', ' '.join(job['cmd']))
+            log_file = os.path.join(log_dir, job['name'])
+            mode = 'wb' if status['attempts'] == 1 else 'ab'
+            with open(log_file + "_stdout.txt", mode) as out, open(log_file + "_stderr.txt", mode) as err:
+                running[job['name']] = (Popen(job['cmd'], stdout=out, stderr=err), job)
+            write_job_status(status_file, dict_status)
+        time.sleep(poll_interval)
+        # collect the ended jobs
+        for name in list(running.keys()):
+            proc, job = running[name]
+            returncode = proc.poll()
+            if returncode is None:
+                continue
+            del running[name]
+            status = dict_status[name]
+            status['returncode'] = returncode
+            status['end'] = time.time()
+            status['duration'] = status['end'] - status['start']
+            if returncode == 0:
+                status['status'] = 'done'
+            elif status['attempts'] <= max_retries:
+                status['status'] = 'pending'
+                queue.append(job)
+            else:
+                status['status'] = 'failed'
+            print(time.ctime(), status['status'], name, 'returncode:', returncode,
+                  'duration: %.0f s' % status['duration'])
+            write_job_status(status_file, dict_status)
+    return dict_status
@@ -10,7 +10,7 @@
 # ---------------------------------------------------#
 from __future__ import print_function
 
-# Run matplotlib background to prevent 
+# Run matplotlib background to prevent
 # display localhost error after console disconnected
 # and to speed up
 import matplotlib
@@ -19,11 +19,16 @@ import matplotlib.pyplot as plt
 plt.ioff()
 
 # Import other libs
+from concurrent.futures import as_completed, ProcessPoolExecutor
 from glob import iglob as GLOBiglob
+import hashlib
 import json
+import multiprocessing
+import os
 from os import makedirs as OS__makedirs
 from os.path import exists as OSpath__exists
 from os.path import join as OSpath__join
+import time
 # ENSO_metrics functions
 #from EnsoCollectionsLib import defCollection
 from EnsoMetrics.EnsoCollectionsLib import defCollection
@@ -31,118 +36,63 @@ from EnsoMetricPlot import main_plotter
 import sys
 
 from PMPdriver_lib import AddParserArgument
+from PMPdriver_lib import sort_human
 
-# ---------------------------------------------------#
-# Arguments
-# ---------------------------------------------------#
-param = AddParserArgument()
-
-# Metrics Collection
-metric_collection = param.metricsCollection
-
-# Pre-defined options
-mip = param.mip
-exp = param.exp
-
-# model
-if param.modnames is None:
-    model = "IPSL-CM5A-LR"
-else:
-    model = param.modnames[0]
-
-# Realizations
-run = param.realization
 
-# case id
-case_id = param.case_id
-
-# Switches
-debug = param.debug
-
-"""
-metric_collection = "ENSO_perf"
-#metric_collection = "ENSO_tel"
-#metric_collection = "ENSO_proc"
-
-mip = "cmip5"
-exp = "historical"
-model = "IPSL-CM5A-LR"
-run = "r1i1p1"
-
-case_id = "v20200305"
-debug = True
-"""
-
-# ---------------------------------------------------#
-# Check Arguments
 # ---------------------------------------------------#
-print("metric_collection:", metric_collection)
-print("mip:", mip)
-print("exp:", exp)
-print("model:", model)
-print("run:", run)
-print("case_id:", case_id)
-print("debug:", debug)
+# Functions
 # ---------------------------------------------------#
+def list_figures(data_json, metric_collection, mip, exp, case_id, model, run, path_in_nc):
+    """
+    Lists the figures (one per metric) of the given model and run
 
-path_main = "/p/user_pub/pmp/pmp_results/pmp_v1.1.2"
-path_in_json = OSpath__join(path_main, "metrics_results", "enso_metric", mip, exp, case_id, metric_collection)
-path_in_nc = OSpath__join(path_main, "diagnostic_results", "enso_metric", mip, exp, case_id, metric_collection)
-
-if debug:
-    path_main = "/work/lee1043/imsi/result_test"
-path_out = OSpath__join(path_main, "graphics", "enso_metric", mip, exp, case_id, metric_collection)
-
-if not OSpath__exists(path_out):
-    try:
-        OS__makedirs(path_out)
-        print("path_out:", path_out)
-    except:
-        pass
-
-pattern = "_".join([mip, exp, metric_collection, case_id])
-
-# ---------------------------------------------------#
-# Main
-# ---------------------------------------------------#
-# read json file
-filename_js = OSpath__join(path_in_json, pattern + "_allModels_allRuns.json")
-print('filename_js:', filename_js)
-with open(filename_js) as ff:
-    data_json = json.load(ff)['RESULTS']['model'][model][run]
-ff.close()
-del ff, filename_js
-# loop on metrics
-metrics = sorted(defCollection(metric_collection)['metrics_list'].keys(), key=lambda v: v.upper())
-for met in metrics:
-    try:
-        print('met:', met)
-        # get NetCDF file name
-        filename_nc = OSpath__join(path_in_nc, pattern + "_" + model + "_" + run + "_" + met + ".nc")
-        print("filename_nc:", filename_nc)
-        # get diagnostic values for the given model and observations
-        if metric_collection == "ENSO_tel" and "Map" in met:
-            dict_dia = data_json["value"][met+"Corr"]["diagnostic"]
-            diagnostic_values = dict((key1, None) for key1 in dict_dia.keys())
-            diagnostic_units = ""
-        else:
-            dict_dia = data_json["value"][met]["diagnostic"]
-            diagnostic_values = dict((key1, dict_dia[key1]["value"]) for key1 in dict_dia.keys())
-            diagnostic_units = data_json["metadata"]["metrics"][met]["diagnostic"]["units"]
-        # get metric values computed with the given model and observations
-        if metric_collection == "ENSO_tel" and "Map" in met:
-            list1, list2 = [met+"Corr", met+"Rmse"], ["diagnostic", "metric"]
-            dict_met = data_json["value"]
-            metric_values = dict((key1, {model: [dict_met[su][ty][key1]["value"] for su, ty in zip(list1, list2)]})
-                                 for key1 in dict_met[list1[0]]["metric"].keys())
-            metric_units = [data_json["metadata"]["metrics"][su]["metric"]["units"] for su in list1]
-        else:
-            dict_met = data_json["value"][met]["metric"]
-            metric_values = dict((key1, {model: dict_met[key1]["value"]}) for key1 in dict_met.keys())
-            metric_units = data_json["metadata"]["metrics"][met]["metric"]["units"]
+    :param data_json: dict
+        results of the given model and run in the json file (['RESULTS']['model'][model][run])
+    :param path_in_nc: string
+        path to the dive down NetCDF files, one file per metric or one consolidated file per run (--nc_consolidated)
+    :return figures: list of dict
+        each figure is a dictionary {'name': figure name, 'inputs': list of files, 'args': arguments of main_plotter,
+        'kwargs': keyword arguments of main_plotter}
+    """
+    pattern = "_".join([mip, exp, metric_collection, case_id])
+    figures = list()
+    metrics = sorted(defCollection(metric_collection)['metrics_list'].keys(), key=lambda v: v.upper())
+    for met in metrics:
+        try:
+            # get NetCDF file name
+            filename_nc = OSpath__join(path_in_nc, pattern + "_" + model + "_" + run + "_" + met + ".nc")
+            # the dive down of the metric may be in the consolidated file of the run (read by the plotting library)
+            filename_run = OSpath__join(path_in_nc, pattern + "_" + model + "_" + run + ".nc")
+            if OSpath__exists(filename_nc) is False and OSpath__exists(filename_run) is True:
+                inputs = [filename_run]
+            else:
+                inputs = [filename_nc]
+            # get diagnostic values for the given model and observations
+            if metric_collection == "ENSO_tel" and "Map" in met:
+                dict_dia = data_json["value"][met+"Corr"]["diagnostic"]
+                diagnostic_values = dict((key1, None) for key1 in dict_dia.keys())
+                diagnostic_units = ""
+            else:
+                dict_dia = data_json["value"][met]["diagnostic"]
+                diagnostic_values = dict((key1, dict_dia[key1]["value"]) for key1 in dict_dia.keys())
+                diagnostic_units = data_json["metadata"]["metrics"][met]["diagnostic"]["units"]
+            # get metric values computed with the given model and observations
+            if metric_collection == "ENSO_tel" and "Map" in met:
+                list1, list2 = [met+"Corr", met+"Rmse"], ["diagnostic", "metric"]
+                dict_met = data_json["value"]
+                metric_values = dict((key1, {model: [dict_met[su][ty][key1]["value"] for su, ty in zip(list1, list2)]})
+                                     for key1 in dict_met[list1[0]]["metric"].keys())
+                metric_units = [data_json["metadata"]["metrics"][su]["metric"]["units"] for su in list1]
+            else:
+                dict_met = data_json["value"][met]["metric"]
+                metric_values = dict((key1, {model: dict_met[key1]["value"]}) for key1 in dict_met.keys())
+                metric_units = data_json["metadata"]["metrics"][met]["metric"]["units"]
+        except Exception as e:
+            print("## ERROR:", model, run, met, e)
+            continue
         # figure name
         figure_name = "_".join([mip, exp, metric_collection, model, run, met])
-        # this function needs:
+        # main_plotter needs:
         #      - the name of the metric collection: metric_collection
         #      - the name of the metric: metric
         #      - the name of the model: modname (!!!!! this must be the name given when computed because it is the name used
@@ -157,9 +107,209 @@ for met in metrics:
         #      - the metric units: metric_units
         #      - (optional) the path where to save the plots: path_out
         #      - (optional) the name of the plots: name_png
-        main_plotter(metric_collection, met, model, exp, filename_nc, diagnostic_values,
-                     diagnostic_units, metric_values, metric_units, member=run, path_png=path_out, 
-                     name_png=figure_name)
+        figures.append({
+            'name': figure_name, 'inputs': inputs,
+            'args': [metric_collection, met, model, exp, filename_nc, diagnostic_values, diagnostic_units,
+                     metric_values, metric_units],
+            'kwargs': {'member': run, 'name_png': figure_name}})
+    return figures
+
+
+def figure_key(figure):
+    """
+    Hash of the inputs of a figure: values given to main_plotter and modification time and size of the input files
+    """
+    inputs = list()
+    for filename in figure['inputs']:
+        try:
+            stat = os.stat(filename)
+            inputs.append([filename, stat.st_mtime, stat.st_size])
+        except OSError:
+            inputs.append([filename, None, None])
+    content = json.dumps([figure['args'], figure['kwargs'], inputs], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def init_worker():
+    # non-interactive backend in every process of the pool
+    matplotlib.use('Agg')
+    plt.ioff()
+
+
+def render_figure(figure, path_out):
+    """
+    Plots the given figure (main_plotter), returns its name, duration (in seconds) and error (None if it succeeded)
+    """
+    t1 = time.time()
+    error = None
+    try:
+        main_plotter(*figure['args'], path_png=path_out, **figure['kwargs'])
     except Exception as e:
-        print("## ERROR:", e)
-        pass
+        error = str(e)
+    plt.close('all')
+    return figure['name'], time.time() - t1, error
+
+
+def render_figures(figures, path_out, num_workers=1, force=False):
+    """
+    Plots the given figures through a pool of 'num_workers' processes
+    A figure is skipped if its png files exist and its inputs have not changed since it was plotted (the inputs of the
+    plotted figures and their durations are saved in a manifest in path_out)
+
+    :param figures: list of dict
+        figures to plot, see list_figures
+    :param num_workers: integer, optional
+        number of processes plotting the figures, if None the number of cpus is used, default is 1
+    :param force: boolean, optional
+        True to plot all the figures, default is False
+    :return dict_manifest: dict
+        {figure name: {'key': hash of the inputs (see figure_key), 'duration': duration in seconds}}
+    """
+    manifest_file = OSpath__join(path_out, "figures_manifest.json")
+    dict_manifest = dict()
+    if OSpath__exists(manifest_file):
+        try:
+            with open(manifest_file) as ff:
+                dict_manifest = json.load(ff)
+        except ValueError:
+            dict_manifest = dict()
+    # figures whose inputs changed (or not plotted yet)
+    dict_keys = dict((figure['name'], figure_key(figure)) for figure in figures)
+    todo = list()
+    for figure in figures:
+        name = figure['name']
+        if force is False and name in dict_manifest and dict_manifest[name]['key'] == dict_keys[name] and \
+                next(GLOBiglob(OSpath__join(path_out, name + "_diagnostic_divedown*.png")), None) is not None:
+            continue
+        todo.append(figure)
+    print("figures:", len(figures), "to plot:", len(todo), "unchanged:", len(figures) - len(todo))
+    if num_workers is None or num_workers < 1:
+        num_workers = multiprocessing.cpu_count()
+    errors = dict()
+    t1 = time.time()
+    if num_workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker) as executor:
+            futures = [executor.submit(render_figure, figure, path_out) for figure in todo]
+            results = (future.result() for future in as_completed(futures))
+            for ii, (name, duration, error) in enumerate(results):
+                print(ii + 1, "/", len(todo), name, "%.1f s" % duration, "ERROR: " + error if error else "")
+                if error is None:
+                    dict_manifest[name] = {'key': dict_keys[name], 'duration': round(duration, 2)}
+                else:
+                    errors[name] = error
+    else:
+        for ii, figure in enumerate(todo):
+            name, duration, error = render_figure(figure, path_out)
+            print(ii + 1, "/", len(todo), name, "%.1f s" % duration, "ERROR: " + error if error else "")
+            if error is None:
+                dict_manifest[name] = {'key': dict_keys[name], 'duration': round(duration, 2)}
+            else:
+                errors[name] = error
+    # timings
+    durations = sorted([(dict_manifest[figure['name']]['duration'], figure['name']) for figure in todo
+                        if figure['name'] not in errors], reverse=True)
+    if len(durations) > 0:
+        print("plotted:", len(durations), "in %.1f s" % (time.time() - t1),
+              "(mean: %.1f s per figure)" % (sum([dd for dd, name in durations]) / len(durations)))
+        print("slowest:", ", ".join([name + " %.1f s" % dd for dd, name in durations[:5]]))
+    if len(errors) > 0:
+        print("## ERROR:", len(errors), "figure(s) failed:", sorted(errors.keys()))
+    with open(manifest_file + ".tmp", "w") as ff:
+        json.dump(dict_manifest, ff, sort_keys=True, indent=1)
+    os.rename(manifest_file + ".tmp", manifest_file)
+    return dict_manifest
+
+
+if __name__ == "__main__":
+    # ---------------------------------------------------#
+    # Arguments
+    # ---------------------------------------------------#
+    param = AddParserArgument()
+
+    # Metrics Collection
+    metric_collection = param.metricsCollection
+
+    # Pre-defined options
+    mip = param.mip
+    exp = param.exp
+
+    # model(s)
+    if param.modnames is None:
+        models = ["IPSL-CM5A-LR"]
+    else:
+        models = param.modnames
+
+    # Realizations ('all' to plot every realization available in the json file)
+    run = param.realization
+
+    # case id
+    case_id = param.case_id
+
+    # Switches
+    debug = param.debug
+
+    # number of processes plotting the figures
+    num_workers = param.num_workers
+
+    """
+    metric_collection = "ENSO_perf"
+    #metric_collection = "ENSO_tel"
+    #metric_collection = "ENSO_proc"
+
+    mip = "cmip5"
+    exp = "historical"
+    models = ["IPSL-CM5A-LR"]
+    run = "r1i1p1"
+
+    case_id = "v20200305"
+    debug = True
+    """
+
+    # ---------------------------------------------------#
+    # Check Arguments
+    # ---------------------------------------------------#
+    print("metric_collection:", metric_collection)
+    print("mip:", mip)
+    print("exp:", exp)
+    print("models:", models)
+    print("run:", run)
+    print("case_id:", case_id)
+    print("debug:", debug)
+    print("num_workers:", num_workers)
+    # ---------------------------------------------------#
+
+    path_main = "/p/user_pub/pmp/pmp_results/pmp_v1.1.2"
+    path_in_json = OSpath__join(path_main, "metrics_results", "enso_metric", mip, exp, case_id, metric_collection)
+    path_in_nc = OSpath__join(path_main, "diagnostic_results", "enso_metric", mip, exp, case_id, metric_collection)
+
+    if debug:
+        path_main = "/work/lee1043/imsi/result_test"
+    path_out = OSpath__join(path_main, "graphics", "enso_metric", mip, exp, case_id, metric_collection)
+
+    if not OSpath__exists(path_out):
+        try:
+            OS__makedirs(path_out)
+            print("path_out:", path_out)
+        except:
+            pass
+
+    pattern = "_".join([mip, exp, metric_collection, case_id])
+
+    # ---------------------------------------------------#
+    # Main
+    # ---------------------------------------------------#
+    # read json file
+    filename_js = OSpath__join(path_in_json, pattern + "_allModels_allRuns.json")
+    print('filename_js:', filename_js)
+    with open(filename_js) as ff:
+        data_json = json.load(ff)['RESULTS']['model']
+    del ff, filename_js
+    # list figures of all metrics, models and runs
+    figures = list()
+    for model in models:
+        runs_list = sort_human(list(data_json[model].keys())) if run == "all" else [run]
+        for rr in runs_list:
+            figures += list_figures(data_json[model][rr], metric_collection, mip, exp, case_id, model, rr, path_in_nc)
+    del data_json
+    # plot figures whose inputs changed
+    render_figures(figures, path_out, num_workers=num_workers)
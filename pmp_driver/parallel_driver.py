@@ -6,14 +6,17 @@ Usage example:
 ./parallel_driver.py -p my_Param_ENSO.py --mip cmip6 --modnames all --realization r1i1p1f1 --metricsCollection ENSO_perf
 2. All realizations of individual models
 ./parallel_driver.py -p my_Param_ENSO.py --mip cmip6 --modnames all --realization all --metricsCollection ENSO_perf
+3. Same as 2. with 16 runs at the same time, each failed run being restarted up to 2 times
+./parallel_driver.py -p my_Param_ENSO.py --mip cmip6 --modnames all --realization all --metricsCollection ENSO_perf --num_workers 16 --max_retries 2
 """
 
 from __future__ import print_function
 from argparse import RawTextHelpFormatter
 from genutil import StringConstructor
-from subprocess import Popen
 
 from PMPdriver_lib import AddParserArgument
+from PMPdriver_lib import job_size
+from PMPdriver_lib import run_parallel_jobs
 from PMPdriver_lib import sort_human
 
 import datetime
@@ -101,6 +104,7 @@ else:
     param_file = './my_Param_ENSO.py'
 
 cmds_list = []
+jobs_list = []
 for model in models:
     print(' ----- model: ', model, ' ---------------------')
     # Find all xmls for the given model
@@ -138,6 +142,10 @@ for model in models:
                '--case_id', case_id,
                '--modnames', model,
                '--realization', run]
+        name = '_'.join(['log_enso', mc_name, mip, exp, model, run, case_id])
+        # input size (all variables of the run) used to start the longest runs first
+        size = job_size([modpath(mip=mip, exp=exp, model=model, realization=run, variable='*')])
+        jobs_list.append({'name': name, 'cmd': cmd, 'size': size})
         cmds_list.append(cmd)
 
 if debug:
@@ -153,32 +161,22 @@ log_dir = os.path.join("log", case_id, mc_name)
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
-# number of tasks to submit at the same time
-num_workers = 7
-#num_workers = 10
-#num_workers = 30
-#num_workers = 25
+# number of tasks running at the same time
+num_workers = param.num_workers
+print('num_workers:', num_workers)
+
+# status of the tasks
+status_file = os.path.join(log_dir, '_'.join(['jobs_status', mc_name, mip, exp, case_id]) + '.json')
+print('status_file:', status_file)
 
 print("Start : %s" % time.ctime())
 
-# submit tasks and wait for subset of tasks to complete
-procs_list = []
-for p, cmd in enumerate(cmds_list):
-    timenow = time.ctime()
-    print(timenow, p, ' '.join(cmd))
-    model = cmd[-3]
-    run = cmd[-1]
-    log_filename = '_'.join(['log_enso', mc_name, mip, exp, model, run, case_id])
-    log_file = os.path.join(log_dir, log_filename)
-    with open(log_file+"_stdout.txt", "wb") as out, open(log_file+"_stderr.txt", "wb") as err:
-        procs_list.append(Popen(cmd, stdout=out, stderr=err))
-        time.sleep(1)
-    if ((p > 0 and p % num_workers == 0) or (p == len(cmds_list)-1)):
-        print('wait...')
-        for proc in procs_list:
-            proc.wait()
-        print("Tasks end : %s" % time.ctime())
-        procs_list = []
+# submit tasks, a new task starts as soon as one ends
+dict_status = run_parallel_jobs(jobs_list, num_workers=num_workers, max_retries=param.max_retries, log_dir=log_dir,
+                                status_file=status_file)
+failed = [name for name in dict_status if dict_status[name]['status'] == 'failed']
+if len(failed) > 0:
+    print('failed tasks:', failed)
 
 # tasks done
 print("End : %s" % time.ctime())
@@ -10,12 +10,12 @@ Usage example:
 """
 
 from __future__ import print_function
-from subprocess import Popen
 
 from PMPdriver_lib import AddParserArgument
 from PMPdriver_lib import sort_human
+from PMPdriver_plot import list_figures
+from PMPdriver_plot import render_figures
 
-import datetime
 import json
 import os
 import sys
@@ -99,63 +99,32 @@ if not OSpath__exists(path_out):
         pass
 
 # =================================================
-# Generates list of command
-# e.g.: python PMPdriver_plot.py --mip cmip5 --exp historical --metricsCollection ENSO_perf --modnames IPSL-CM5A-LR --realization r1i1p1 --case_id v20200305
+# Generates list of figures (all metrics of all models and runs)
 # -------------------------------------------------
-cmds_list = []
+path_in_nc = OSpath__join(path_main, "diagnostic_results", "enso_metric", mip, exp, case_id, metric_collection)
+figures = []
 for model in models:
     print(' ----- model: ', model, ' ---------------------')
-    if realization is "all":
+    if realization == "all":
         runs_list = sort_human(list(data_json[model].keys()))
         print('runs_list (all):', runs_list)
     else:
         runs_list = [realization]
     for run in runs_list:
-        cmd = ['python', 'PMPdriver_plot.py',
-               '--mip', mip, '--exp', exp, '--metricsCollection', metric_collection,
-               '--case_id', case_id,
-               '--modnames', model,
-               '--realization', run]
-        cmds_list.append(cmd)
-
-for i, cmd in enumerate(cmds_list):
-    print(i+1, ' '.join(cmd))
+        figures += list_figures(data_json[model][run], metric_collection, mip, exp, case_id, model, run, path_in_nc)
+del data_json
 
 # =================================================
-# Run subprocesses in parallel
+# Plot figures in parallel
 # -------------------------------------------------
-# log dir
-log_dir = os.path.join("log", case_id, metric_collection)
-
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-# number of tasks to submit at the same time
-#num_workers = 8 
-num_workers = 10
-#num_workers = 30
-#num_workers = 25
+# number of processes plotting at the same time (number of cpus if not given)
+num_workers = param.num_workers
+print("num_workers:", num_workers)
 
 print("Start : %s" % time.ctime())
 
-# submit tasks and wait for subset of tasks to complete
-procs_list = []
-for p, cmd in enumerate(cmds_list):
-    timenow = time.ctime()
-    print(timenow, p, ' '.join(cmd))
-    model = cmd[-3]
-    run = cmd[-1]
-    log_filename = '_'.join(['log_ensoPlot', metric_collection, mip, exp, model, run, case_id])
-    log_file = os.path.join(log_dir, log_filename)
-    with open(log_file+"_stdout.txt", "wb") as out, open(log_file+"_stderr.txt", "wb") as err:
-        procs_list.append(Popen(cmd, stdout=out, stderr=err))
-        time.sleep(1)
-    if ((p > 0 and p % num_workers == 0) or (p == len(cmds_list)-1)):
-        print('wait...')
-        for proc in procs_list:
-            proc.wait()
-        print("Tasks end : %s" % time.ctime())
-        procs_list = []
+# figures whose inputs did not change since they were plotted are skipped
+render_figures(figures, path_out, num_workers=num_workers)
 
 # tasks done
 print("End : %s" % time.ctime())
@@ -4,8 +4,10 @@ from __future__ import print_function
 from genutil import StringConstructor
 from pcmdi_metrics.variability_mode.lib import dict_merge
 
+from concurrent.futures import ProcessPoolExecutor
 import copy
 import glob
+import hashlib
 import json
 import os
 
@@ -26,15 +28,23 @@ def main():
     pmprdir = '/p/user_pub/pmp/pmp_results/pmp_v1.1.2'
     #pmprdir = "/work/lee1043/imsi/result_test"
 
+    # Only fold in the JSONs added since the last merge (full rebuild if a merged JSON changed or disappeared)
+    incremental = True
+    # Write the merged JSON without indentation (smaller and faster to write)
+    compact = False
+    # Number of processes parsing the individual JSONs
+    num_workers = 1
+
     for mip in mips:
         for exp in exps:
             for MC in MCs:
                 case_id = find_latest(pmprdir, mip, exp, MC)
                 print("mip, exp, MC, case_id:", mip, exp, MC, case_id)
-                merge_jsons(mip, exp, case_id, MC, pmprdir)
+                merge_jsons(mip, exp, case_id, MC, pmprdir,
+                            incremental=incremental, compact=compact, num_workers=num_workers)
 
 
-def merge_jsons(mip, exp, case_id, metricsCollection, pmprdir):
+def merge_jsons(mip, exp, case_id, metricsCollection, pmprdir, incremental=True, compact=False, num_workers=1):
     json_file_dir_template = os.path.join(
         pmprdir,
         '%(output_type)', 'enso_metric',
@@ -65,29 +75,108 @@ def merge_jsons(mip, exp, case_id, metricsCollection, pmprdir):
         elif 'allRuns' in filename_component:
             json_files_revised.remove(json_file)
 
-    # Load individual JSON and merge to one big dictionary
-    for j, json_file in enumerate(json_files_revised):
-        print(j, json_file)
-        f = open(json_file)
-        dict_tmp = json.loads(f.read())
-        if j == 0:
-            dict_final = dict_tmp.copy()
-        else:
-            dict_merge(dict_final, dict_tmp)
-        f.close()
-
-    # Dump final dictionary to JSON
     final_json_filename = json_file_template(
         mip=mip, exp=exp, metricsCollection=metricsCollection, case_id=case_id,
         model='allModels', realization='allRuns')+'.json'
     final_json_file = os.path.join(json_file_dir, final_json_filename)
-
-    with open(final_json_file, 'w') as fp:
-        json.dump(dict_final, fp, sort_keys=True, indent=4)
+    # Manifest of the merged JSONs (modification time, size and hash of each file)
+    manifest_file = final_json_file.replace('.json', '.manifest.json')
+
+    # Files already merged are kept if none of them changed, only the new files are merged into the final JSON
+    manifest_old = load_manifest(manifest_file) if incremental else {}
+    manifest = {}
+    new_files = []
+    for json_file in json_files_revised:
+        stat = os.stat(json_file)
+        entry = manifest_old.get(json_file)
+        if entry is not None and (entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size):
+            # touched (same content) or modified
+            if entry['size'] == stat.st_size and file_sha1(json_file) == entry['sha1']:
+                entry = dict(entry, mtime=stat.st_mtime)
+            else:
+                entry = None
+        if entry is not None:
+            manifest[json_file] = entry
+        else:
+            new_files.append(json_file)
+    dict_final = None
+    if len(manifest) > 0 and len(manifest) == len(manifest_old) and os.path.isfile(final_json_file):
+        if len(new_files) == 0:
+            save_manifest(manifest_file, manifest)
+            print("Up to date: ", final_json_file)
+            return
+        with open(final_json_file) as fp:
+            dict_final = json.load(fp)
+        print("Incremental merge:", len(new_files), "new JSON(s),", len(manifest), "already merged")
+    else:
+        # Full rebuild
+        manifest = {}
+        new_files = json_files_revised
+
+    # Load individual JSON (in parallel if requested) and merge to one big dictionary
+    for j, (json_file, digest, dict_tmp) in enumerate(parse_jsons(new_files, num_workers)):
+        print(j, json_file)
+        stat = os.stat(json_file)
+        manifest[json_file] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': digest}
+        if dict_final is None:
+            dict_final = dict_tmp
+        else:
+            dict_merge(dict_final, dict_tmp)
+        del dict_tmp
+
+    # Dump final dictionary to JSON (streamed to a temporary file which then replaces the previous one, so that
+    # readers never see a partial file)
+    tmp_file = final_json_file + '.tmp' + str(os.getpid())
+    with open(tmp_file, 'w') as fp:
+        if compact:
+            json.dump(dict_final, fp, sort_keys=True, separators=(',', ':'))
+        else:
+            json.dump(dict_final, fp, sort_keys=True, indent=4)
+    os.replace(tmp_file, final_json_file)
+    save_manifest(manifest_file, manifest)
 
     print("Done: check ", final_json_file)
 
 
+def file_sha1(json_file):
+    with open(json_file, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def parse_json(json_file):
+    with open(json_file, 'rb') as f:
+        content = f.read()
+    return json_file, hashlib.sha1(content).hexdigest(), json.loads(content.decode('utf-8'))
+
+
+def parse_jsons(json_files, num_workers=1):
+    # Yields (json_file, sha1, dictionary) in the order of json_files
+    if num_workers > 1 and len(json_files) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for result in executor.map(parse_json, json_files, chunksize=4):
+                yield result
+    else:
+        for json_file in json_files:
+            yield parse_json(json_file)
+
+
+def load_manifest(manifest_file):
+    if not os.path.isfile(manifest_file):
+        return {}
+    try:
+        with open(manifest_file) as fp:
+            return json.load(fp)['files']
+    except (ValueError, KeyError):
+        return {}
+
+
+def save_manifest(manifest_file, manifest):
+    tmp_file = manifest_file + '.tmp' + str(os.getpid())
+    with open(tmp_file, 'w') as fp:
+        json.dump({'files': manifest}, fp, sort_keys=True, indent=4)
+    os.replace(tmp_file, manifest_file)
+
+
 def find_latest(pmprdir, mip, exp, MC):
     versions = sorted([r.split('/')[-2] for r in glob.glob(os.path.join(
                           pmprdir, "metrics_results", "enso_metric",
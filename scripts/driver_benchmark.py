@@ -0,0 +1,282 @@
+# -*- coding:UTF-8 -*-
+"""
+Benchmark of the metrics of a metric collection on synthetic data
+
+Synthetic monthly NetCDF files are created for the model and the observations needed by the metric collection (with the
+variable names defined in EnsoCollectionsLib.CmipVariables and EnsoCollectionsLib.ReferenceObservations), then each
+metric is computed by EnsoComputeMetricsLib.ComputeMetric in its own process.
+The wall time, peak memory (resident set size) and bytes read of each metric are appended to a JSON history file, so
+that runs done with different versions of the package can be compared.
+
+Usage example:
+python driver_benchmark.py --metric_collection ENSO_perf --nlat 90 --nlon 180 --nyears 50
+python driver_benchmark.py --metric_collection ENSO_tel --metrics EnsoSstMapDjf EnsoPrMapDjf --history bench.json
+"""
+from argparse import ArgumentParser
+from datetime import datetime
+import json
+from multiprocessing import Process, Queue
+from numpy import arange as NParange
+from numpy import array as NParray
+from numpy import concatenate as NPconcatenate
+from numpy import cos as NPcos
+from numpy import exp as NPexp
+from numpy import pi as NPpi
+from numpy import zeros as NPzeros
+from numpy.random import RandomState as NPrandom__RandomState
+from os import makedirs as OSmakedirs
+from os import rename as OSrename
+from os.path import isdir as OSpath__isdir
+from os.path import isfile as OSpath__isfile
+from os.path import join as OSpath__join
+from platform import node as PLATFORMnode
+from platform import python_version as PLATFORMpython_version
+from queue import Empty as QUEUEEmpty
+from resource import getrusage as RESOURCEgetrusage
+from resource import RUSAGE_SELF as RESOURCE_RUSAGE_SELF
+from subprocess import check_output as SUBPROCESScheck_output
+from time import time as TIMEtime
+from zlib import crc32 as ZLIBcrc32
+
+# CDAT
+from cdms2 import createAxis as CDMS2createAxis
+from cdms2 import createVariable as CDMS2createVariable
+from cdms2 import open as CDMS2open
+
+# ENSO_metrics package
+from EnsoMetrics.EnsoCollectionsLib import CmipVariables, defCollection, ReferenceObservations
+from EnsoMetrics.EnsoComputeMetricsLib import ComputeMetric
+
+
+# ---------------------------------------------------#
+# Arguments
+# ---------------------------------------------------#
+parser = ArgumentParser(description="Benchmark of the metrics of a metric collection on synthetic data")
+parser.add_argument("--metric_collection", type=str, default="ENSO_perf",
+                    help="metric collection, must be defined in EnsoCollectionsLib.defCollection()")
+parser.add_argument("--metrics", type=str, nargs="+", default=None,
+                    help="metrics to benchmark (default: all the metrics of the collection)")
+parser.add_argument("--nlat", type=int, default=90, help="number of latitudes of the synthetic grid (global)")
+parser.add_argument("--nlon", type=int, default=180, help="number of longitudes of the synthetic grid (global)")
+parser.add_argument("--nyears", type=int, default=50, help="number of years of the synthetic monthly time series")
+parser.add_argument("--first_year", type=int, default=1950, help="first year of the synthetic time series")
+parser.add_argument("--path_data", type=str, default="benchmark_data",
+                    help="directory where the synthetic NetCDF files are created (reused if they exist)")
+parser.add_argument("--history", type=str, default="benchmark_history.json",
+                    help="JSON file where the results of each run are appended")
+parser.add_argument("--label", type=str, default="",
+                    help="free text saved with the results (e.g., name of the branch or of the environment)")
+param = parser.parse_args()
+
+
+# ---------------------------------------------------#
+# Functions
+# ---------------------------------------------------#
+# typical mean value and variability of the variables (in CMIP units)
+dict_synthetic = {
+    "lhf": [-100., 20.], "lwr": [-50., 10.], "pr": [5e-5, 3e-5], "shf": [-10., 5.], "slp": [101300., 100.],
+    "ssh": [0., 0.1], "sst": [300., 1.], "swr": [200., 30.], "taux": [-0.05, 0.02], "tauy": [0., 0.02],
+    "thf": [50., 20.], "uo": [0., 0.2], "vo": [0., 0.1], "wo": [0., 1e-5], "zos": [0., 0.1]}
+
+
+def create_synthetic_file(filename, var_name, var, nlat, nlon, nyears, first_year, units):
+    """
+    Creates a NetCDF file with a monthly (noleap calendar) global field: mean value, seasonal cycle, ENSO-like
+    interannual variability in the equatorial Pacific and noise
+    The random numbers depend only on the file name so that the same files are created by all runs
+    """
+    # axes
+    lat_bnds = NParray([-90. + ii * 180. / nlat for ii in range(nlat + 1)])
+    lon_bnds = NParray([ii * 360. / nlon for ii in range(nlon + 1)])
+    month_length = NParray([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype="float64")
+    month_start = NPconcatenate((NPzeros(1), month_length.cumsum()[:-1]))
+    time_bnds = NPconcatenate([month_start + 365. * yy for yy in range(nyears)])
+    time_bnds = NParray([time_bnds, time_bnds + NPconcatenate([month_length] * nyears)]).T
+    lat = CDMS2createAxis((lat_bnds[1:] + lat_bnds[:-1]) / 2., bounds=NParray([lat_bnds[:-1], lat_bnds[1:]]).T,
+                          id="lat")
+    lat.designateLatitude()
+    lat.units = "degrees_north"
+    lon = CDMS2createAxis((lon_bnds[1:] + lon_bnds[:-1]) / 2., bounds=NParray([lon_bnds[:-1], lon_bnds[1:]]).T,
+                          id="lon")
+    lon.designateLongitude()
+    lon.units = "degrees_east"
+    time = CDMS2createAxis(time_bnds.mean(axis=1), bounds=time_bnds, id="time")
+    time.designateTime()
+    time.units = "days since " + str(first_year) + "-01-01 00:00:00"
+    time.calendar = "noleap"
+    # data
+    mean, std = dict_synthetic[var] if var in list(dict_synthetic.keys()) else [0., 1.]
+    random = NPrandom__RandomState(ZLIBcrc32(filename.encode("utf-8")))
+    ntime = 12 * nyears
+    index = NPzeros(ntime)
+    noise = random.normal(size=ntime)
+    for tt in range(1, ntime):
+        index[tt] = 0.95 * index[tt - 1] + 0.3 * noise[tt]
+    seasonal = NPcos(2 * NPpi * (NParange(ntime) % 12) / 12.)
+    pattern = NPexp(-(lat[:] / 15.) ** 2).reshape((nlat, 1)) * NPexp(-((lon[:] - 230.) / 50.) ** 2).reshape((1, nlon))
+    data = mean + std * (seasonal.reshape((ntime, 1, 1)) * NPcos(NPpi * lat[:] / 180.).reshape((1, nlat, 1)) +
+                         index.reshape((ntime, 1, 1)) * pattern.reshape((1, nlat, nlon)) +
+                         0.3 * random.normal(size=(ntime, nlat, nlon)))
+    tab = CDMS2createVariable(data.astype("float32"), axes=[time, lat, lon], id=var_name, attributes={"units": units})
+    ff = CDMS2open(filename, "w+")
+    ff.write(tab, id=var_name)
+    ff.close()
+    return
+
+
+def synthetic_dataset(dataset, var, var_in_file, units):
+    """
+    Creates (if needed) the synthetic file(s) of the given variable and returns the file name(s)
+    """
+    list_var = var_in_file if isinstance(var_in_file, list) else [var_in_file]
+    list_files = list()
+    for var_name in list_var:
+        filename = OSpath__join(param.path_data, "_".join([dataset, var_name, str(param.nlat) + "x" + str(param.nlon),
+                                                           str(param.nyears) + "years"]) + ".nc")
+        if OSpath__isfile(filename) is False:
+            create_synthetic_file(filename, var_name, var, param.nlat, param.nlon, param.nyears, param.first_year,
+                                  units)
+        list_files.append(filename)
+    return list_files if isinstance(var_in_file, list) else list_files[0]
+
+
+def metric_arguments(metric_collection, metric):
+    """
+    Creates the synthetic files needed by the given metric and returns the arguments of ComputeMetric (as
+    ComputeCollection does)
+    """
+    dict_metric = defCollection(metric_collection)["metrics_list"][metric]
+    dict_cmip = CmipVariables()["variable_name_in_file"]
+    list_variables = dict_metric["variables"]
+    model_name = "synthetic_model"
+    list_arg, dict_arg = list(), {"obsInterpreter1": list()}
+    for ii, var in enumerate(list_variables):
+        nbr = str(ii + 1)
+        model_var = dict_cmip[var]["var_name"]
+        model_file = synthetic_dataset(model_name, var, model_var, dict_cmip[var]["cf_units"])
+        list_obs, list_files, list_vars = list(), list(), list()
+        for obs in sorted(dict_metric["obs_name"][var], key=lambda v: v.upper()):
+            try:
+                obs_var = ReferenceObservations(obs)["variable_name_in_file"][var]["var_name"]
+            except KeyError:
+                continue
+            list_obs.append(obs)
+            list_files.append(synthetic_dataset(obs, var, obs_var, dict_cmip[var]["cf_units"]))
+            list_vars.append(obs_var)
+        if ii == 0:
+            list_arg = [metric_collection, metric, model_name, model_file, model_var, list_obs, list_files, list_vars,
+                        dict_metric["regions"][var]]
+        else:
+            dict_arg.update({"modelFile" + nbr: model_file, "modelVarName" + nbr: model_var,
+                             "obsNameVar" + nbr: list_obs, "obsFile" + nbr: list_files, "obsVarName" + nbr: list_vars,
+                             "regionVar" + nbr: dict_metric["regions"][var]})
+        dict_arg.update({"modelFileArea" + nbr: None, "modelAreaName" + nbr: None, "modelFileLandmask" + nbr: None,
+                         "modelLandmaskName" + nbr: None, "obsFileArea" + nbr: [None] * len(list_obs),
+                         "obsAreaName" + nbr: [None] * len(list_obs), "obsFileLandmask" + nbr: [None] * len(list_obs),
+                         "obsLandmaskName" + nbr: [None] * len(list_obs), "obsInterpreter" + nbr: list_obs})
+    return list_arg, dict_arg
+
+
+def bytes_read():
+    """
+    Number of bytes read by the current process (Linux only, None elsewhere)
+    """
+    try:
+        with open("/proc/self/io") as ff:
+            for line in ff:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def run_metric(list_arg, dict_arg, queue):
+    """
+    Computes the metric and puts its wall time, peak resident set size and bytes read in the queue
+    """
+    read0 = bytes_read()
+    time0 = TIMEtime()
+    try:
+        ComputeMetric(*list_arg, **dict_arg)
+    except Exception as e:
+        status = "failed: " + str(e)
+    else:
+        status = "ok"
+    wall_time = TIMEtime() - time0
+    read1 = bytes_read()
+    queue.put({
+        "wall_time_s": round(wall_time, 3),
+        "peak_rss_MB": round(RESOURCEgetrusage(RESOURCE_RUSAGE_SELF).ru_maxrss / 1024., 1),
+        "bytes_read": (read1 - read0) if read0 is not None and read1 is not None else None,
+        "status": status})
+    return
+
+
+# ---------------------------------------------------#
+# Main
+# ---------------------------------------------------#
+if OSpath__isdir(param.path_data) is False:
+    OSmakedirs(param.path_data)
+list_metrics = param.metrics
+if list_metrics is None:
+    list_metrics = sorted(list(defCollection(param.metric_collection)["metrics_list"].keys()), key=lambda v: v.upper())
+try:
+    git_version = SUBPROCESScheck_output(["git", "describe", "--always", "--dirty"]).decode("utf-8").strip()
+except Exception:
+    git_version = None
+dict_run = {
+    "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "host": PLATFORMnode(),
+    "python": PLATFORMpython_version(), "git": git_version, "label": param.label,
+    "config": {"metric_collection": param.metric_collection, "nlat": param.nlat, "nlon": param.nlon,
+               "nyears": param.nyears},
+    "metrics": dict()}
+for metric in list_metrics:
+    print("benchmark: " + str(metric))
+    list_arg, dict_arg = metric_arguments(param.metric_collection, metric)
+    # each metric is computed in a new process so that its peak memory is not the one of a previous metric
+    queue = Queue()
+    proc = Process(target=run_metric, args=(list_arg, dict_arg, queue))
+    proc.start()
+    # the result is read before joining the process: a process that has put data in a queue does not exit before the
+    # data is read
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except QUEUEEmpty:
+            if proc.is_alive() is False:
+                try:
+                    result = queue.get(timeout=1)
+                except QUEUEEmpty:
+                    break
+    proc.join()
+    if result is None:
+        dict_run["metrics"][metric] = {"status": "crashed (exit code " + str(proc.exitcode) + ")"}
+    else:
+        dict_run["metrics"][metric] = result
+    print(str().ljust(5) + json.dumps(dict_run["metrics"][metric], sort_keys=True))
+
+# history of the runs
+if OSpath__isfile(param.history) is True:
+    with open(param.history) as ff:
+        list_runs = json.load(ff)
+else:
+    list_runs = list()
+# comparison with the last run done with the same configuration
+list_previous = [run for run in list_runs if run["config"] == dict_run["config"]]
+if len(list_previous) > 0:
+    print("comparison with the run of " + str(list_previous[-1]["date"]) + " (git " + str(list_previous[-1]["git"]) +
+          ")")
+    for metric in list_metrics:
+        try:
+            time0 = list_previous[-1]["metrics"][metric]["wall_time_s"]
+            time1 = dict_run["metrics"][metric]["wall_time_s"]
+        except KeyError:
+            continue
+        if time0 > 0:
+            print(str().ljust(5) + str(metric).ljust(25) + "wall time x " + str(round(time1 / time0, 2)))
+list_runs.append(dict_run)
+with open(param.history + ".tmp", "w") as ff:
+    json.dump(list_runs, ff, indent=4, sort_keys=True)
+OSrename(param.history + ".tmp", param.history)
@@ -6,7 +6,7 @@ from os.path import join as OSpath__join
 
 # ENSO_metrics package
 from EnsoMetrics.EnsoCollectionsLib import CmipVariables, defCollection, ReferenceObservations
-from EnsoMetrics.EnsoComputeMetricsLib import ComputeCollection
+from EnsoMetrics.EnsoComputeMetricsLib import ComputeCollectionEnsemble
 
 # set of functions to find cmip/obs files and save a json file
 # to be adapted/changed by users depending on their environments
@@ -122,9 +122,10 @@ dict_var = CmipVariables()["variable_name_in_file"]
 for mod in list_models:
     list_ens = find_members(experiment, frequency, mod, project, realm, first_only=first_member_only)
     pattern_out = OSpath__join(path_netcdf, user_name + "_" + mc_name + "_" + mod + "_" + experiment)
-    dict_ens, dict_ens_dive = dict(), dict()
+    dict_mod, dict_netcdf = dict(), dict()
     for ens in list_ens:
-        dict_mod = {mod + '_' + ens: {}}
+        dict_mod[mod + '_' + ens] = dict()
+        dict_netcdf[mod + '_' + ens] = pattern_out + "_" + ens
         for var in list_variables:
             #
             # finding variable name in file
@@ -162,15 +163,14 @@ for mod in list_models:
                  "areaname": list_name_area, "path + filename_landmask": list_landmask, "landmaskname": list_name_land}
             del areacell_in_file, file_areacell, file_landmask, file_name, landmask_in_file, list_areacell, list_files,\
                 list_landmask, list_name_area, list_name_land, var_in_file
-        dictDatasets = {"model": dict_mod, "observations": dict_obs}
-        # Computes the metric collection
-        netcdf = pattern_out + "_" + ens
-        dict_ens[mod + "_" + ens], dict_ens_dive[mod + "_" + ens] =\
-            ComputeCollection(mc_name, dictDatasets, mod + "_" + ens, netcdf=True, netcdf_name=netcdf, debug=False)
+    dictDatasets = {"model": dict_mod, "observations": dict_obs}
+    # Computes the metric collection for all members at once (observations are read once for the whole ensemble)
+    dict_ens, dict_ens_dive = ComputeCollectionEnsemble(mc_name, dictDatasets, netcdf=True, netcdf_name=dict_netcdf,
+                                                        debug=False)
+    for member in list(dict_ens.keys()):
         # save json
-        save_json({mod + "_" + ens: dict_ens[mod + "_" + ens]}, netcdf, metric_only=True)
-        with open(netcdf + "_raw.json", "w") as outfile:
-            json.dump(dict_ens[mod + "_" + ens], outfile, sort_keys=True)
-        del dict_mod, dictDatasets, netcdf
+        save_json({member: dict_ens[member]}, dict_netcdf[member], metric_only=True)
+        with open(dict_netcdf[member] + "_raw.json", "w") as outfile:
+            json.dump(dict_ens[member], outfile, sort_keys=True)
     dict_metric[mod], dict_dive[mod] = dict_ens, dict_ens_dive
-    del dict_ens, dict_ens_dive, list_ens, pattern_out
+    del dict_ens, dict_ens_dive, dict_mod, dict_netcdf, dictDatasets, list_ens, pattern_out
@@ -17,15 +17,14 @@ from numpy.ma import masked_invalid as NUMPYma__masked_invalid
 from numpy.ma import masked_where as NUMPYmasked_where
 from numpy.ma import zeros as NUMPYma__zeros
 from os.path import join as OSpath__join
-from scipy.stats import linregress as SCIPYstats__linregress
 
 # set of functions to find cmip/obs files and save a json file
 # to be adapted/changed by users depending on their environments
-from driver_tools_lib import get_metric_values, get_mod_mem_json
+from driver_tools_lib import get_metric_values, get_mod_mem_json, set_results_store
 
 # ENSO_metrics functions
 from EnsoPlots.EnsoPlotTemplate import plot_metrics_correlations
-from EnsoPlots.EnsoPlotToolsLib import sort_metrics
+from EnsoPlots.EnsoPlotToolsLib import correlation_matrix, sort_metrics
 
 
 # ---------------------------------------------------#
@@ -44,6 +43,11 @@ reduced_set = True  # False  #
 # If set to False, all members will be used and the metric values computed for all members of each model will be
 # averaged
 first_member = True  # False  #
+# correlation between metrics: 'pearson' or 'spearman', and its significance: t-test (bootstrap_samples = 0) or
+# bootstrap of the models (bootstrap_samples > 0, with the given seed)
+correlation_method = "pearson"  # "spearman"  #
+bootstrap_samples = 0  # 1000  #
+bootstrap_seed = 0
 # computation version, 'v20200427' for models and 'v20201231' for obs are provided with the package
 version_mod = "v20200427"
 version_obs = "v20201231"
@@ -61,6 +65,9 @@ dict_json = {
         "ENSO_perf": "share/EnsoMetrics/obs2obs_historical_ENSO_perf_" + version_obs + "_allObservations.json",
         "ENSO_proc": "share/EnsoMetrics/obs2obs_historical_ENSO_proc_" + version_obs + "_allObservations.json",
         "ENSO_tel":  "share/EnsoMetrics/obs2obs_historical_ENSO_tel_" + version_obs + "_allObservations.json"}}
+# sqlite file in which the metric values of the json files are indexed the first time they are read, so that the
+# following runs query it instead of reading the json files (None to read the json files each time)
+results_store = "enso_metrics_results.sqlite"
 # figure name
 path_out = ""
 figure_name = "metrics_correlations_" + str(len(list_metric_collections)) + "metric_collections_" + version_mod
@@ -81,46 +88,41 @@ figure_name = OSpath__join(path_out, figure_name)
 # ---------------------------------------------------#
 # Functions
 # ---------------------------------------------------#
-def compute_correlation(tab_in):
+def compute_correlation(tab_in, method="pearson", bootstrap_samples=0, seed=None):
     """
     Computes correlations
 
     Input:
     -----
-    :param tab_in: `cdms2` variable
-        A `cdms2` variable containing the data to be analysed.
+    :param tab_in: masked_array
+        A 2D masked_array containing the data to be analysed (e.g., metrics x models).
+    :param method: string, optional
+        'pearson' or 'spearman'
+    :param bootstrap_samples: int, optional
+        Number of resamplings of the models used to compute the p-value (0 to use the t-test of linregress).
+    :param seed: int, optional
+        Seed of the bootstrap.
 
     Outputs:
     -------
-    :return rval: `cdms2` variable
-        A `cdms2` variable containing the correlation coefficients between the values along the first axis.
-    :return pval: `cdms2` variable
-        A `cdms2` variable containing the two-sided p-value for a hypothesis test whose null hypothesis is that the
-        slope is zero, using Wald Test with t-distribution of the test statistic. I.e., if the absolute value of the
-        correlation is smaller than the p-value, it means that the correlation is not significant.
+    :return rval: masked_array
+        A masked_array containing the correlation coefficients between the values along the first axis (each pair of
+        rows uses the models available in both rows).
+    :return pval: masked_array
+        A masked_array containing the two-sided p-value for a hypothesis test whose null hypothesis is that the
+        slope is zero, using Wald Test with t-distribution of the test statistic (or the bootstrap). I.e., if the
+        absolute value of the correlation is smaller than the p-value, it means that the correlation is not
+        significant.
     """
-    pval = NUMPYma__zeros((len(tab_in), len(tab_in)))
-    rval = NUMPYma__zeros((len(tab_in), len(tab_in)))
-    for ii in range(len(tab_in)):
-        tmp1 = tab_in[ii]
-        for jj in range(len(tab_in)):
-            tmp2 = tab[jj]
-            tmpf1 = NUMPYmasked_where(tmp2.mask, tmp1)
-            tmpf2 = NUMPYmasked_where(tmpf1.mask, tmp2)
-            tmpf1 = tmpf1.flatten().compressed()
-            tmpf2 = tmpf2.flatten().compressed()
-            slope, intercept, r_value, p_value, std_err = SCIPYstats__linregress(tmpf1, tmpf2)
-            pval[ii, jj] = float(p_value)
-            rval[ii, jj] = float(r_value)
-            del intercept, p_value, r_value, slope, std_err, tmp2, tmpf1, tmpf2
-        del tmp1
-    return rval, pval
+    return correlation_matrix(tab_in, method=method, bootstrap_samples=bootstrap_samples, seed=seed)
 # ---------------------------------------------------#
 
 
 # ---------------------------------------------------#
 # Main
 # ---------------------------------------------------#
+# metric values read from the results store (filled from the json files at first use)
+set_results_store(results_store)
 # get members by model by project from json file
 # only metrics from models/members chosen here will be used
 # all metrics from models/members chosen here will be used (ensures that if a model/member is not available for one or
@@ -161,6 +163,7 @@ if ' ':
     tab = NUMPYma__masked_invalid(tab)
     tab = NUMPYmasked_where(tab == 1e20, tab)
     # compute inter model correlations
-    rval, pval = compute_correlation(tab)
+    rval, pval = compute_correlation(tab, method=correlation_method, bootstrap_samples=bootstrap_samples,
+                                     seed=bootstrap_seed)
     # plot metrics correlations
     plot_metrics_correlations(rval, figure_name, list_metrics, tab_pval=pval, cfram=True, chigh=True)
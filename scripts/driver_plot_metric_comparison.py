@@ -23,7 +23,7 @@ from os.path import join as OSpath__join
 
 # set of functions to find cmip/obs files and save a json file
 # to be adapted/changed by users depending on their environments
-from driver_tools_lib import get_metric_values, get_mod_mem_json
+from driver_tools_lib import get_metric_values, get_mod_mem_json, set_results_store
 
 # ENSO_metrics functions
 from EnsoPlots.EnsoPlotTemplate import plot_projects_comparison
@@ -64,6 +64,10 @@ my_selection = {
         'CESM2', 'CESM2-FV2', 'CESM2-WACCM', 'CESM2-WACCM-FV2', 'CMCC-CM', 'CNRM-CM5', 'CNRM-CM5-2', 'EC-Earth3',
         'EC-Earth3-Veg', 'FGOALS-f3-L', 'FGOALS-s2', 'GFDL-CM4', 'GFDL-ESM4', 'MIROC-ES2L', 'MIROC6', 'NESM3',
         'NorESM2-MM']}
+# Seed of the bootstrap of the mean metric values (the confidence intervals are the same at each run, None to draw
+# different samples each time) and number of processes computing it
+bootstrap_seed = 0
+bootstrap_workers = 1
 # List of additional observations
 # the reading part is very 'ad hoc', do not change the obs!
 list_obs = ["20CRv2", "NCEP2", "ERA-Interim"]
@@ -84,6 +88,9 @@ dict_json = {
         "ENSO_perf": "share/EnsoMetrics/obs2obs_historical_ENSO_perf_" + version_obs + "_allObservations.json",
         "ENSO_proc": "share/EnsoMetrics/obs2obs_historical_ENSO_proc_" + version_obs + "_allObservations.json",
         "ENSO_tel":  "share/EnsoMetrics/obs2obs_historical_ENSO_tel_" + version_obs + "_allObservations.json"}}
+# sqlite file in which the metric values of the json files are indexed the first time they are read, so that the
+# following runs query it instead of reading the json files (None to read the json files each time)
+results_store = "enso_metrics_results.sqlite"
 # figure name
 path_out = ""
 figure_name = "metrics_intercomparison_" + str(len(list_metric_collections)) + "metric_collections_" + version_mod
@@ -122,6 +129,8 @@ def common_save(dict_in, dict_out={}):
 # ---------------------------------------------------#
 # Main
 # ---------------------------------------------------#
+# metric values read from the results store (filled from the json files at first use)
+set_results_store(results_store)
 # get members by model by project from json file
 # only metrics from models/members chosen here will be used
 # all metrics from models/members chosen here will be used (ensures that if a model/member is not available for one or
@@ -181,7 +190,7 @@ if ' ':
         for ii in range(len(tab_tmp)):
             tab1.append(float(NUMPYmean(tab_tmp[ii])))
             nbr = nbr = len(tab_tmp[1]) if ii==0 else len(tab_tmp[0])
-            bst = bootstrap(tab_tmp[ii], nech=nbr)
+            bst = bootstrap(tab_tmp[ii], nech=nbr, seed=bootstrap_seed, n_workers=bootstrap_workers)
             tab2.append(bst)
             del bst, nbr
         tab_bst.append(tab2)
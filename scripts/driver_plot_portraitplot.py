@@ -24,7 +24,7 @@ import string
 
 # set of functions to find cmip/obs files and save a json file
 # to be adapted/changed by users depending on their environments
-from driver_tools_lib import get_metric_values, get_metric_values_observations, get_mod_mem_json
+from driver_tools_lib import get_metric_values, get_metric_values_observations, get_mod_mem_json, set_results_store
 
 # ENSO_metrics functions
 from EnsoPlots.EnsoPlotTemplate import plot_portraitplot
@@ -67,6 +67,9 @@ dict_json = {
         "ENSO_perf": "share/EnsoMetrics/obs2obs_historical_ENSO_perf_" + version_obs + "_allObservations.json",
         "ENSO_proc": "share/EnsoMetrics/obs2obs_historical_ENSO_proc_" + version_obs + "_allObservations.json",
         "ENSO_tel":  "share/EnsoMetrics/obs2obs_historical_ENSO_tel_" + version_obs + "_allObservations.json"}}
+# sqlite file in which the metric values of the json files are indexed the first time they are read, so that the
+# following runs query it instead of reading the json files (None to read the json files each time)
+results_store = "enso_metrics_results.sqlite"
 # figure name
 path_out = ""
 figure_name = "portraitplot_" + str(len(list_metric_collections)) + "metric_collections_" + version_mod
@@ -89,6 +92,8 @@ metric_collection_names_for_plot = {"ENSO_perf": "Performance", "ENSO_proc": "Pr
 # ---------------------------------------------------#
 # Main
 # ---------------------------------------------------#
+# metric values read from the results store (filled from the json files at first use)
+set_results_store(results_store)
 # get members by model by project from json file
 # only metrics from models/members chosen here will be used
 # all metrics from models/members chosen here will be used (ensures that if a model/member is not available for one or
@@ -7,7 +7,10 @@ from inspect import stack as INSPECTstack
 import json
 from numpy import array as NUMPYarray
 from os import environ as OSenviron
+from os import stat as OSstat
+from os.path import abspath as OSpath__abspath
 from os.path import join as OSpath__join
+import sqlite3
 from sys import exit as SYSexit
 from sys import path as SYSpath
 
@@ -21,6 +24,10 @@ user_name = GETPASSgetuser()
 xmldir = OSenviron['XMLDIR']
 path_obs = "/data/" + user_name + "/Obs"
 path_netcdf = "/data/" + user_name + "/ENSO_metrics/v20200311"
+# indexed store (sqlite file) of the metric values of the json files, filled the first time a json file is read and
+# updated when the json file changes (see set_results_store)
+# disabled by default (filename=None), the json files are read each time
+results_store = {'filename': None}
 
 # My (YYP) package
 # set new path where to find programs
@@ -310,8 +317,8 @@ def get_metric_values(project, metric_collection, dict_json, dict_mod_mem, reduc
     """
 
     # open and read json file
-    data_json = read_json(dict_json[project][metric_collection])
     list_models = list(dict_mod_mem[project].keys())
+    data_json = read_metric_values(dict_json[project][metric_collection], list_models=list_models)
     dict_out = dict()
     for mod in list_models:
         list_members = sort_members(dict_mod_mem[project][mod])
@@ -370,7 +377,7 @@ def get_metric_values_observations(filename_json, obsvation_names, list_met, met
     :return data: list
         Dictionary output of additional observations metric values.
     """
-    data_json = read_json(filename_json)
+    data_json = read_metric_values(filename_json)
     dict_out = dict()
     for obs in obsvation_names:
         for met in list_met:
@@ -463,8 +470,8 @@ def get_mod_mem_json(projects, metric_collections, dict_json, first_only=False):
         list_models = list()
         dict_members = dict()
         for mc in metric_collections:
-            # read json files
-            tmp = read_json(dict_json[proj][mc])
+            # read json files (models and members only)
+            tmp = read_metric_values(dict_json[proj][mc], values=False)
             # list models
             list_models += list(tmp.keys())
             # members
@@ -530,6 +537,130 @@ def read_json(filename_json):
     return data
 
 
+def read_metric_values(filename_json, list_models=None, values=True):
+    """
+    Reads the metric values of the given json file, from the results store if it is set (see set_results_store)
+
+    Inputs:
+    ------
+    :param filename_json: string
+        Path and name of a json file output of the CLIVAR PRP ENSO metrics package.
+    **Optional arguments:**
+    :param list_models: list of strings, optional
+        Models to read (only used with the results store). Default is None, all models are read.
+    :param values: boolean, optional
+        False to read only the models and members (only used with the results store). Default is True.
+
+    Output:
+    ------
+    :return data: dictionary
+        Dictionary with the structure of the json file, first level is models, second is members, then
+        data[model][member]["value"][metric]["metric"][reference]["value"] (only these keys with the results store).
+    """
+    if results_store['filename'] is None:
+        return read_json(filename_json)
+    connection = open_results_store(filename_json)
+    filename_json = OSpath__abspath(filename_json)
+    condition, arguments = "filename = ?", [filename_json]
+    if list_models is not None:
+        condition += " AND model IN (" + ", ".join(["?"] * len(list_models)) + ")"
+        arguments += list(list_models)
+    data = dict()
+    for mod, mem in connection.execute("SELECT model, member FROM members WHERE " + condition, arguments):
+        if mod not in list(data.keys()):
+            data[mod] = dict()
+        data[mod][mem] = dict()
+    if values is True:
+        for mod, mem, met, ref, val in connection.execute(
+                "SELECT model, member, metric, reference, value FROM metric_values WHERE " + condition, arguments):
+            if "value" not in list(data[mod][mem].keys()):
+                data[mod][mem]["value"] = dict()
+            if met not in list(data[mod][mem]["value"].keys()):
+                data[mod][mem]["value"][met] = {"metric": dict()}
+            data[mod][mem]["value"][met]["metric"][ref] = {"value": val}
+    connection.close()
+    return data
+
+
+def import_json(connection, filename_json):
+    """
+    Imports the metric values of the given json file in the results store (previous values of this file are replaced)
+
+    Inputs:
+    ------
+    :param connection: sqlite3.Connection
+        Connection to the results store.
+    :param filename_json: string
+        Path and name of a json file output of the CLIVAR PRP ENSO metrics package.
+
+    Output:
+    ------
+    :return:
+    """
+    print(bcolors.OKBLUE + "import " + str(filename_json) + " in " + str(results_store['filename']) + bcolors.ENDC)
+    data = read_json(filename_json)
+    filename_json = OSpath__abspath(filename_json)
+    list_members, list_values = list(), list()
+    for mod in list(data.keys()):
+        for mem in list(data[mod].keys()):
+            list_members.append((filename_json, mod, mem))
+            try:
+                list_metrics = list(data[mod][mem]["value"].keys())
+            except (AttributeError, KeyError, TypeError):
+                continue
+            for met in list_metrics:
+                try:
+                    dict_ref = data[mod][mem]["value"][met]["metric"]
+                    list_references = list(dict_ref.keys())
+                except (AttributeError, KeyError, TypeError):
+                    continue
+                for ref in list_references:
+                    try:
+                        list_values.append((filename_json, mod, mem, met, ref, dict_ref[ref]["value"]))
+                    except (KeyError, TypeError):
+                        pass
+    stat = OSstat(filename_json)
+    with connection:
+        connection.execute("DELETE FROM members WHERE filename = ?", (filename_json,))
+        connection.execute("DELETE FROM metric_values WHERE filename = ?", (filename_json,))
+        connection.executemany("INSERT INTO members VALUES (?, ?, ?)", list_members)
+        connection.executemany("INSERT INTO metric_values VALUES (?, ?, ?, ?, ?, ?)", list_values)
+        connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                           (filename_json, stat.st_mtime, stat.st_size))
+    return
+
+
+def open_results_store(filename_json=None):
+    """
+    Opens the results store (see set_results_store), the given json file is imported if it is not in the store or if
+    it has changed since it was imported
+
+    **Optional arguments:**
+    :param filename_json: string, optional
+        Path and name of a json file output of the CLIVAR PRP ENSO metrics package.
+
+    Output:
+    ------
+    :return connection: sqlite3.Connection
+        Connection to the results store.
+    """
+    connection = sqlite3.connect(results_store['filename'])
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS files (filename TEXT PRIMARY KEY, mtime REAL, size INTEGER)")
+        connection.execute("CREATE TABLE IF NOT EXISTS members (filename TEXT, model TEXT, member TEXT)")
+        connection.execute("CREATE TABLE IF NOT EXISTS metric_values (filename TEXT, model TEXT, member TEXT, "
+                           "metric TEXT, reference TEXT, value REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS members_index ON members (filename, model)")
+        connection.execute("CREATE INDEX IF NOT EXISTS metric_values_index ON metric_values (filename, model, member)")
+    if filename_json is not None:
+        stat = OSstat(filename_json)
+        row = connection.execute("SELECT mtime, size FROM files WHERE filename = ?",
+                                 (OSpath__abspath(filename_json),)).fetchone()
+        if row is None or tuple(row) != (stat.st_mtime, stat.st_size):
+            import_json(connection, filename_json)
+    return connection
+
+
 def save_json(dict_in, json_name, metric_only=True):
     """
     Saves given dictionary under given name in a json file
@@ -600,3 +731,22 @@ def save_json(dict_in, json_name, metric_only=True):
     with open(json_name, "w") as outfile:
         json.dump(dict_out, outfile, sort_keys=True)
     return
+
+
+def set_results_store(filename_store):
+    """
+    Sets the results store: the metric values of the json files are imported in the given sqlite file the first time
+    they are read (and again if a json file changes), get_metric_values, get_metric_values_observations and
+    get_mod_mem_json then query the store instead of reading the json files
+
+    Input:
+    -----
+    :param filename_store: string
+        Path and name of the sqlite file (created if it does not exist), None to read the json files each time.
+
+    Output:
+    ------
+    :return:
+    """
+    results_store['filename'] = filename_store
+    return